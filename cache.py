@@ -0,0 +1,100 @@
+"""
+Response Cache for Campus Security System
+Memoizes rendered API payloads per dataset version with LRU eviction
+under a memory cap
+"""
+
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+
+
+class VersionedCache:
+    """
+    LRU cache keyed by (name, version)
+
+    Entries for older versions are never served again and are evicted first
+    when a newer version of the same name is stored. Total payload size is
+    kept under `max_bytes`.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # {(name, version): (value, size)}
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _size(value):
+        if isinstance(value, (bytes, bytearray, str)):
+            return len(value)
+        return sys.getsizeof(value)
+
+    @staticmethod
+    def etag(name, version):
+        """Strong ETag for a (name, version) pair"""
+        return hashlib.sha1(f"{name}:{version}".encode()).hexdigest()[:20]
+
+    def get(self, name, version):
+        with self.lock:
+            entry = self.entries.get((name, version))
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end((name, version))
+            self.hits += 1
+            return entry[0]
+
+    def put(self, name, version, value):
+        size = self._size(value)
+        if size > self.max_bytes:
+            return value
+
+        with self.lock:
+            # Superseded versions of this entry can never be requested again
+            for key in [k for k in self.entries if k[0] == name and k[1] != version]:
+                self.current_bytes -= self.entries.pop(key)[1]
+
+            old = self.entries.pop((name, version), None)
+            if old is not None:
+                self.current_bytes -= old[1]
+
+            self.entries[(name, version)] = (value, size)
+            self.current_bytes += size
+
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+        return value
+
+    def get_or_compute(self, name, version, compute):
+        """
+        Return the cached value, computing and storing it on a miss
+
+        Args:
+            name: Entry name (e.g. 'statistics')
+            version: Dataset version the value was computed from
+            compute: Zero-argument callable producing the value
+        """
+        value = self.get(name, version)
+        if value is None:
+            value = self.put(name, version, compute())
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
@@ -0,0 +1,210 @@
+"""
+Command-line entry point for Campus Security System
+Each subcommand imports only what it needs, so `python campus.py --help`
+and the tabular commands never load the face recognition stack
+
+    python campus.py serve --port 5000
+    python campus.py analyze campus_data.parquet --out results/
+    python campus.py analyze campus_data.parquet --shard-by building role --profiles data/given
+    python campus.py link data/given --out event_store.parquet
+    python campus.py link data/given --detections report.csv --location LAB_101 --start "2025-09-01 08:00"
+    python campus.py load-db sqlite:///campus_security.db data/given
+    python campus.py faces video.mp4 --database campus_face_database.pkl
+    python campus.py stream-fit data/given --out stream_model.pkl
+    python campus.py stream "data/given/campus card_swipes.csv" --source card_swipes
+"""
+
+import argparse
+import sys
+
+
+def serve(args):
+    from wsgi import load_api
+
+    api = load_api()
+    print(f"Server starting on http://{args.host}:{args.port}")
+    api.app.run(host=args.host, port=args.port, debug=args.debug)
+
+
+def analyze(args):
+    from pathlib import Path
+
+    from maincode import CampusSecuritySystem
+    from storage import save_frame
+
+    profiles = None
+    if args.profiles:
+        from schemas import load_source
+
+        profiles = load_source('profiles', args.profiles)
+    system = CampusSecuritySystem(shard_by=args.shard_by, profiles=profiles, max_workers=args.workers)
+    results = system.run_full_analysis(args.source)
+    if results is None:
+        return 1
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    save_frame(results['data'], out / 'processed_data.parquet')
+    save_frame(results['alerts'], out / 'security_alerts.parquet')
+    print(f"\n✓ Results saved to {out}")
+    if args.database:
+        from persistence import Database
+
+        db = Database.from_url(args.database)
+        if db.dialect == 'sqlite':
+            db.create_schema()
+        db.load_analysis(results, run=args.run)
+        db.close()
+    return 0
+
+
+def link(args):
+    from linking import link_sources
+    from storage import load_frame, save_frame
+
+    if args.detections:
+        from sightings import detections_frame, link_sightings, load_gallery
+
+        detections = detections_frame(load_frame(args.detections), args.location, args.start)
+        gallery = load_gallery(args.gallery) if args.gallery else None
+        events, linker, sightings = link_sightings(args.data_dir, detections, gallery, threshold=args.threshold,
+                                                   keep_unresolved=args.keep_unresolved)
+        print(f"  - recognized CCTV faces: {sightings.stats}")
+    else:
+        events, linker = link_sources(args.data_dir, keep_unresolved=args.keep_unresolved)
+    save_frame(events, args.out)
+    for source, stats in linker.stats.items():
+        print(f"  - {source}: {stats}")
+    print(f"✓ {len(events)} events written to {args.out}")
+    return 0
+
+
+def load_db(args):
+    from persistence import Database
+
+    db = Database.from_url(args.url, batch_size=args.batch_size)
+    if db.dialect == 'sqlite':
+        db.create_schema()
+    for table, stats in db.load_given(args.data_dir).items():
+        print(f"  - {table}: {stats['rows']} rows, {stats['rows_per_sec']:,} rows/s")
+    db.close()
+    return 0
+
+
+def faces(args):
+    from facerecognition import FaceRecognitionSystem
+
+    system = FaceRecognitionSystem(model_name=args.model)
+    if args.database:
+        system.load_database(args.database)
+    detected = system.process_cctv_footage(args.video, sample_rate=args.sample_rate)
+    system.generate_report(detected, output_path=args.report)
+    return 0
+
+
+def stream_fit(args):
+    from linking import link_sources
+    from streaming import StreamFeatures, StreamModel
+
+    events, _ = link_sources(args.data_dir)
+    features = StreamFeatures()
+    StreamModel.fit(events, features=features, contamination=args.contamination).save(args.out)
+    if args.features:
+        features.store.save_snapshot(args.features)
+    return 0
+
+
+def stream(args):
+    from streaming import DatabaseSink, PrintSink, StreamService, load_scorer
+
+    scorer = load_scorer(args.model, args.data_dir, args.features)
+    sinks = [PrintSink()]
+    if args.database:
+        from persistence import Database
+
+        db = Database.from_url(args.database)
+        if db.dialect == 'sqlite':
+            db.create_schema()
+        sinks.append(DatabaseSink(db, scorer.profiles))
+    service = StreamService(scorer, sinks, max_batch=args.max_batch)
+    try:
+        service.feed_file(args.source, args.file, follow=not args.once)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+    print(f"✓ {scorer.events} events scored, {scorer.alerts} alerts, {scorer.skipped} skipped")
+    if args.features:
+        scorer.features.store.save_snapshot(args.features)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='campus', description='Campus Security System')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    p = commands.add_parser('serve', help='Run the API development server')
+    p.add_argument('--host', default='0.0.0.0')
+    p.add_argument('--port', type=int, default=5000)
+    p.add_argument('--debug', action='store_true')
+    p.set_defaults(fn=serve)
+
+    p = commands.add_parser('analyze', help='Run the full analysis pipeline on a data file')
+    p.add_argument('source', help='Parquet, Feather, CSV or Excel file')
+    p.add_argument('--out', default='.', help='Directory for the result files')
+    p.add_argument('--database', help='Also persist the results to this database URL')
+    p.add_argument('--run', default='analysis', help='Run label for persisted clusters')
+    p.add_argument('--shard-by', nargs='+', help="Fit one anomaly model per value of these columns, e.g. building role")
+    p.add_argument('--profiles', help="Data directory whose profiles give each row's role")
+    p.add_argument('--workers', type=int, help='Processes fitting and scoring the shards (default: all CPUs)')
+    p.set_defaults(fn=analyze)
+
+    p = commands.add_parser('link', help='Build the linked event store from data/given')
+    p.add_argument('data_dir', nargs='?', default='data/given')
+    p.add_argument('--out', default='event_store.parquet')
+    p.add_argument('--keep-unresolved', action='store_true')
+    p.add_argument('--detections', help='Face detections (person_id or embedding per frame_id, or per '
+                                        'location_id and timestamp) to fill missing CCTV face_ids')
+    p.add_argument('--gallery', help='Face database pickle for detections that carry embeddings')
+    p.add_argument('--location', help='location_id of the footage the detections came from')
+    p.add_argument('--start', help='Wall-clock time of the first video frame (timestamps are seconds into it)')
+    p.add_argument('--threshold', type=float, default=0.6, help='Minimum gallery similarity')
+    p.set_defaults(fn=link)
+
+    p = commands.add_parser('load-db', help='Load the data/given sources into a database')
+    p.add_argument('url', help="e.g. 'sqlite:///campus_security.db' or 'mysql://user:pw@host/campus'")
+    p.add_argument('data_dir', nargs='?', default='data/given')
+    p.add_argument('--batch-size', type=int, default=5000)
+    p.set_defaults(fn=load_db)
+
+    p = commands.add_parser('faces', help='Detect and embed faces in CCTV footage')
+    p.add_argument('video')
+    p.add_argument('--model', default='Facenet512')
+    p.add_argument('--database', help='Pickled face database')
+    p.add_argument('--sample-rate', type=int, default=30)
+    p.add_argument('--report', default='face_recognition_report.csv')
+    p.set_defaults(fn=faces)
+
+    p = commands.add_parser('stream-fit', help='Fit the streaming anomaly model on data/given')
+    p.add_argument('data_dir', nargs='?', default='data/given')
+    p.add_argument('--out', default='stream_model.pkl')
+    p.add_argument('--features', help='Also save the per-entity state reached after the history')
+    p.add_argument('--contamination', type=float, default=0.01)
+    p.set_defaults(fn=stream_fit)
+
+    p = commands.add_parser('stream', help='Score swipe or Wi-Fi rows appended to a CSV file')
+    p.add_argument('file')
+    p.add_argument('--source', required=True, choices=['card_swipes', 'wifi_logs'])
+    p.add_argument('--model', default='stream_model.pkl')
+    p.add_argument('--data-dir', default='data/given', help='Directory with the profiles CSV')
+    p.add_argument('--features', help='Per-entity state snapshot to resume from and save on exit')
+    p.add_argument('--database', help='Also write alerts to this database URL')
+    p.add_argument('--max-batch', type=int, default=512)
+    p.add_argument('--once', action='store_true', help='Stop at the end of the file instead of following it')
+    p.set_defaults(fn=stream)
+
+    args = parser.parse_args(argv)
+    return args.fn(args) or 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
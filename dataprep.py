@@ -1,71 +1,25 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-import re
+from schemas import parse_timestamps
+from storage import save_frame, export_excel
+from synthetic import SyntheticDataGenerator
 
 class DataPreparation:
     """Handles data cleaning, preprocessing, and feature engineering"""
     
+    # Columns stored as categoricals during feature engineering
+    CATEGORICAL_COLS = ['student_id', 'card_id', 'mac_address', 'building', 'activity_type']
+    
     def __init__(self):
         self.feature_cols = []
+        self.feature_state = None
         
-    def create_sample_dataset(self, num_records=500):
+    def create_sample_dataset(self, num_records=500, num_entities=100, anomaly_rate=0.15, days=30, seed=42):
         """Create sample campus security dataset"""
-        np.random.seed(42)
-        
-        # Generate base data
-        student_ids = [f"STU{str(i).zfill(5)}" for i in range(1, 101)]
-        card_ids = [f"CARD{str(i).zfill(6)}" for i in range(1, 101)]
-        mac_addresses = [self._generate_mac() for _ in range(100)]
-        buildings = ['Main Building', 'Library', 'Lab A', 'Lab B', 'Cafeteria', 'Gym', 'Dorm A', 'Dorm B']
-        activities = ['Entry', 'Exit', 'Card Swipe', 'WiFi Login', 'Lab Access', 'Library Check-in']
-        
-        records = []
-        start_date = datetime.now() - timedelta(days=30)
-        
-        for i in range(num_records):
-            # Normal pattern: 85% normal, 15% anomalous
-            is_anomaly = np.random.random() > 0.85
-            
-            student_id = np.random.choice(student_ids)
-            idx = student_ids.index(student_id)
-            
-            record = {
-                'record_id': f"REC{str(i+1).zfill(6)}",
-                'timestamp': start_date + timedelta(
-                    days=np.random.randint(0, 30),
-                    hours=np.random.randint(6, 23) if not is_anomaly else np.random.randint(0, 24),
-                    minutes=np.random.randint(0, 60)
-                ),
-                'student_id': student_id,
-                'card_id': card_ids[idx],
-                'mac_address': mac_addresses[idx],
-                'building': np.random.choice(buildings),
-                'activity_type': np.random.choice(activities),
-                'duration_minutes': np.random.randint(5, 240) if not is_anomaly else np.random.randint(1, 600),
-                'access_granted': True if not is_anomaly else np.random.choice([True, False]),
-                'device_type': np.random.choice(['Mobile', 'Laptop', 'Desktop', 'Tablet']),
-                'ip_address': self._generate_ip(),
-            }
-            
-            # Add some missing values randomly
-            if np.random.random() > 0.95:
-                record['duration_minutes'] = np.nan
-            if np.random.random() > 0.98:
-                record['device_type'] = np.nan
-                
-            records.append(record)
-        
-        df = pd.DataFrame(records)
-        return df.sort_values('timestamp').reset_index(drop=True)
-    
-    def _generate_mac(self):
-        """Generate random MAC address"""
-        return ":".join([f"{np.random.randint(0, 256):02x}" for _ in range(6)])
-    
-    def _generate_ip(self):
-        """Generate random IP address"""
-        return f"192.168.{np.random.randint(1, 255)}.{np.random.randint(1, 255)}"
+        generator = SyntheticDataGenerator(
+            num_entities=num_entities, anomaly_rate=anomaly_rate, days=days, seed=seed
+        )
+        return generator.generate_activity(num_records)
     
     def clean_data(self, df):
         """Clean and validate data"""
@@ -76,7 +30,7 @@ class DataPreparation:
         
         # Validate timestamp
         if 'timestamp' in df_clean.columns:
-            df_clean['timestamp'] = pd.to_datetime(df_clean['timestamp'], errors='coerce')
+            df_clean['timestamp'] = parse_timestamps(df_clean['timestamp'])
             df_clean = df_clean.dropna(subset=['timestamp'])
         
         # Validate student IDs
@@ -91,44 +45,144 @@ class DataPreparation:
         print(f"Cleaned data: {len(df)} -> {len(df_clean)} records")
         return df_clean
     
-    def engineer_features(self, df):
-        """Create additional features for ML models"""
-        df_feat = df.copy()
+    def engineer_features(self, df, inplace=False):
+        """Create additional features for ML models
+        
+        ID and location columns are converted to categoricals once, and the
+        per-entity/per-location counts all come from one aggregation pass
+        over the category codes. The aggregates are kept in `feature_state`
+        so appended data can be featurized with `append_features`.
+        """
+        df_feat = df if inplace else df.copy(deep=False)
+        self._to_categorical(df_feat)
+        
+        self.feature_state = self._aggregate(df_feat)
+        if 'duration_minutes' in df_feat.columns:
+            self.feature_state['duration_median'] = df_feat['duration_minutes'].median()
         
-        # Temporal features
-        if 'timestamp' in df_feat.columns:
-            df_feat['hour'] = df_feat['timestamp'].dt.hour
-            df_feat['day_of_week'] = df_feat['timestamp'].dt.dayofweek
-            df_feat['is_weekend'] = df_feat['day_of_week'].isin([5, 6]).astype(int)
-            df_feat['is_night'] = ((df_feat['hour'] >= 22) | (df_feat['hour'] <= 6)).astype(int)
-            df_feat['is_business_hours'] = ((df_feat['hour'] >= 9) & (df_feat['hour'] <= 17)).astype(int)
+        self._add_features(df_feat)
+        
+        print(f"Feature engineering complete. Total features: {len(df_feat.columns)}")
+        return df_feat
+    
+    def append_features(self, df_new):
+        """Featurize newly arrived rows, folding them into the stored aggregates
         
+        Count features of the new rows reflect all data seen so far. Rows
+        featurized earlier keep their old counts until `refresh_counts` is
+        called on them, which only re-maps and does not re-aggregate.
+        """
+        if self.feature_state is None:
+            return self.engineer_features(df_new)
+        
+        df_feat = df_new.copy(deep=False)
+        self._to_categorical(df_feat)
+        
+        update = self._aggregate(df_feat)
+        for key in ('entity_counts', 'location_counts', 'entity_locations'):
+            self.feature_state[key] = self.feature_state[key].add(update[key], fill_value=0).astype('int64')
+        
+        self._add_features(df_feat)
+        return df_feat
+    
+    def refresh_counts(self, df_feat):
+        """Re-map count features of already featurized rows from the current aggregates"""
+        self._add_count_features(df_feat)
+        self._add_diversity_feature(df_feat)
+        return df_feat
+    
+    def _to_categorical(self, df):
+        """Convert ID and location columns to categoricals (replaces columns, no data copy)"""
+        for col in self.CATEGORICAL_COLS:
+            if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype('category')
+    
+    def _aggregate(self, df):
+        """Per-entity, per-location and per-(entity, location) counts
+        
+        Works directly on the category codes: one bincount each for entities
+        and locations, and one over the combined (entity, location) code.
+        """
+        empty = pd.Series(dtype='int64')
+        state = {'entity_counts': empty, 'location_counts': empty, 'entity_locations': empty}
+        
+        def counts(col):
+            codes = col.cat.codes.to_numpy()
+            labels = col.cat.categories
+            tally = np.bincount(codes[codes >= 0], minlength=len(labels))
+            seen = np.flatnonzero(tally)
+            return codes, labels, pd.Series(tally[seen], index=labels[seen].astype(object))
+        
+        if 'student_id' in df.columns:
+            s_codes, s_labels, state['entity_counts'] = counts(df['student_id'])
+        if 'building' in df.columns:
+            b_codes, b_labels, state['location_counts'] = counts(df['building'])
+        
+        if 'student_id' in df.columns and 'building' in df.columns:
+            known = (s_codes >= 0) & (b_codes >= 0)
+            pair_codes = s_codes[known].astype('int64') * len(b_labels) + b_codes[known]
+            pairs, tally = np.unique(pair_codes, return_counts=True)
+            index = pd.MultiIndex.from_arrays([
+                s_labels[pairs // len(b_labels)].astype(object),
+                b_labels[pairs % len(b_labels)].astype(object),
+            ], names=['student_id', 'building'])
+            state['entity_locations'] = pd.Series(tally, index=index)
+        
+        return state
+    
+    def _lookup(self, col, mapping):
+        """Map a categorical column through a per-label Series via its codes"""
+        per_category = mapping.reindex(col.cat.categories).to_numpy(dtype=float)
+        codes = col.cat.codes.to_numpy()
+        if len(per_category) == 0:
+            values = np.full(len(codes), np.nan)
+        else:
+            values = np.where(codes >= 0, per_category[codes], np.nan)
+        if not np.isnan(values).any():
+            values = values.astype('int64')
+        return pd.Series(values, index=col.index)
+    
+    def _add_count_features(self, df_feat):
         # Activity frequency features
         if 'student_id' in df_feat.columns:
-            activity_counts = df_feat.groupby('student_id').size()
-            df_feat['user_activity_count'] = df_feat['student_id'].map(activity_counts)
+            df_feat['user_activity_count'] = self._lookup(df_feat['student_id'], self.feature_state['entity_counts'])
         
         if 'building' in df_feat.columns:
-            building_counts = df_feat.groupby('building').size()
-            df_feat['building_traffic'] = df_feat['building'].map(building_counts)
+            df_feat['building_traffic'] = self._lookup(df_feat['building'], self.feature_state['location_counts'])
+    
+    def _add_diversity_feature(self, df_feat):
+        # Location diversity
+        if 'student_id' in df_feat.columns and 'building' in df_feat.columns:
+            diversity = self.feature_state['entity_locations'].groupby(level=0).size()
+            df_feat['location_diversity'] = self._lookup(df_feat['student_id'], diversity)
+    
+    def _add_features(self, df_feat):
+        # Temporal features
+        if 'timestamp' in df_feat.columns:
+            hour = df_feat['timestamp'].dt.hour
+            day_of_week = df_feat['timestamp'].dt.dayofweek
+            df_feat['hour'] = hour
+            df_feat['day_of_week'] = day_of_week
+            df_feat['is_weekend'] = (day_of_week >= 5).astype('int8')
+            df_feat['is_night'] = ((hour >= 22) | (hour <= 6)).astype('int8')
+            df_feat['is_business_hours'] = ((hour >= 9) & (hour <= 17)).astype('int8')
+        
+        self._add_count_features(df_feat)
         
         # Duration features
         if 'duration_minutes' in df_feat.columns:
-            df_feat['duration_minutes'] = df_feat['duration_minutes'].fillna(df_feat['duration_minutes'].median())
-            df_feat['is_long_duration'] = (df_feat['duration_minutes'] > 180).astype(int)
-            df_feat['is_short_duration'] = (df_feat['duration_minutes'] < 10).astype(int)
+            median = self.feature_state.get('duration_median')
+            if median is None:
+                median = df_feat['duration_minutes'].median()
+            df_feat['duration_minutes'] = df_feat['duration_minutes'].fillna(median)
+            df_feat['is_long_duration'] = (df_feat['duration_minutes'] > 180).astype('int8')
+            df_feat['is_short_duration'] = (df_feat['duration_minutes'] < 10).astype('int8')
         
         # Access pattern features
         if 'access_granted' in df_feat.columns:
-            df_feat['access_denied'] = (~df_feat['access_granted']).astype(int)
-        
-        # Location diversity
-        if 'student_id' in df_feat.columns and 'building' in df_feat.columns:
-            location_diversity = df_feat.groupby('student_id')['building'].nunique()
-            df_feat['location_diversity'] = df_feat['student_id'].map(location_diversity)
+            df_feat['access_denied'] = (~df_feat['access_granted'].astype(bool)).astype('int8')
         
-        print(f"Feature engineering complete. Total features: {len(df_feat.columns)}")
-        return df_feat
+        self._add_diversity_feature(df_feat)
     
     def split_train_test(self, df, test_size=0.2):
         """Split data into training and testing sets"""
@@ -141,28 +195,15 @@ class DataPreparation:
         
         return train_df, test_df
     
-    def export_to_excel(self, df, filename='campus_data.xlsx'):
+    def save_dataset(self, df, filename='campus_data.parquet'):
+        """Save dataframe as a columnar file (Parquet or Feather)"""
+        path = save_frame(df, filename)
+        print(f"Data saved to {path}")
+        return path
+    
+    def export_to_excel(self, df, filename='campus_data.xlsx', autosize=True):
         """Export dataframe to Excel with formatting"""
-        with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Data', index=False)
-            
-            # Get workbook and worksheet
-            workbook = writer.book
-            worksheet = writer.sheets['Data']
-            
-            # Auto-adjust column widths
-            for column in worksheet.columns:
-                max_length = 0
-                column = [cell for cell in column]
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(cell.value)
-                    except:
-                        pass
-                adjusted_width = (max_length + 2)
-                worksheet.column_dimensions[column[0].column_letter].width = adjusted_width
-        
+        export_excel(df, filename, autosize=autosize)
         print(f"Data exported to {filename}")
 
 # Example usage
@@ -182,9 +223,9 @@ if __name__ == "__main__":
     # Split data
     train_df, test_df = prep.split_train_test(df_features)
     
-    # Export to Excel
-    prep.export_to_excel(df_features, 'campus_data_prepared.xlsx')
-    prep.export_to_excel(train_df, 'campus_train_data.xlsx')
-    prep.export_to_excel(test_df, 'campus_test_data.xlsx')
+    # Save columnar artifacts (use export_to_excel for spreadsheet exports)
+    prep.save_dataset(df_features, 'campus_data_prepared.parquet')
+    prep.save_dataset(train_df, 'campus_train_data.parquet')
+    prep.save_dataset(test_df, 'campus_test_data.parquet')
     
     print("\n✓ Data preparation complete!")
\ No newline at end of file
@@ -0,0 +1,369 @@
+"""
+Dataset Registry for Campus Security System
+Named, session-scoped datasets for concurrent API serving: copy-on-write
+snapshots, readers-writer locking, memory-based eviction and optional
+sharing between worker processes through memory-mapped Arrow files
+"""
+
+import json
+import os
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+from featurestore import FeatureStore
+from queryengine import QueryIndex
+
+
+class RWLock:
+    """Readers-writer lock: many readers or one writer; waiting writers go first"""
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class Dataset:
+    """
+    One published version of a named dataset
+
+    The frame and its indexes are never modified after publishing; an upload
+    publishes a new Dataset instead, so requests holding the old one keep a
+    consistent view. Analysis results are attached per version.
+    """
+
+    def __init__(self, key, frame, version, feature_store=None, feature_lock=None):
+        self.key = key
+        self.frame = frame
+        self.version = version
+        self.query_index = QueryIndex(frame)
+        # The rolling feature store carries over between versions of a dataset
+        self.feature_store = feature_store if feature_store is not None else FeatureStore()
+        self.feature_lock = feature_lock if feature_lock is not None else threading.Lock()
+        # Point-in-time rolling features of this version's rows, as computed
+        # when the rows were folded into the feature store
+        self.rolling_features = None
+        self.analysis_results = None
+        self.results_version = 0
+        self.nbytes = int(frame.memory_usage(deep=True).sum())
+        self.last_access = time.monotonic()
+
+    def info(self):
+        return {
+            'dataset': self.key,
+            'version': self.version,
+            'records': len(self.frame),
+            'bytes': self.nbytes,
+            'analysed': self.analysis_results is not None,
+        }
+
+
+class DatasetRegistry:
+    """
+    Thread-safe map of dataset key -> current Dataset
+
+    Keys are "<session>/<name>". When the total size of loaded datasets
+    exceeds `max_bytes`, least recently used datasets are evicted. With a
+    `shared_dir`, published frames are also written there as Arrow IPC
+    files, and every worker process memory-maps the latest version on
+    access, so read-only data is shared through the page cache. Analysis
+    results, feature store snapshots and each version's point-in-time
+    features are written next to them and picked up the same way, so any
+    worker can answer for them.
+    """
+
+    def __init__(self, max_bytes=None, shared_dir=None):
+        self.max_bytes = max_bytes
+        self.shared_dir = Path(shared_dir) if shared_dir else None
+        self.datasets = OrderedDict()
+        self.lock = RWLock()
+        self._manifest_mtimes = {}
+        # {(key, file name): mtime_ns} of results/features files already loaded
+        self._shared_mtimes = {}
+        if self.shared_dir is not None:
+            self.shared_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def make_key(session, name):
+        return f"{session or 'public'}/{name or 'default'}"
+
+    def get(self, key):
+        """Current Dataset for key, or None"""
+        if self.shared_dir is not None:
+            self._refresh_shared(key)
+        with self.lock.read():
+            dataset = self.datasets.get(key)
+        if dataset is not None:
+            dataset.last_access = time.monotonic()
+        return dataset
+
+    def publish(self, key, frame, version=None, share=True):
+        """
+        Make frame the current version of key
+
+        Indexes are built before taking the write lock, so readers are only
+        blocked for the pointer swap. With share=False the frame is not
+        written to the shared directory.
+        """
+        with self.lock.read():
+            previous = self.datasets.get(key)
+        if version is None:
+            version = time.time_ns()
+
+        dataset = Dataset(
+            key, frame, version,
+            feature_store=previous.feature_store if previous else None,
+            feature_lock=previous.feature_lock if previous else None,
+        )
+
+        with self.lock.write():
+            self.datasets[key] = dataset
+            self.datasets.move_to_end(key)
+            self._evict(keep=key)
+
+        if share and self.shared_dir is not None:
+            self._write_shared(dataset)
+        return dataset
+
+    def set_results(self, key, version, results):
+        """Attach analysis results if `version` is still the current one"""
+        dataset = self.get(key)
+        if dataset is None or dataset.version != version:
+            return False
+        dataset.analysis_results = results
+        # A timestamp rather than a counter, so every worker derives the same ETag
+        dataset.results_version = time.time_ns()
+        if self.shared_dir is not None:
+            payload = {'version': version, 'results_version': dataset.results_version, 'results': results}
+            self._write_file(key, 'results.json', json.dumps(payload, default=str).encode('utf-8'))
+        return True
+
+    def share_features(self, dataset):
+        """
+        Write the dataset's feature store (and its version's point-in-time
+        features) for the other workers, after updating it
+        """
+        if self.shared_dir is None:
+            return
+        with dataset.feature_lock:
+            payload = pickle.dumps(dataset.feature_store)
+            rolling = dataset.rolling_features
+        self._write_file(dataset.key, 'features.pkl', payload)
+        if rolling is not None:
+            import pyarrow as pa
+
+            folder = self._shared_path(dataset.key)
+            path = folder / self._rolling_name(dataset.version)
+            _write_arrow(pa.Table.from_pandas(rolling, preserve_index=False), path)
+            for old in folder.glob('rolling.*.arrow'):
+                if old.name != path.name:
+                    old.unlink(missing_ok=True)
+
+    def drop(self, key):
+        with self.lock.write():
+            return self.datasets.pop(key, None) is not None
+
+    def list(self, session=None):
+        """Info for all loaded datasets, or only those of one session"""
+        prefix = f"{session}/" if session is not None else ''
+        with self.lock.read():
+            return [dataset.info() for key, dataset in self.datasets.items() if key.startswith(prefix)]
+
+    def total_bytes(self):
+        with self.lock.read():
+            return sum(dataset.nbytes for dataset in self.datasets.values())
+
+    def _evict(self, keep):
+        """Drop least recently used datasets beyond max_bytes (write lock held)"""
+        if self.max_bytes is None:
+            return
+        total = sum(dataset.nbytes for dataset in self.datasets.values())
+        by_age = sorted(self.datasets.values(), key=lambda d: d.last_access)
+        for dataset in by_age:
+            if total <= self.max_bytes:
+                break
+            if dataset.key == keep:
+                continue
+            del self.datasets[dataset.key]
+            total -= dataset.nbytes
+            print(f"Evicted dataset {dataset.key} ({dataset.nbytes} bytes)")
+
+    # ------------------------------------------------------------------
+    # Sharing between worker processes
+    # ------------------------------------------------------------------
+
+    def _shared_path(self, key):
+        return self.shared_dir / re.sub(r'[^A-Za-z0-9_.-]', '_', key)
+
+    def _write_shared(self, dataset):
+        import pyarrow as pa
+
+        folder = self._shared_path(dataset.key)
+        folder.mkdir(parents=True, exist_ok=True)
+        data_file = folder / f"{dataset.version}.arrow"
+
+        _write_arrow(pa.Table.from_pandas(dataset.frame, preserve_index=False), data_file)
+
+        manifest = folder / 'manifest.json'
+        try:
+            previous = json.loads(manifest.read_text())['file']
+        except FileNotFoundError:
+            previous = None
+        tmp = manifest.with_suffix('.tmp')
+        tmp.write_text(json.dumps({'key': dataset.key, 'version': dataset.version, 'file': data_file.name}))
+        os.replace(tmp, manifest)
+        self._manifest_mtimes[dataset.key] = manifest.stat().st_mtime_ns
+
+        # The superseded file stays until the next publish, for workers that
+        # read the old manifest just before the swap; mapped files stay
+        # readable after unlinking
+        for old in folder.glob('[0-9]*.arrow'):
+            if old.name not in (data_file.name, previous):
+                old.unlink(missing_ok=True)
+
+    @staticmethod
+    def _rolling_name(version):
+        return f"rolling.{version}.arrow"
+
+    def _write_file(self, key, name, payload):
+        """Atomically replace a file in the dataset's shared folder"""
+        folder = self._shared_path(key)
+        folder.mkdir(parents=True, exist_ok=True)
+        path = folder / name
+        tmp = path.with_suffix('.tmp')
+        tmp.write_bytes(payload)
+        os.replace(tmp, path)
+        self._shared_mtimes[(key, name)] = path.stat().st_mtime_ns
+
+    def _changed(self, key, name):
+        """Path of a shared file if it changed since this worker last loaded it"""
+        path = self._shared_path(key) / name
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None, None
+        if self._shared_mtimes.get((key, name)) == mtime:
+            return None, None
+        return path, mtime
+
+    def _refresh_state(self, key):
+        """Load results and feature store snapshots written by other workers"""
+        with self.lock.read():
+            dataset = self.datasets.get(key)
+        if dataset is None:
+            return
+
+        path, mtime = self._changed(key, 'results.json')
+        if path is not None:
+            payload = json.loads(path.read_bytes())
+            if payload['version'] == dataset.version:
+                dataset.analysis_results = payload['results']
+                dataset.results_version = payload['results_version']
+            self._shared_mtimes[(key, 'results.json')] = mtime
+
+        path, mtime = self._changed(key, 'features.pkl')
+        if path is not None:
+            store = pickle.loads(path.read_bytes())
+            with dataset.feature_lock:
+                dataset.feature_store = store
+            self._shared_mtimes[(key, 'features.pkl')] = mtime
+
+        if dataset.rolling_features is None:
+            # Written once per version, so only looked for until found
+            try:
+                rolling = load_shared_frame(self._shared_path(key) / self._rolling_name(dataset.version))
+            except FileNotFoundError:
+                rolling = None
+            if rolling is not None and len(rolling) == len(dataset.frame):
+                with dataset.feature_lock:
+                    dataset.rolling_features = rolling
+
+    def _refresh_shared(self, key, attempts=3):
+        """Load the version in the shared directory if it is newer or was evicted here"""
+        manifest = self._shared_path(key) / 'manifest.json'
+        for _ in range(attempts):
+            try:
+                mtime = manifest.stat().st_mtime_ns
+            except FileNotFoundError:
+                return
+            with self.lock.read():
+                current = self.datasets.get(key)
+            if current is not None and self._manifest_mtimes.get(key) == mtime:
+                break
+
+            info = json.loads(manifest.read_text())
+            if current is None or current.version != info['version']:
+                try:
+                    frame = load_shared_frame(manifest.parent / info['file'])
+                except FileNotFoundError:
+                    # Superseded twice since the manifest was read: read it again
+                    continue
+                self.publish(key, frame, info['version'], share=False)
+                # The new Dataset starts without results or features: reload them
+                self._shared_mtimes.pop((key, 'results.json'), None)
+                self._shared_mtimes.pop((key, 'features.pkl'), None)
+            self._manifest_mtimes[key] = mtime
+            break
+        self._refresh_state(key)
+
+
+def _write_arrow(table, path):
+    """Atomically write an Arrow IPC file"""
+    import pyarrow as pa
+
+    tmp = path.with_suffix('.tmp')
+    with pa.OSFile(str(tmp), 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+
+
+def load_shared_frame(path):
+    """
+    Read a memory-mapped Arrow IPC file back into the frame that was published
+
+    Dictionary columns come back as categoricals and the rest as NumPy (or
+    pandas string) dtypes, so every worker runs the analysis on the same
+    dtypes as the uploading one; numeric columns without nulls stay backed
+    by the mapped buffers.
+    """
+    import pyarrow as pa
+
+    source = pa.memory_map(str(path), 'r')
+    table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(split_blocks=True)
@@ -1,14 +1,17 @@
 """
 Face Recognition Module for Campus Security System
 Handles CCTV footage processing, face detection, embedding generation, and identity matching
+
+OpenCV, DeepFace (and with it TensorFlow) and scikit-learn are imported
+inside the methods that use them, so importing this module is cheap and
+gallery-only work (identify_face, detect_duplicates, database I/O) never
+loads the model stack.
 """
 
-import cv2
 import numpy as np
-from deepface import DeepFace
-from sklearn.metrics.pairwise import cosine_similarity
 import pandas as pd
 from pathlib import Path
+import os
 import pickle
 import json
 from datetime import datetime
@@ -50,6 +53,8 @@ class FaceRecognitionSystem:
         Returns:
             list of face dictionaries with coordinates and cropped faces
         """
+        from deepface import DeepFace
+        
         try:
             # Detect faces using DeepFace backend
             face_objs = DeepFace.extract_faces(
@@ -77,12 +82,19 @@ class FaceRecognitionSystem:
         """
         Generate face embedding from a single face image
         
+        Every embedding (CLI, API, video) comes from here, so they all share
+        DeepFace.represent's preprocessing and stay comparable with saved
+        databases.
+        
         Args:
-            face_image: numpy array of face image
+            face_image: numpy array of a face (e.g. a crop from
+                extract_faces_from_frame)
             
         Returns:
-            numpy array: face embedding vector
+            numpy array: face embedding vector, or None on failure
         """
+        from deepface import DeepFace
+        
         try:
             # Generate embedding using DeepFace
             embedding_obj = DeepFace.represent(
@@ -93,12 +105,57 @@ class FaceRecognitionSystem:
             
             # Extract embedding vector
             embedding = np.array(embedding_obj[0]['embedding'])
-            return embedding
-            
         except Exception as e:
             print(f"Error generating embedding: {e}")
             return None
-    
+        
+        if embedding.size == 0 or not np.isfinite(embedding).all():
+            print("Error generating embedding: empty or non-finite vector")
+            return None
+        return embedding
+
+    def generate_embeddings(self, face_images):
+        """
+        Generate embeddings for several face images with the warm model
+
+        Args:
+            face_images: List of face arrays as returned by
+                extract_faces_from_frame
+
+        Returns:
+            list (one per face) of embeddings, None where embedding failed
+        """
+        return [self.generate_embedding(face) for face in face_images]
+
+    def embed_images(self, images):
+        """
+        Embed the most confident face of each full image
+        
+        Args:
+            images: List of images (BGR arrays, e.g. from cv2.imread)
+            
+        Returns:
+            list (one per image) of embeddings, None where no face was found
+        """
+        results = []
+        for image in images:
+            faces = self.extract_faces_from_frame(image) if image is not None else []
+            best = max(faces, key=lambda f: f['confidence']) if faces else None
+            results.append(self.generate_embedding(best['face_array']) if best else None)
+        return results
+
+    def warm_up(self):
+        """
+        Load the recognition model and run one dummy inference, so the
+        first real request does not pay for model construction
+        """
+        from deepface import DeepFace
+
+        # DeepFace keeps built models, so represent() reuses this one
+        DeepFace.build_model(self.model_name)
+        self.generate_embedding(np.zeros((160, 160, 3), dtype=np.uint8))
+        print(f"Model {self.model_name} loaded")
+
     def process_cctv_footage(self, video_path, sample_rate=30):
         """
         Process CCTV footage and extract face embeddings
@@ -110,6 +167,8 @@ class FaceRecognitionSystem:
         Returns:
             list of detected faces with embeddings and timestamps
         """
+        import cv2
+        
         cap = cv2.VideoCapture(video_path)
         fps = cap.get(cv2.CAP_PROP_FPS)
         frame_count = 0
@@ -163,6 +222,8 @@ class FaceRecognitionSystem:
         Returns:
             dict: {person_id: [embeddings]}
         """
+        import cv2
+        
         folder = Path(folder_path)
         
         for person_folder in folder.iterdir():
@@ -173,21 +234,16 @@ class FaceRecognitionSystem:
                 
                 print(f"Processing person: {person_id}")
                 
-                for image_path in person_folder.glob('*'):
-                    if image_path.suffix.lower() in ['.jpg', '.jpeg', '.png']:
-                        try:
-                            # Read image
-                            img = cv2.imread(str(image_path))
-                            
-                            # Generate embedding
-                            embedding = self.generate_embedding(img)
-                            
-                            if embedding is not None:
-                                embeddings.append(embedding)
-                                images.append(str(image_path))
-                        
-                        except Exception as e:
-                            print(f"Error processing {image_path}: {e}")
+                paths = [p for p in person_folder.glob('*') if p.suffix.lower() in ['.jpg', '.jpeg', '.png']]
+                try:
+                    # Embed each image's most confident face, as the API's
+                    # enrollment does
+                    for image_path, embedding in zip(paths, self.embed_images([cv2.imread(str(p)) for p in paths])):
+                        if embedding is not None:
+                            embeddings.append(embedding)
+                            images.append(str(image_path))
+                except Exception as e:
+                    print(f"Error processing {person_folder}: {e}")
                 
                 if embeddings:
                     self.face_database[person_id] = embeddings
@@ -209,17 +265,15 @@ class FaceRecognitionSystem:
             person_id: Unique identifier (e.g., student_id)
             image_paths: List of image file paths for this person
         """
+        import cv2
+        
         embeddings = []
         
-        for img_path in image_paths:
-            try:
-                img = cv2.imread(img_path)
-                embedding = self.generate_embedding(img)
-                
-                if embedding is not None:
-                    embeddings.append(embedding)
-            except Exception as e:
-                print(f"Error processing {img_path}: {e}")
+        try:
+            embedded = self.embed_images([cv2.imread(str(p)) for p in image_paths])
+            embeddings = [e for e in embedded if e is not None]
+        except Exception as e:
+            print(f"Error processing images of {person_id}: {e}")
         
         if embeddings:
             if person_id in self.face_database:
@@ -250,6 +304,8 @@ class FaceRecognitionSystem:
             float: Similarity score (0-1, higher is more similar)
         """
         if self.distance_metric == 'cosine':
+            from sklearn.metrics.pairwise import cosine_similarity
+            
             similarity = cosine_similarity(
                 embedding1.reshape(1, -1),
                 embedding2.reshape(1, -1)
@@ -343,6 +399,8 @@ class FaceRecognitionSystem:
         Args:
             camera_index: Camera device index (default 0 for webcam)
         """
+        import cv2
+        
         cap = cv2.VideoCapture(camera_index)
         frame_count = 0
         
@@ -405,8 +463,12 @@ class FaceRecognitionSystem:
             'metric': self.distance_metric
         }
         
-        with open(filepath, 'wb') as f:
+        # Written beside the target and swapped in, so readers (other API
+        # workers) never load a half-written file
+        tmp = f"{filepath}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
             pickle.dump(data, f)
+        os.replace(tmp, filepath)
         
         print(f"Database saved to {filepath}")
     
@@ -0,0 +1,442 @@
+"""
+Face Recognition Service for Campus Security System
+One warm, shared face model and gallery for the API: vectorized gallery
+matching and micro-batching of concurrent identification requests
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import numpy as np
+
+
+class FaceGallery:
+    """
+    Enrolled face embeddings as a single matrix
+
+    Rows are grouped by person, so one matrix product scores a batch of
+    queries against every stored embedding and per-person best/average
+    similarities come from `reduceat` over the row groups. Updates build
+    new arrays and swap them in, so concurrent matching never sees a
+    half-updated gallery.
+    """
+
+    def __init__(self, distance_metric='cosine'):
+        self.distance_metric = distance_metric
+        self.lock = threading.Lock()
+        self._set({})
+
+    @classmethod
+    def from_database(cls, face_database, distance_metric='cosine'):
+        """Build from FaceRecognitionSystem.face_database ({person_id: [embeddings]})"""
+        gallery = cls(distance_metric)
+        gallery._set({person: list(embs) for person, embs in face_database.items() if len(embs)})
+        return gallery
+
+    def _set(self, people):
+        person_ids = list(people)
+        counts = np.array([len(people[p]) for p in person_ids], dtype=np.int64)
+        if person_ids:
+            matrix = np.vstack([np.asarray(people[p], dtype=np.float32) for p in person_ids])
+        else:
+            matrix = np.empty((0, 0), dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1) if matrix.size else np.empty(0, dtype=np.float32)
+
+        # One tuple assignment, so readers always see a consistent state
+        self._state = (
+            people,
+            np.array(person_ids, dtype=object),
+            counts,
+            np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64) if len(counts) else counts,
+            matrix,
+            norms,
+        )
+
+    def add(self, person_id, embeddings):
+        """Append embeddings for a person (new or existing)"""
+        embeddings = [np.asarray(e, dtype=np.float32) for e in embeddings]
+        with self.lock:
+            people = dict(self._state[0])
+            people[person_id] = list(people.get(person_id, [])) + embeddings
+            self._set(people)
+
+    def __len__(self):
+        return len(self._state[1])
+
+    @property
+    def num_embeddings(self):
+        return len(self._state[4])
+
+    def similarities(self, queries):
+        """
+        Similarity of each query to every stored embedding
+
+        Returns:
+            (num_queries, num_embeddings) array; cosine similarity, or
+            1 / (1 + euclidean distance) for the euclidean metric
+        """
+        _, _, _, _, matrix, norms = self._state
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        dots = queries @ matrix.T
+        query_norms = np.linalg.norm(queries, axis=1)
+
+        if self.distance_metric == 'cosine':
+            return dots / np.maximum(np.outer(query_norms, norms), 1e-12)
+        if self.distance_metric == 'euclidean':
+            squared = query_norms[:, None] ** 2 + norms[None, :] ** 2 - 2 * dots
+            return 1 / (1 + np.sqrt(np.maximum(squared, 0)))
+        raise ValueError(f"Unknown distance metric: {self.distance_metric}")
+
+    def match(self, queries, top_k=3):
+        """
+        Best matching people for each query embedding
+
+        Args:
+            queries: (num_queries, dim) embeddings
+            top_k: Matches returned per query
+
+        Returns:
+            list (one per query) of match dicts in the same shape as
+            FaceRecognitionSystem.identify_face
+        """
+        _, person_ids, counts, starts, matrix, _ = self._state
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if not len(person_ids) or not len(queries):
+            return [[] for _ in range(len(queries))]
+
+        sims = self.similarities(queries)
+        best = np.maximum.reduceat(sims, starts, axis=1)
+        average = np.add.reduceat(sims, starts, axis=1) / counts
+
+        k = min(top_k, len(person_ids))
+        top = np.argpartition(-best, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in enumerate(top):
+            order = candidates[np.argsort(-best[row, candidates])]
+            results.append([
+                {
+                    'person_id': person_ids[i],
+                    'max_similarity': float(best[row, i]),
+                    'avg_similarity': float(average[row, i]),
+                    'num_comparisons': int(counts[i]),
+                }
+                for i in order
+            ])
+        return results
+
+    def best(self, queries, batch_size=4096):
+        """
+        Single best matching person per query, as arrays
+
+        Same scores as match(..., top_k=1) without building match dicts;
+        queries are scored batch_size at a time so the similarity matrix
+        stays bounded for large detection logs.
+
+        Returns:
+            (person_ids, similarities) - object array (None if the gallery
+            is empty) and float32 array, one entry per query
+        """
+        _, person_ids, counts, _, matrix, norms = self._state
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        people = np.full(len(queries), None, dtype=object)
+        scores = np.zeros(len(queries), dtype=np.float32)
+        if not len(person_ids):
+            return people, scores
+
+        # The best person owns the single most similar embedding, so no
+        # per-person reduction is needed; for cosine, unit-length gallery
+        # rows leave only the per-query norm to divide out
+        owners = np.repeat(np.arange(len(person_ids)), counts)
+        if self.distance_metric == 'cosine':
+            unit = matrix / np.maximum(norms, 1e-12)[:, None]
+        for start in range(0, len(queries), batch_size):
+            batch = queries[start:start + batch_size]
+            rows = np.arange(len(batch))
+            if self.distance_metric == 'cosine':
+                dots = batch @ unit.T
+                top = dots.argmax(axis=1)
+                best = dots[rows, top] / np.maximum(np.linalg.norm(batch, axis=1), 1e-12)
+            else:
+                sims = self.similarities(batch)
+                top = sims.argmax(axis=1)
+                best = sims[rows, top]
+            people[start:start + len(batch)] = person_ids[owners[top]]
+            scores[start:start + len(batch)] = best
+        return people, scores
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent calls into batches
+
+    Items submitted within `max_wait_ms` of the first waiting item (up to
+    `max_batch` of them) are handed to `fn` as one list on a single worker
+    thread; `fn` must return one result per item.
+    """
+
+    def __init__(self, fn, max_batch=32, max_wait_ms=5, on_batch=None):
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.on_batch = on_batch
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._loop, name='micro-batcher', daemon=True)
+        self.thread.start()
+
+    def submit(self, item):
+        future = Future()
+        self.queue.put((item, future))
+        return future
+
+    def __call__(self, item, timeout=None):
+        return self.submit(item).result(timeout)
+
+    def _loop(self):
+        while True:
+            first = self.queue.get()
+            if first is None:
+                return
+            batch = [first]
+            wait_until = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = wait_until - time.monotonic()
+                try:
+                    item = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self.queue.put(None)
+                    break
+                batch.append(item)
+
+            items = [item for item, _ in batch]
+            try:
+                results = self.fn(items)
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            if self.on_batch is not None:
+                self.on_batch(len(batch))
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+
+class FaceService:
+    """
+    Shared face recognition backend for the API
+
+    Holds one FaceRecognitionSystem whose model is loaded once, and a
+    FaceGallery built from its database. Face crops from concurrent
+    identify requests go through a MicroBatcher, so requests arriving
+    within a few milliseconds share one model lock acquisition and one
+    gallery matrix product.
+
+    The database file is the gallery shared by every API worker: each
+    request reloads it when its mtime changed, and enrollments add to the
+    latest version under an exclusive file lock and replace it atomically,
+    so concurrent enrollments on different workers all survive.
+    """
+
+    VIDEO_STAGES = ['Detecting faces', 'Matching against gallery']
+
+    def __init__(self, model_name='Facenet512', distance_metric='cosine', database_path=None,
+                 max_batch=32, max_wait_ms=5, metrics=None, warm=True):
+        """
+        Args:
+            model_name: DeepFace model name
+            distance_metric: 'cosine' or 'euclidean'
+            database_path: Pickled face database to load (and save enrollments to)
+            max_batch: Most face crops embedded and matched per batch
+            max_wait_ms: How long the first waiting crop waits for others
+            metrics: Optional EndpointMetrics receiving batch sizes
+            warm: Load the model immediately instead of on first use
+        """
+        # Imported here so tabular-only API workers never load the face stack
+        from facerecognition import FaceRecognitionSystem
+
+        self.system = FaceRecognitionSystem(model_name=model_name, distance_metric=distance_metric)
+        self.database_path = database_path
+        self.model_lock = threading.Lock()
+        self.enroll_lock = threading.Lock()
+        self._database_mtime = None
+        self.gallery = FaceGallery(self.system.distance_metric)
+        self.refresh()
+        if warm:
+            # Raises ImportError here, before any thread is started, when
+            # the face stack is not installed
+            with self.model_lock:
+                self.system.warm_up()
+
+        on_batch = (lambda size: metrics.record_value('face.batch_size', size)) if metrics else None
+        self.batcher = MicroBatcher(self._identify_batch, max_batch=max_batch,
+                                    max_wait_ms=max_wait_ms, on_batch=on_batch)
+
+    @staticmethod
+    def decode_image(data):
+        """Decode uploaded image bytes to a BGR array"""
+        import cv2
+
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError('Could not decode image')
+        return image
+
+    def _mtime(self):
+        try:
+            return os.stat(self.database_path).st_mtime_ns if self.database_path else None
+        except FileNotFoundError:
+            return None
+
+    def refresh(self):
+        """Reload the gallery if another worker (or process) saved the database"""
+        mtime = self._mtime()
+        if mtime is None or mtime == self._database_mtime:
+            return False
+        with self.enroll_lock:
+            mtime = self._mtime()
+            if mtime is None or mtime == self._database_mtime:
+                return False
+            self.system.load_database(self.database_path)
+            self.gallery = FaceGallery.from_database(self.system.face_database, self.system.distance_metric)
+            self._database_mtime = mtime
+        return True
+
+    @contextmanager
+    def _database_lock(self):
+        """Exclusive lock on the database file across worker processes"""
+        import fcntl
+
+        with open(f"{self.database_path}.lock", 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def identify(self, image, top_k=3):
+        """
+        Detect and identify every face in an image
+
+        Returns:
+            list of {'coordinates', 'face_confidence', 'identified',
+            'person_id', 'matches'} per detected face
+        """
+        self.refresh()
+        faces = self.system.extract_faces_from_frame(image)
+        futures = [self.batcher.submit((face['face_array'], top_k)) for face in faces]
+        threshold = self.system.similarity_threshold
+
+        results = []
+        for face, future in zip(faces, futures):
+            matches = future.result()
+            identified = bool(matches) and matches[0]['max_similarity'] >= threshold
+            results.append({
+                'coordinates': face['coordinates'],
+                'face_confidence': float(face['confidence']),
+                'identified': identified,
+                'person_id': matches[0]['person_id'] if identified else 'Unknown',
+                'matches': matches,
+            })
+        return results
+
+    def _identify_batch(self, items):
+        """Embed all queued face crops and match them against the gallery together"""
+        crops = [crop for crop, _ in items]
+        with self.model_lock:
+            embeddings = self.system.generate_embeddings(crops)
+        valid = [embedding is not None for embedding in embeddings]
+
+        top_k = max(k for _, k in items)
+        found = [embedding for embedding in embeddings if embedding is not None]
+        matched = iter(self.gallery.match(np.vstack(found), top_k=top_k)) if found else iter(())
+        return [next(matched)[:k] if ok else [] for (_, k), ok in zip(items, valid)]
+
+    def enroll(self, person_id, images):
+        """
+        Add a person to the gallery from one or more images
+
+        The most confident face in each image is embedded. With a
+        database path the embeddings are added to the latest saved
+        database, which is then replaced, under the cross-worker lock.
+
+        Returns:
+            Number of embeddings added
+        """
+        with self.model_lock:
+            embeddings = [e for e in self.system.embed_images(images) if e is not None]
+        if not embeddings:
+            return 0
+
+        if not self.database_path:
+            with self.enroll_lock:
+                self._add(person_id, embeddings)
+            return len(embeddings)
+
+        with self._database_lock():
+            # Another worker may have enrolled since this one last loaded
+            self.refresh()
+            with self.enroll_lock:
+                self._add(person_id, embeddings)
+                self.system.save_database(self.database_path)
+                self._database_mtime = self._mtime()
+        return len(embeddings)
+
+    def _add(self, person_id, embeddings):
+        self.gallery.add(person_id, embeddings)
+        self.system.face_database.setdefault(person_id, []).extend(embeddings)
+        meta = self.system.face_metadata.setdefault(person_id, {'images': [], 'num_images': 0})
+        meta['num_images'] += len(embeddings)
+
+    def process_video(self, video_path, sample_rate=30, progress=None, remove=False):
+        """
+        Detect and identify faces in a video file (run as a background job)
+
+        Args:
+            video_path: Path of the video
+            sample_rate: Process every Nth frame
+            progress: Job progress callback
+            remove: Delete the file when done (for uploaded temp files)
+
+        Returns:
+            dict with per-face detections and per-person sighting counts
+        """
+        try:
+            if progress:
+                progress(1)
+            detected = self.system.process_cctv_footage(video_path, sample_rate=sample_rate)
+
+            if progress:
+                progress(2)
+            self.refresh()
+            embeddings = np.array([face['embedding'] for face in detected], dtype=np.float32)
+            matches = self.gallery.match(embeddings, top_k=1) if len(detected) else []
+            threshold = self.system.similarity_threshold
+
+            detections = []
+            for face, best in zip(detected, matches):
+                identified = bool(best) and best[0]['max_similarity'] >= threshold
+                detections.append({
+                    'frame_number': face['frame_number'],
+                    'timestamp': face['timestamp'],
+                    'person_id': best[0]['person_id'] if identified else 'Unknown',
+                    'confidence': best[0]['max_similarity'] if identified else 0.0,
+                    'identified': identified,
+                    'face_confidence': float(face['confidence']),
+                })
+
+            sightings = {}
+            for detection in detections:
+                if detection['identified']:
+                    sightings[detection['person_id']] = sightings.get(detection['person_id'], 0) + 1
+            return {'faces': len(detections), 'sightings': sightings, 'detections': detections}
+        finally:
+            if remove:
+                os.unlink(video_path)
@@ -0,0 +1,192 @@
+"""
+Incremental Feature Store for Campus Security System
+Keeps per-entity rolling behavioural features that are updated in O(1)
+per event, so features never have to be recomputed over the full dataset
+"""
+
+import math
+import os
+import pickle
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+
+HOUR = 3600.0
+DAY = 24 * HOUR
+WEEK = 7 * DAY
+
+FEATURE_NAMES = [
+    'events_last_hour',
+    'events_last_day',
+    'distinct_locations_recent',
+    'seconds_since_last',
+    'night_ratio_week',
+]
+
+
+def _is_night(seconds):
+    hour = int(seconds // HOUR) % 24
+    return hour >= 22 or hour <= 6
+
+
+class EntityState:
+    """Rolling state for one entity"""
+
+    __slots__ = ('last_seen', 'hour_rate', 'day_rate', 'week_total', 'week_night', 'recent')
+
+    def __init__(self, buffer_size):
+        self.last_seen = None
+        self.hour_rate = 0.0
+        self.day_rate = 0.0
+        self.week_total = 0.0
+        self.week_night = 0.0
+        self.recent = deque(maxlen=buffer_size)  # ring buffer of (seconds, location)
+
+
+class FeatureStore:
+    """
+    Per-entity rolling features with exponential decay and ring buffers
+
+    Event rates are exponentially decayed counts (time constants of one hour,
+    one day and one week), which approximate sliding-window counts without
+    storing the events. Distinct recent locations come from a fixed-size ring
+    buffer of the entity's latest events.
+    """
+
+    def __init__(self, location_window_hours=24, buffer_size=64):
+        """
+        Args:
+            location_window_hours: Look-back for distinct_locations_recent
+            buffer_size: Recent events kept per entity for location queries
+        """
+        self.location_window = location_window_hours * HOUR
+        self.buffer_size = buffer_size
+        self.entities = {}
+        self.events_seen = 0
+
+    @staticmethod
+    def _seconds(timestamp):
+        return pd.Timestamp(timestamp).value / 1e9
+
+    def update(self, entity, timestamp, location=None):
+        """
+        Fold one event into the entity's state
+
+        Args:
+            entity: Entity identifier (e.g. student_id)
+            timestamp: Event time (anything pd.Timestamp accepts, or epoch seconds)
+            location: Building or location id of the event
+
+        Returns:
+            dict: The entity's features just after this event
+        """
+        t = float(timestamp) if isinstance(timestamp, (int, float, np.floating, np.integer)) else self._seconds(timestamp)
+        return self._update(entity, t, location)
+
+    def _update(self, entity, t, location):
+        state = self.entities.get(entity)
+        if state is None:
+            state = self.entities[entity] = EntityState(self.buffer_size)
+
+        since_last = None
+        if state.last_seen is not None:
+            since_last = t - state.last_seen
+            # Out-of-order events are folded in without decaying
+            dt = max(since_last, 0.0)
+            state.hour_rate *= math.exp(-dt / HOUR)
+            state.day_rate *= math.exp(-dt / DAY)
+            week_decay = math.exp(-dt / WEEK)
+            state.week_total *= week_decay
+            state.week_night *= week_decay
+
+        state.hour_rate += 1.0
+        state.day_rate += 1.0
+        state.week_total += 1.0
+        if _is_night(t):
+            state.week_night += 1.0
+        state.recent.append((t, location))
+        state.last_seen = max(t, state.last_seen) if state.last_seen is not None else t
+        self.events_seen += 1
+
+        features = self._features(state, state.last_seen)
+        features['seconds_since_last'] = since_last
+        return features
+
+    def _features(self, state, now):
+        dt = max(now - state.last_seen, 0.0)
+        cutoff = now - self.location_window
+        locations = {loc for ts, loc in state.recent if ts >= cutoff and loc is not None}
+        return {
+            'events_last_hour': state.hour_rate * math.exp(-dt / HOUR),
+            'events_last_day': state.day_rate * math.exp(-dt / DAY),
+            'distinct_locations_recent': len(locations),
+            'seconds_since_last': dt,
+            'night_ratio_week': state.week_night / state.week_total if state.week_total else 0.0,
+        }
+
+    def update_frame(self, df, entity_col='student_id', time_col='timestamp', location_col='building'):
+        """
+        Fold a batch of events into the store in timestamp order
+
+        Args:
+            df: DataFrame of events
+            entity_col: Entity identifier column
+            time_col: Event time column
+            location_col: Location column (optional)
+
+        Returns:
+            DataFrame of point-in-time features aligned to df's index
+        """
+        times = pd.to_datetime(df[time_col]).to_numpy(dtype='datetime64[ns]').astype('int64') / 1e9
+        entities = df[entity_col].to_numpy()
+        locations = df[location_col].to_numpy() if location_col in df.columns else np.full(len(df), None)
+        order = np.argsort(times, kind='stable')
+
+        rows = [None] * len(df)
+        for i in order:
+            rows[i] = self._update(entities[i], times[i], locations[i])
+
+        return pd.DataFrame(rows, index=df.index, columns=FEATURE_NAMES)
+
+    def get_features(self, entity, at=None):
+        """
+        Current features for one entity
+
+        Args:
+            entity: Entity identifier
+            at: Query time (default: the entity's last event)
+
+        Returns:
+            dict, or None for an unknown entity
+        """
+        state = self.entities.get(entity)
+        if state is None:
+            return None
+        now = state.last_seen if at is None else self._seconds(at)
+        return self._features(state, now)
+
+    def features_frame(self, entities=None, at=None):
+        """Current features for many entities as a DataFrame indexed by entity"""
+        if entities is None:
+            entities = list(self.entities)
+        rows = {e: self.get_features(e, at) for e in entities if e in self.entities}
+        return pd.DataFrame.from_dict(rows, orient='index', columns=FEATURE_NAMES)
+
+    def save_snapshot(self, filepath='feature_store.pkl'):
+        """Save the store's state to disk"""
+        # Swapped in whole, so a process resuming from it never reads a partial file
+        tmp = f"{filepath}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            pickle.dump(self, f)
+        os.replace(tmp, filepath)
+        print(f"Feature store saved to {filepath} ({len(self.entities)} entities)")
+
+    @classmethod
+    def load_snapshot(cls, filepath='feature_store.pkl'):
+        """Load a store saved with save_snapshot"""
+        with open(filepath, 'rb') as f:
+            store = pickle.load(f)
+        print(f"Feature store loaded from {filepath} ({len(store.entities)} entities)")
+        return store
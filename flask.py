@@ -1,62 +1,299 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 import pandas as pd
-import numpy as np
 import json
-from datetime import datetime
 import io
 import os
+import tempfile
+import threading
+import time
+from storage import export_excel
+from datasets import DatasetRegistry
+from ingest import UploadIngestor
+from maincode import CampusSecuritySystem
+from jobs import JobManager, JobQueueFull
+from cache import VersionedCache
+from metrics import EndpointMetrics
+from faceservice import FaceService
 
 app = Flask(__name__)
 CORS(app)
 
-# Import your main system (assuming it's in the same directory)
-# from campus_security_system import CampusSecuritySystem
+# Default and maximum rows per /api/search page
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 10000
+
+# Concurrent analysis jobs (default: half the CPUs) and queue depth
+ANALYSIS_WORKERS = int(os.environ.get('ANALYSIS_WORKERS', 0)) or None
+ANALYSIS_MAX_PENDING = int(os.environ.get('ANALYSIS_MAX_PENDING', 8))
+
+# Alerts for the same entity closer together than this are collapsed into
+# one (a pandas Timedelta string; empty keeps every alert)
+ALERT_SUPPRESSION_WINDOW = os.environ.get('ALERT_SUPPRESSION_WINDOW', '1h') or None
+
+# Memory cap for cached statistics/results/export payloads
+CACHE_MAX_BYTES = int(os.environ.get('CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+# Memory cap for loaded datasets, and a directory (ideally on tmpfs) through
+# which WSGI worker processes share uploaded datasets as memory-mapped files,
+# along with analysis results, feature stores and background job state
+DATASET_MAX_BYTES = int(os.environ.get('DATASET_MAX_BYTES', 0)) or None
+DATASET_DIR = os.environ.get('DATASET_DIR')
+
+# Face recognition: model, persisted gallery (shared by every worker, which
+# reloads it when another enrolls), micro-batching window, and whether to
+# load the model at startup rather than on the first request
+FACE_MODEL = os.environ.get('FACE_MODEL', 'Facenet512')
+FACE_DATABASE = os.environ.get('FACE_DATABASE', 'campus_face_database.pkl')
+FACE_MAX_BATCH = int(os.environ.get('FACE_MAX_BATCH', 32))
+FACE_BATCH_WAIT_MS = float(os.environ.get('FACE_BATCH_WAIT_MS', 5))
+FACE_PRELOAD = os.environ.get('FACE_PRELOAD', '').lower() in ('1', 'true', 'yes')
+
+# Streaming anomaly scoring: a model from `campus.py stream-fit` enables
+# POST /api/events and live alerts on /api/alerts, optionally also written
+# to STREAM_DATABASE. STREAM_FEATURES is a per-entity state snapshot (from
+# `stream-fit --features`) to resume from, saved back while scoring. With
+# DATASET_DIR, one worker scores the whole stream: the others hand it
+# events through an inbox there and serve the alert feed it publishes
+STREAM_MODEL = os.environ.get('STREAM_MODEL')
+STREAM_DATA_DIR = os.environ.get('STREAM_DATA_DIR', 'data/given')
+STREAM_DATABASE = os.environ.get('STREAM_DATABASE')
+STREAM_FEATURES = os.environ.get('STREAM_FEATURES')
+STREAM_DIR = os.path.join(DATASET_DIR, 'stream') if DATASET_DIR else None
 
 class APIHandler:
-    def __init__(self):
-        self.current_data = None
-        self.analysis_results = None
+    def __init__(self, registry, ingestor=None, jobs=None):
+        self.registry = registry
+        self.ingestor = ingestor or UploadIngestor()
+        self.jobs = jobs
     
-    def process_file(self, file):
-        """Process uploaded Excel file"""
+    def process_file(self, file, key):
+        """Process uploaded CSV/Excel file into the dataset named by key"""
         try:
-            df = pd.read_excel(file)
-            self.current_data = df
+            df, stats = self.ingestor.ingest(file.stream, file.filename)
+            dataset = self.registry.publish(key, df)
             return {
                 'success': True,
+                'dataset': key,
+                'version': dataset.version,
                 'records': len(df),
                 'columns': list(df.columns),
-                'sample': df.head(5).to_dict('records')
+                'ingest': stats,
+                'features_job': self.submit_features(dataset),
+                'sample': json.loads(df.head(5).to_json(orient='records', date_format='iso'))
             }
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
-    def run_analysis(self, df):
-        """Run complete security analysis"""
-        # Placeholder for actual ML analysis
+    def submit_features(self, dataset):
+        """Queue build_features for a new dataset version; returns the job id (or None)"""
+        if self.jobs is None or not self.has_features(dataset.frame):
+            return None
+        try:
+            job = self.jobs.submit(self.build_features, dataset, name=f'features:{dataset.key}')
+        except JobQueueFull:
+            # The next analysis of this version builds them instead
+            return None
+        return job.job_id
+    
+    @staticmethod
+    def has_features(df):
+        return 'student_id' in df.columns and 'timestamp' in df.columns
+    
+    def build_features(self, dataset, progress=None):
+        """Fold a dataset version into its feature store, once
+        
+        Folding runs a Python step per row, so it happens in a background
+        job rather than in the upload request. The point-in-time features
+        it returns are kept with the version for its analyses.
+        """
+        built = False
+        with dataset.feature_lock:
+            if dataset.rolling_features is None and self.has_features(dataset.frame):
+                dataset.rolling_features = dataset.feature_store.update_frame(dataset.frame)
+                built = True
+            entities = len(dataset.feature_store.entities)
+        if built:
+            self.registry.share_features(dataset)
+        return {'dataset': dataset.key, 'version': dataset.version, 'entities': entities}
+    
+    def run_analysis(self, dataset, progress=None):
+        """Run complete security analysis
+        
+        Uses the point-in-time rolling features of the dataset version,
+        building them first if the upload's features job has not yet.
+        """
+        self.build_features(dataset)
+        system = CampusSecuritySystem(rolling_features=dataset.rolling_features,
+                                      suppression_window=ALERT_SUPPRESSION_WINDOW)
+        output = system.run_full_analysis(dataset.frame, progress=progress)
+        
+        data = output['data']
+        entity_col = 'entity_cluster' if 'entity_cluster' in data.columns else 'student_id'
+        alerts = output['alerts'].rename(columns={'alert_id': 'id'})
+        
         results = {
-            'total_records': len(df),
-            'entities': df['student_id'].nunique() if 'student_id' in df.columns else 0,
-            'anomalies': int(len(df) * 0.15),  # Simulated
-            'alerts': []
+            'total_records': len(data),
+            'entities': int(data[entity_col].nunique()) if entity_col in data.columns else 0,
+            'anomalies': len(output['anomalies']),
+            'alerts': json.loads(alerts.to_json(orient='records', date_format='iso'))
         }
         
-        # Generate sample alerts
-        for i in range(min(5, results['anomalies'])):
-            results['alerts'].append({
-                'id': f"ALERT_{i+1}",
-                'severity': np.random.choice(['HIGH', 'MEDIUM']),
-                'timestamp': datetime.now().isoformat(),
-                'entity': f"ENT_{np.random.randint(1, 100)}",
-                'description': f"Anomaly detected with score -0.{np.random.randint(5, 9)}",
-                'location': np.random.choice(['Lab A', 'Library', 'Main Building'])
-            })
-        
-        self.analysis_results = results
         return results
+    
+    def compute_statistics(self, df):
+        """Summary statistics of a dataset frame"""
+        return {
+            'total_records': len(df),
+            'entities': df['student_id'].nunique() if 'student_id' in df.columns else 0,
+            'locations': df['building'].nunique() if 'building' in df.columns else 0,
+            'activities': df['activity_type'].nunique() if 'activity_type' in df.columns else 0,
+            'date_range': {
+                'start': df['timestamp'].min().isoformat() if 'timestamp' in df.columns else None,
+                'end': df['timestamp'].max().isoformat() if 'timestamp' in df.columns else None
+            }
+        }
+    
+    def render_export(self, dataset):
+        """Excel workbook bytes with the data and alerts sheets"""
+        output = io.BytesIO()
+        sheets = {'Data': dataset.frame}
+        if dataset.analysis_results:
+            sheets['Alerts'] = pd.DataFrame(dataset.analysis_results.get('alerts', []))
+        export_excel(sheets, output)
+        return output.getvalue()
+
+jobs = JobManager(max_workers=ANALYSIS_WORKERS, max_pending=ANALYSIS_MAX_PENDING,
+                  shared_dir=os.path.join(DATASET_DIR, 'jobs') if DATASET_DIR else None)
+handler = APIHandler(DatasetRegistry(max_bytes=DATASET_MAX_BYTES, shared_dir=DATASET_DIR), jobs=jobs)
+cache = VersionedCache(max_bytes=CACHE_MAX_BYTES)
+metrics = EndpointMetrics()
+
+_face_service = None
+_face_service_lock = threading.Lock()
+
+def face_service():
+    """The worker's shared FaceService, created (model loaded) on first use"""
+    global _face_service
+    with _face_service_lock:
+        if _face_service is None:
+            _face_service = FaceService(
+                model_name=FACE_MODEL, database_path=FACE_DATABASE,
+                max_batch=FACE_MAX_BATCH, max_wait_ms=FACE_BATCH_WAIT_MS, metrics=metrics
+            )
+    return _face_service
+
+if FACE_PRELOAD:
+    face_service()
+
+_stream_service = None
+_stream_owner = None
+_alert_feed = None
+_stream_inbox = None
+_stream_service_lock = threading.Lock()
+
+def alert_feed():
+    """The live AlertFeed (published through STREAM_DIR to every worker)"""
+    global _alert_feed
+    with _stream_service_lock:
+        if _alert_feed is None:
+            from streaming import AlertFeed
+            
+            _alert_feed = AlertFeed(path=os.path.join(STREAM_DIR, 'alerts.json') if STREAM_DIR else None)
+    return _alert_feed
+
+def stream_inbox():
+    """The StreamInbox in STREAM_DIR through which workers queue events"""
+    global _stream_inbox
+    with _stream_service_lock:
+        if _stream_inbox is None:
+            from streaming import StreamInbox
+            
+            _stream_inbox = StreamInbox(os.path.join(STREAM_DIR, 'inbox'))
+    return _stream_inbox
+
+def _take_stream_ownership():
+    """Whether this worker scores the stream (holds STREAM_DIR/owner.lock)"""
+    global _stream_owner
+    if STREAM_DIR is None:
+        return True
+    import fcntl
+    
+    os.makedirs(STREAM_DIR, exist_ok=True)
+    lock = open(os.path.join(STREAM_DIR, 'owner.lock'), 'a')
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock.close()
+        return False
+    # Held for the life of the worker; released by the OS if it dies, so
+    # the next worker to handle a stream request takes over
+    _stream_owner = lock
+    return True
+
+def stream_service():
+    """The StreamService if this worker scores the stream, else None
+    
+    It is created on first use, feeding the live AlertFeed first. With
+    STREAM_DIR only the worker holding the owner lock runs one, consuming
+    the shared inbox; the others keep trying, so one takes over if it exits.
+    """
+    global _stream_service
+    feed = alert_feed()
+    with _stream_service_lock:
+        if _stream_service is None and _take_stream_ownership():
+            from streaming import DatabaseSink, StreamInbox, StreamService, load_scorer
+            
+            scorer = load_scorer(STREAM_MODEL, STREAM_DATA_DIR, STREAM_FEATURES)
+            sinks = [feed]
+            if STREAM_DATABASE:
+                from persistence import Database
+                
+                db = Database.from_url(STREAM_DATABASE)
+                if db.dialect == 'sqlite':
+                    db.create_schema()
+                sinks.append(DatabaseSink(db, scorer.profiles))
+            _stream_service = StreamService(scorer, sinks, metrics=metrics, snapshot_path=STREAM_FEATURES)
+            if STREAM_DIR:
+                _stream_service.follow_inbox(StreamInbox(os.path.join(STREAM_DIR, 'inbox')))
+    return _stream_service
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_metrics(response):
+    start = g.pop('request_start', None)
+    if start is not None and request.url_rule is not None:
+        metrics.record(f"{request.method} {request.url_rule.rule}", time.perf_counter() - start,
+                       error=response.status_code >= 500)
+    return response
+
+def cached_response(name, version, render, mimetype='application/json', headers=None):
+    """Serve a payload memoized per dataset version, answering 304 for a matching ETag"""
+    etag = cache.etag(name, version)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        payload = cache.get_or_compute(name, version, render)
+        response = Response(payload, mimetype=mimetype, headers=headers)
+    response.set_etag(etag)
+    return response
+
+def render_json(obj):
+    return app.json.dumps(obj).encode('utf-8')
+
+def session_id():
+    return request.headers.get('X-Session-Id') or request.args.get('session') or 'public'
+
+def dataset_key():
+    """Key of the dataset a request addresses (session and dataset name)"""
+    name = request.headers.get('X-Dataset') or request.args.get('dataset') or request.form.get('dataset')
+    return DatasetRegistry.make_key(session_id(), name)
 
-handler = APIHandler()
+def current_dataset():
+    return handler.registry.get(dataset_key())
 
 @app.route('/')
 def home():
@@ -65,10 +302,17 @@ def home():
         'version': '1.0',
         'endpoints': [
             '/api/upload',
+            '/api/datasets',
             '/api/analyze',
+            '/api/jobs',
             '/api/results',
             '/api/alerts',
-            '/api/export'
+            '/api/events',
+            '/api/export',
+            '/api/face/identify',
+            '/api/face/enroll',
+            '/api/face/video',
+            '/api/metrics'
         ]
     })
 
@@ -82,63 +326,152 @@ def upload_file():
     if file.filename == '':
         return jsonify({'error': 'No file selected'}), 400
     
-    if not file.filename.endswith(('.xlsx', '.xls', '.csv')):
+    if not file.filename.lower().endswith(('.xlsx', '.xls', '.csv')):
         return jsonify({'error': 'Invalid file format'}), 400
     
-    result = handler.process_file(file)
+    result = handler.process_file(file, dataset_key())
     return jsonify(result)
 
+@app.route('/api/datasets', methods=['GET'])
+def list_datasets():
+    """List the datasets loaded for this session"""
+    return jsonify({'datasets': handler.registry.list(session_id())})
+
 @app.route('/api/analyze', methods=['POST'])
 def analyze_data():
-    """Analyze uploaded data"""
-    if handler.current_data is None:
+    """Start analysis of the uploaded data as a background job"""
+    dataset = current_dataset()
+    if dataset is None:
         return jsonify({'error': 'No data loaded'}), 400
     
-    results = handler.run_analysis(handler.current_data)
-    return jsonify(results)
+    try:
+        job = jobs.submit(
+            handler.run_analysis, dataset,
+            name=f'analysis:{dataset.key}', stages=CampusSecuritySystem.PIPELINE_STAGES,
+            on_complete=lambda job: handler.registry.set_results(dataset.key, dataset.version, job.result)
+        )
+    except JobQueueFull as e:
+        return jsonify({'error': f'Too many analyses queued: {e}'}), 429
+    
+    response = job.to_dict()
+    response['status_url'] = f"/api/jobs/{job.job_id}"
+    return jsonify(response), 202
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """List background jobs"""
+    return jsonify({'jobs': [job.to_dict() for job in jobs.list()]})
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get status and per-stage progress of a job"""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>/results', methods=['GET'])
+def get_job_results(job_id):
+    """Get the results of a completed job"""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    if job.status != 'completed':
+        return jsonify({'error': f'Job is {job.status}', 'job': job.to_dict()}), 409
+    
+    return jsonify(job.result)
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running job"""
+    job = jobs.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify(job.to_dict())
 
 @app.route('/api/results', methods=['GET'])
 def get_results():
     """Get analysis results"""
-    if handler.analysis_results is None:
+    dataset = current_dataset()
+    if dataset is None or dataset.analysis_results is None:
         return jsonify({'error': 'No analysis performed yet'}), 404
     
-    return jsonify(handler.analysis_results)
+    results = dataset.analysis_results
+    return cached_response(f'{dataset.key}:results', f'{dataset.version}.{dataset.results_version}',
+                           lambda: render_json(results))
 
 @app.route('/api/alerts', methods=['GET'])
 def get_alerts():
-    """Get security alerts"""
-    if handler.analysis_results is None:
+    """Get security alerts
+    
+    With streaming enabled the response also carries `live` alerts from
+    the stream numbered after `?since=<seq>`, and `last_seq` to poll from.
+    """
+    dataset = current_dataset()
+    has_results = dataset is not None and dataset.analysis_results is not None
+    alerts = dataset.analysis_results.get('alerts', []) if has_results else []
+    
+    if STREAM_MODEL:
+        # Live alerts change between dataset versions, so skip the cache
+        stream_service()
+        live, last_seq = alert_feed().since(request.args.get('since', 0, type=int))
+        return jsonify({'alerts': alerts, 'live': live, 'last_seq': last_seq})
+    
+    if not has_results:
         return jsonify({'alerts': []})
+    return cached_response(f'{dataset.key}:alerts', f'{dataset.version}.{dataset.results_version}',
+                           lambda: render_json({'alerts': alerts}))
+
+@app.route('/api/events', methods=['POST'])
+def post_events():
+    """Queue raw swipe or Wi-Fi rows for streaming anomaly scoring
+    
+    Body: {"source": "card_swipes" | "wifi_logs", "events": [{column: value}, ...]}
+    (or a single "event"); rows use the data/given column names.
+    """
+    if not STREAM_MODEL:
+        return jsonify({'error': 'Streaming is not enabled (set STREAM_MODEL)'}), 503
     
-    return jsonify({'alerts': handler.analysis_results.get('alerts', [])})
+    from streaming import STREAM_SOURCES
+    
+    body = request.json or {}
+    source = body.get('source')
+    rows = body.get('events') or ([body['event']] if body.get('event') else [])
+    if source not in STREAM_SOURCES:
+        return jsonify({'error': f'source must be one of {STREAM_SOURCES}'}), 400
+    if not rows or not all(isinstance(row, dict) for row in rows):
+        return jsonify({'error': 'events must be a non-empty list of objects'}), 400
+    
+    service = stream_service()
+    if STREAM_DIR:
+        # Every worker goes through the inbox, so the owner sees one ordered stream
+        stream_inbox().put_many(source, rows)
+        return jsonify({'queued': len(rows)}), 202
+    service.put_many(source, rows)
+    return jsonify({'queued': len(rows), 'processed': service.processed}), 202
 
 @app.route('/api/export', methods=['GET'])
 def export_results():
     """Export results to Excel"""
-    if handler.current_data is None:
+    dataset = current_dataset()
+    if dataset is None:
         return jsonify({'error': 'No data available'}), 404
     
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        handler.current_data.to_excel(writer, sheet_name='Data', index=False)
-        
-        if handler.analysis_results:
-            alerts_df = pd.DataFrame(handler.analysis_results.get('alerts', []))
-            alerts_df.to_excel(writer, sheet_name='Alerts', index=False)
-    
-    output.seek(0)
-    return send_file(
-        output,
+    return cached_response(
+        f'{dataset.key}:export', f'{dataset.version}.{dataset.results_version}',
+        lambda: handler.render_export(dataset),
         mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name='security_report.xlsx'
+        headers={'Content-Disposition': 'attachment; filename=security_report.xlsx'}
     )
 
 @app.route('/api/statistics', methods=['GET'])
 def get_statistics():
     """Get real-time statistics"""
-    if handler.current_data is None:
+    dataset = current_dataset()
+    if dataset is None:
         return jsonify({
             'total_records': 0,
             'entities': 0,
@@ -146,68 +479,183 @@ def get_statistics():
             'activities': 0
         })
     
-    df = handler.current_data
-    stats = {
-        'total_records': len(df),
-        'entities': df['student_id'].nunique() if 'student_id' in df.columns else 0,
-        'locations': df['building'].nunique() if 'building' in df.columns else 0,
-        'activities': df['activity_type'].nunique() if 'activity_type' in df.columns else 0,
-        'date_range': {
-            'start': df['timestamp'].min().isoformat() if 'timestamp' in df.columns else None,
-            'end': df['timestamp'].max().isoformat() if 'timestamp' in df.columns else None
-        }
-    }
-    
-    return jsonify(stats)
+    return cached_response(f'{dataset.key}:statistics', dataset.version,
+                           lambda: render_json(handler.compute_statistics(dataset.frame)))
 
 @app.route('/api/entity/<entity_id>', methods=['GET'])
 def get_entity_info(entity_id):
     """Get information about specific entity"""
-    if handler.current_data is None:
+    dataset = current_dataset()
+    if dataset is None:
         return jsonify({'error': 'No data loaded'}), 404
     
-    df = handler.current_data
-    entity_data = df[df['student_id'] == entity_id]
+    index = dataset.query_index
+    positions = index.entity_positions(entity_id)
     
-    if len(entity_data) == 0:
+    if len(positions) == 0:
         return jsonify({'error': 'Entity not found'}), 404
     
+    df = dataset.frame
+    locations = index.take(positions, ['building'])['building'].unique().tolist() if 'building' in df.columns else []
     info = {
         'entity_id': entity_id,
-        'total_activities': len(entity_data),
-        'locations': entity_data['building'].unique().tolist() if 'building' in df.columns else [],
-        'recent_activities': entity_data.tail(10).to_dict('records')
+        'total_activities': len(positions),
+        'locations': locations,
+        'recent_activities': index.take(positions[-10:]).to_dict('records')
     }
     
     return jsonify(info)
 
+@app.route('/api/entity/<entity_id>/features', methods=['GET'])
+def get_entity_features(entity_id):
+    """Get rolling behavioural features for an entity"""
+    dataset = current_dataset()
+    if dataset is None:
+        return jsonify({'error': 'No data loaded'}), 404
+    
+    with dataset.feature_lock:
+        features = dataset.feature_store.get_features(entity_id, at=request.args.get('at'))
+    if features is None:
+        return jsonify({'error': 'Entity not found'}), 404
+    
+    return jsonify({'entity_id': entity_id, 'features': features})
+
 @app.route('/api/search', methods=['POST'])
 def search_records():
-    """Search records by various criteria"""
-    if handler.current_data is None:
+    """Search records by various criteria
+    
+    Results are paginated with `limit` and either `offset` or the returned
+    `next_cursor`, and `fields` restricts the returned columns. Send
+    `"format": "ndjson"` (or Accept: application/x-ndjson) to stream every
+    match as newline-delimited JSON instead of a single page.
+    """
+    dataset = current_dataset()
+    if dataset is None:
         return jsonify({'error': 'No data loaded'}), 404
     
-    search_params = request.json
-    df = handler.current_data.copy()
+    search_params = request.json or {}
+    index = dataset.query_index
+    try:
+        positions = index.search(
+            student_id=search_params.get('student_id'),
+            building=search_params.get('building'),
+            date_from=search_params.get('date_from'),
+            date_to=search_params.get('date_to')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    fields = search_params.get('fields')
+    
+    wants_ndjson = (search_params.get('format') == 'ndjson' or
+                    request.accept_mimetypes.best == 'application/x-ndjson')
+    if wants_ndjson:
+        return Response(
+            stream_with_context(index.iter_ndjson(positions, fields)),
+            mimetype='application/x-ndjson',
+            headers={'X-Total-Count': str(len(positions))}
+        )
+    
+    try:
+        limit = int(search_params.get('limit', DEFAULT_PAGE_SIZE))
+        offset = int(search_params.get('offset', 0))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'limit and offset must be integers'}), 400
+    if limit > MAX_PAGE_SIZE:
+        return jsonify({'error': f'limit must be between 1 and {MAX_PAGE_SIZE}'}), 400
     
-    # Apply filters
-    if 'student_id' in search_params:
-        df = df[df['student_id'] == search_params['student_id']]
+    try:
+        page, next_cursor = index.paginate(positions, limit, offset, search_params.get('cursor'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    if 'building' in search_params:
-        df = df[df['building'] == search_params['building']]
+    # Rows are serialized by pandas, like the ndjson stream, so timestamps
+    # are ISO 8601 in both modes
+    head = app.json.dumps({'count': len(positions), 'limit': limit, 'next_cursor': next_cursor})
+    body = f"{head[:-1]}, \"results\": {index.records_json(page, fields)}}}"
+    return Response(body, mimetype='application/json')
+
+@app.route('/api/face/identify', methods=['POST'])
+def identify_faces():
+    """Detect and identify the faces in an uploaded image"""
+    if 'image' not in request.files:
+        return jsonify({'error': 'No image provided'}), 400
+    
+    try:
+        top_k = int(request.form.get('top_k', 3))
+        service = face_service()
+        image = service.decode_image(request.files['image'].read())
+    except ImportError as e:
+        return jsonify({'error': f'Face recognition unavailable: {e}'}), 503
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    if 'date_from' in search_params and 'timestamp' in df.columns:
-        df = df[df['timestamp'] >= pd.to_datetime(search_params['date_from'])]
+    faces = service.identify(image, top_k=top_k)
+    return jsonify({'count': len(faces), 'faces': faces})
+
+@app.route('/api/face/enroll', methods=['POST'])
+def enroll_person():
+    """Add a person to the face gallery from one or more images"""
+    person_id = request.form.get('person_id')
+    files = request.files.getlist('images') or request.files.getlist('image')
+    if not person_id or not files:
+        return jsonify({'error': 'person_id and at least one image are required'}), 400
     
-    if 'date_to' in search_params and 'timestamp' in df.columns:
-        df = df[df['timestamp'] <= pd.to_datetime(search_params['date_to'])]
+    try:
+        service = face_service()
+        images = [service.decode_image(file.read()) for file in files]
+    except ImportError as e:
+        return jsonify({'error': f'Face recognition unavailable: {e}'}), 503
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    added = service.enroll(person_id, images)
+    if not added:
+        return jsonify({'success': False, 'error': 'No face found in the images'}), 422
     
     return jsonify({
-        'count': len(df),
-        'results': df.to_dict('records')
+        'success': True,
+        'person_id': person_id,
+        'embeddings_added': added,
+        'gallery_people': len(service.gallery)
     })
 
+@app.route('/api/face/video', methods=['POST'])
+def submit_video():
+    """Start face detection and identification of an uploaded video as a background job"""
+    if 'video' not in request.files:
+        return jsonify({'error': 'No video provided'}), 400
+    
+    try:
+        sample_rate = int(request.form.get('sample_rate', 30))
+        service = face_service()
+    except ImportError as e:
+        return jsonify({'error': f'Face recognition unavailable: {e}'}), 503
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    file = request.files['video']
+    fd, path = tempfile.mkstemp(suffix=os.path.splitext(file.filename or '')[1] or '.mp4', prefix='cctv-')
+    with os.fdopen(fd, 'wb') as out:
+        file.save(out)
+    
+    try:
+        job = jobs.submit(
+            service.process_video, path, sample_rate=sample_rate, remove=True,
+            name=f'video:{file.filename}', stages=FaceService.VIDEO_STAGES
+        )
+    except JobQueueFull as e:
+        os.unlink(path)
+        return jsonify({'error': f'Too many jobs queued: {e}'}), 429
+    
+    response = job.to_dict()
+    response['status_url'] = f"/api/jobs/{job.job_id}"
+    return jsonify(response), 202
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Per-endpoint latency and throughput"""
+    return jsonify({'endpoints': metrics.snapshot(), 'cache': cache.stats()})
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Endpoint not found'}), 404
@@ -222,5 +670,6 @@ if __name__ == '__main__':
     print("=" * 60)
     print("Server starting on http://localhost:5000")
     print("API Documentation: http://localhost:5000")
+    print("Development server; for production run: gunicorn -w 4 wsgi:application")
     print("=" * 60)
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
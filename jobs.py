@@ -0,0 +1,273 @@
+"""
+Background Job Execution for Campus Security System
+Runs long analyses off the request thread with per-stage progress,
+cancellation and a cap on concurrently running work
+"""
+
+import json
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when cancellation was requested"""
+
+
+class JobQueueFull(Exception):
+    """Raised by JobManager.submit when too many jobs are waiting"""
+
+
+class Job:
+    """State of one submitted job"""
+
+    def __init__(self, name, stages):
+        self.job_id = uuid.uuid4().hex
+        self.name = name
+        self.stages = list(stages or [])
+        self.status = 'queued'
+        self.current_stage = 0
+        self.stage_name = None
+        self.result = None
+        self.error = None
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self._cancel = threading.Event()
+        # Set by a JobManager with a shared directory: the file another
+        # worker creates to cancel this job, and the state-change hook
+        self.cancel_path = None
+        self.on_change = None
+
+    @classmethod
+    def from_dict(cls, data):
+        """Read-only Job rebuilt from a state file written by another worker"""
+        job = cls(data['name'], data.get('stages'))
+        job.job_id = data['job_id']
+        job.status = data['status']
+        job.current_stage = data['progress']['stage']
+        job.stage_name = data['progress']['stage_name']
+        job.result = data.get('result')
+        job.error = data['error']
+        for field in ('created_at', 'started_at', 'finished_at'):
+            setattr(job, field, datetime.fromisoformat(data[field]) if data[field] else None)
+        return job
+
+    def cancel_requested(self):
+        return self._cancel.is_set() or (self.cancel_path is not None and self.cancel_path.exists())
+
+    def changed(self):
+        if self.on_change is not None:
+            self.on_change(self)
+
+    def report(self, stage, name=None):
+        """
+        Progress callback handed to the job function
+
+        Args:
+            stage: 1-based number of the stage about to run
+            name: Stage name (defaults to the declared stage list)
+
+        Raises:
+            JobCancelled: If cancellation was requested
+        """
+        if self.cancel_requested():
+            raise JobCancelled(self.job_id)
+        self.current_stage = stage
+        if name is None and 0 < stage <= len(self.stages):
+            name = self.stages[stage - 1]
+        self.stage_name = name
+        self.changed()
+
+    @property
+    def done(self):
+        return self.status in ('completed', 'failed', 'cancelled')
+
+    def to_dict(self):
+        total = len(self.stages)
+        if self.status == 'completed':
+            percent = 100.0
+        elif total:
+            # A stage counts as finished once the next one has started
+            percent = round(100.0 * max(self.current_stage - 1, 0) / total, 1)
+        else:
+            percent = None
+        return {
+            'job_id': self.job_id,
+            'name': self.name,
+            'status': self.status,
+            'progress': {
+                'stage': self.current_stage,
+                'stage_name': self.stage_name,
+                'total_stages': total,
+                'percent': percent,
+            },
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class JobManager:
+    """
+    Thread-pool backed job runner
+
+    At most `max_workers` jobs run at once, so several uploads cannot
+    oversubscribe the CPU; up to `max_pending` more wait in the queue and
+    further submissions are rejected with JobQueueFull. With a `shared_dir`,
+    job state (and the result, once completed) is written there on every
+    change, so other worker processes can report and cancel the job.
+    """
+
+    def __init__(self, max_workers=None, max_pending=8, keep_finished=100, shared_dir=None):
+        """
+        Args:
+            max_workers: Concurrent jobs (default: half the CPUs, at least 1)
+            max_pending: Jobs allowed to wait for a worker
+            keep_finished: Finished jobs retained for status/result queries
+            shared_dir: Directory for job state shared between processes
+        """
+        if max_workers is None:
+            max_workers = max(1, (os.cpu_count() or 2) // 2)
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.keep_finished = keep_finished
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.shared_dir = Path(shared_dir) if shared_dir else None
+        if self.shared_dir is not None:
+            self.shared_dir.mkdir(parents=True, exist_ok=True)
+
+    def submit(self, fn, *args, name='job', stages=None, on_complete=None, **kwargs):
+        """
+        Queue fn(*args, progress=job.report, **kwargs) for background execution
+
+        Args:
+            fn: Callable doing the work; must accept a `progress` keyword
+            name: Label shown in status responses
+            stages: Stage names, used for progress percentages
+            on_complete: Optional callback(job) run after a successful job,
+                before it is marked completed; the job fails if it raises
+
+        Returns:
+            Job
+        """
+        job = Job(name, stages)
+        if self.shared_dir is not None:
+            job.cancel_path = self._path(job.job_id, '.cancel')
+            job.on_change = self._save
+        with self.lock:
+            waiting = sum(1 for j in self.jobs.values() if j.status == 'queued')
+            if waiting >= self.max_pending:
+                raise JobQueueFull(f"{waiting} jobs already waiting")
+            self.jobs[job.job_id] = job
+            self._prune()
+        job.changed()
+        job.future = self.executor.submit(self._run, job, fn, args, kwargs, on_complete)
+        return job
+
+    def _run(self, job, fn, args, kwargs, on_complete):
+        if job.cancel_requested():
+            job.status = 'cancelled'
+            job.finished_at = datetime.now()
+            job.changed()
+            return
+        job.status = 'running'
+        job.started_at = datetime.now()
+        job.changed()
+        try:
+            job.result = fn(*args, progress=job.report, **kwargs)
+            # Results are published before pollers can see 'completed'
+            if on_complete is not None:
+                on_complete(job)
+            job.status = 'completed'
+        except JobCancelled:
+            job.status = 'cancelled'
+        except Exception as e:
+            job.error = str(e)
+            job.status = 'failed'
+            print(f"Job {job.job_id} failed: {e}")
+        finally:
+            job.finished_at = datetime.now()
+            job.changed()
+
+    def _prune(self):
+        """Drop the oldest finished jobs beyond keep_finished (lock held)"""
+        finished = [job_id for job_id, job in self.jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self.jobs[job_id]
+            if self.shared_dir is not None:
+                self._path(job_id, '.json').unlink(missing_ok=True)
+                self._path(job_id, '.cancel').unlink(missing_ok=True)
+
+    # ------------------------------------------------------------------
+    # State shared between worker processes
+    # ------------------------------------------------------------------
+
+    def _path(self, job_id, suffix):
+        return self.shared_dir / f"{job_id}{suffix}"
+
+    def _save(self, job):
+        data = job.to_dict()
+        data['stages'] = job.stages
+        data['result'] = job.result if job.status == 'completed' else None
+        path = self._path(job.job_id, '.json')
+        tmp = path.with_name(f'{path.name}.{threading.get_ident()}.tmp')
+        tmp.write_text(json.dumps(data, default=str))
+        os.replace(tmp, path)
+
+    def _load(self, job_id):
+        """Job owned by another worker, from its state file, or None"""
+        if self.shared_dir is None or not re.fullmatch(r'[0-9a-f]{32}', job_id):
+            return None
+        try:
+            return Job.from_dict(json.loads(self._path(job_id, '.json').read_text()))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+        return job if job is not None else self._load(job_id)
+
+    def list(self):
+        with self.lock:
+            jobs = list(self.jobs.values())
+        if self.shared_dir is not None:
+            local = {job.job_id for job in jobs}
+            others = (self._load(path.stem) for path in self.shared_dir.glob('*.json') if path.stem not in local)
+            jobs.extend(job for job in others if job is not None)
+            jobs.sort(key=lambda job: job.created_at)
+        return jobs
+
+    def cancel(self, job_id):
+        """
+        Request cancellation of a job
+
+        Queued jobs never start; running jobs stop at their next progress
+        report. Returns the job, or None if it is unknown.
+        """
+        job = self.get(job_id)
+        if job is None or job.done:
+            return job
+        if job.job_id not in self.jobs:
+            # Owned by another worker, which stops it at its next check
+            self._path(job.job_id, '.cancel').touch()
+            return job
+        job._cancel.set()
+        if job.future is not None and job.future.cancel():
+            job.status = 'cancelled'
+            job.finished_at = datetime.now()
+            job.changed()
+        return job
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait, cancel_futures=True)
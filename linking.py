@@ -0,0 +1,174 @@
+"""
+Entity Linking for Campus Security System
+Resolves every data/given source to profile entities and stacks them into
+one long-format event store with one row per source record (or two for
+a booking: start and end), so its size grows linearly with the input
+"""
+
+import numpy as np
+import pandas as pd
+
+from schemas import GIVEN_FILES, SOURCES as SOURCE_SCHEMAS, load_sources, parse_timestamps
+from timeline import ACTIVITY_TYPES, SOURCES
+
+
+EVENT_COLUMNS = ['entity_id', 'timestamp', 'activity_type', 'source', 'location', 'item', 'record_id', 'candidates']
+
+# Device/sensor sources: the identifier column resolved through the profiles table
+IDENTIFIERS = {
+    'card_swipes': 'card_id',
+    'wifi_logs': 'device_hash',
+    'cctv_frames': 'face_id',
+}
+
+# One entry per event type:
+# (source key, activity_type, event source, timestamp column, location column, item column, record id column)
+# Timestamp formats come from the source schemas (schemas.SOURCES)
+EVENT_SPECS = [
+    ('card_swipes', 'Card Swipe', 'swipes', 'timestamp', 'location_id', 'card_id', None),
+    ('wifi_logs', 'Wi-Fi Association', 'wifi', 'timestamp', 'ap_id', 'device_hash', None),
+    ('cctv_frames', 'CCTV Sighting', 'cctv', 'timestamp', 'location_id', 'face_id', 'frame_id'),
+    ('lab_bookings', 'Room/Booking Start', 'bookings', 'start_time', 'room_id', 'attended (YES/NO)', 'booking_id'),
+    ('lab_bookings', 'Room/Booking End', 'bookings', 'end_time', 'room_id', 'attended (YES/NO)', 'booking_id'),
+    ('library_checkouts', 'Library Checkout', 'library', 'timestamp', None, 'book_id', 'checkout_id'),
+    ('notes', 'Note/Helpdesk', 'notes', 'timestamp', None, 'text', 'note_id'),
+]
+
+
+def sort_events(events):
+    """Order events by entity code, then time (missing times last)"""
+    times = events['timestamp'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    times = np.where(times == np.iinfo(np.int64).min, np.iinfo(np.int64).max, times)
+    order = np.lexsort((times, events['entity_id'].cat.codes.to_numpy()))
+    return events.take(order).reset_index(drop=True)
+
+
+class EntityLinker:
+    """
+    Resolve source records to profile entities
+
+    entity_id is a categorical over the profile entities throughout, so
+    resolution is a vectorized hash lookup (`Index.get_indexer`) from an
+    identifier to an entity code. An identifier shared by several profiles
+    (e.g. a reissued card) resolves to its first holder; the `candidates`
+    column records how many profiles share it.
+    """
+
+    def __init__(self, profiles):
+        self.profiles = profiles
+        self.entities = pd.Index(profiles['entity_id'].astype(str).unique()).sort_values()
+        entity_codes = self.entities.get_indexer(profiles['entity_id'].astype(str))
+
+        # {identifier column: (Index of identifier values, entity codes, holder counts)}
+        self.lookups = {}
+        for col in IDENTIFIERS.values():
+            if col not in profiles.columns:
+                continue
+            values = profiles[col]
+            present = values.notna().to_numpy()
+            ids = values[present].astype(str).to_numpy()
+            codes = entity_codes[present]
+            unique, first, counts = np.unique(ids, return_index=True, return_counts=True)
+            self.lookups[col] = (pd.Index(unique), codes[first], counts)
+
+        self.stats = {}
+
+    def _entity_codes(self, values):
+        return self.entities.get_indexer(values.astype(str))
+
+    def resolve(self, column, values):
+        """
+        Entity codes (-1 if unknown) and candidate counts for identifier values
+
+        Args:
+            column: Profile identifier column ('card_id', 'device_hash', 'face_id')
+            values: Series of identifier values
+        """
+        index, codes, counts = self.lookups[column]
+        positions = index.get_indexer(values.astype(str))
+        found = positions >= 0
+        missing = values.isna().to_numpy()
+        entity = np.where(found & ~missing, codes[positions], -1)
+        candidates = np.where(found & ~missing, counts[positions], 0)
+        return entity, candidates
+
+    def events_for(self, source, df, spec):
+        """Event rows for one EVENT_SPECS entry"""
+        _, activity_type, event_source, time_col, location_col, item_col, record_col = spec
+        if time_col not in df.columns:
+            return None
+
+        if source in IDENTIFIERS:
+            codes, candidates = self.resolve(IDENTIFIERS[source], df[IDENTIFIERS[source]])
+        else:
+            codes = self._entity_codes(df['entity_id'])
+            candidates = (codes >= 0).astype(np.int64)
+
+        def column(name):
+            if name is None or name not in df.columns:
+                return pd.Series(pd.NA, index=df.index, dtype='string').array
+            return df[name].astype('string').array
+
+        def constant(value, categories):
+            return pd.Categorical.from_codes(np.full(len(df), categories.index(value)), categories=categories)
+
+        return pd.DataFrame({
+            'entity_id': pd.Categorical.from_codes(codes, categories=self.entities),
+            'timestamp': parse_timestamps(df[time_col], SOURCE_SCHEMAS[source].timestamps.get(time_col)),
+            'activity_type': constant(activity_type, ACTIVITY_TYPES),
+            'source': constant(event_source, SOURCES),
+            'location': column(location_col),
+            'item': column(item_col),
+            'record_id': column(record_col),
+            'candidates': candidates.astype(np.int16),
+        })
+
+    def link(self, sources, keep_unresolved=False):
+        """
+        Build the event store from raw source frames
+
+        Args:
+            sources: {source key: DataFrame} as returned by load_sources
+            keep_unresolved: Keep events whose identifier matched no profile
+                (entity_id is then missing)
+
+        Returns:
+            DataFrame with EVENT_COLUMNS, sorted by entity and time
+        """
+        pieces = []
+        self.stats = {}
+        for spec in EVENT_SPECS:
+            source = spec[0]
+            if source not in sources:
+                continue
+            events = self.events_for(source, sources[source], spec)
+            if events is None:
+                continue
+            resolved = events['entity_id'].notna()
+            stats = self.stats.setdefault(source, {'rows': len(sources[source]), 'events': 0, 'unresolved': 0, 'ambiguous': 0})
+            stats['unresolved'] += int((~resolved).sum())
+            stats['ambiguous'] += int((events['candidates'] > 1).sum())
+            if not keep_unresolved:
+                events = events[resolved]
+            stats['events'] += len(events)
+            pieces.append(events)
+
+        if not pieces:
+            return pd.DataFrame(columns=EVENT_COLUMNS)
+        events = pd.concat(pieces, ignore_index=True)
+        events['location'] = events['location'].astype('category')
+        return sort_events(events)
+
+
+def link_sources(data_dir='data/given', keep_unresolved=False):
+    """
+    Load data/given and build the linked event store
+
+    Returns:
+        (events, linker) - the linker carries per-source stats and lookups
+    """
+    sources = load_sources(data_dir)
+    if 'profiles' not in sources:
+        raise FileNotFoundError(f"No profiles file ({GIVEN_FILES['profiles']}) in {data_dir}")
+    linker = EntityLinker(sources['profiles'])
+    return linker.link(sources, keep_unresolved=keep_unresolved), linker
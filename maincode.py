@@ -1,23 +1,42 @@
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier, IsolationForest
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.model_selection import train_test_split
-from sklearn.cluster import DBSCAN
+from schemas import parse_timestamps
+from storage import load_frame, save_frame
+from shardeddetector import ShardedAnomalyDetector
 import warnings
 warnings.filterwarnings('ignore')
 
 class CampusSecuritySystem:
-    def __init__(self):
+    def __init__(self, feature_store=None, shard_by=None, profiles=None, max_workers=None,
+                 rolling_features=None, suppression_window='1h'):
+        # scikit-learn is imported on first use: importing this module (for
+        # PIPELINE_STAGES, or from an API worker) should not cost a second
+        from sklearn.ensemble import RandomForestClassifier, IsolationForest
+        from sklearn.preprocessing import StandardScaler
+        
         self.scaler = StandardScaler()
         self.anomaly_detector = IsolationForest(contamination=0.1, random_state=42)
         self.activity_predictor = RandomForestClassifier(n_estimators=100, random_state=42)
         self.label_encoders = {}
+        self.feature_store = feature_store
+        # Point-in-time features already computed for the data (e.g. by the
+        # API at upload), row for row; used instead of folding it into the store
+        self.rolling_features = rolling_features
+        # With shard_by (e.g. ['building', 'role']) anomalies are scored per
+        # shard across a process pool; roles come from the profiles table
+        self.sharded_detector = None
+        if shard_by:
+            self.sharded_detector = ShardedAnomalyDetector(shard_by=shard_by, contamination=0.1,
+                                                           max_workers=max_workers, random_state=42)
+        self.roles = ShardedAnomalyDetector.role_lookup(profiles) if profiles is not None else None
+        # Window for collapsing bursts of alerts per entity in run_full_analysis
+        # (None keeps every alert)
+        self.suppression_window = suppression_window
         
     def load_data(self, filepath):
-        """Load data from Excel file"""
+        """Load data from a Parquet, Feather, CSV or Excel file"""
         try:
-            df = pd.read_excel(filepath)
+            df = load_frame(filepath)
             print(f"Loaded {len(df)} records")
             return df
         except Exception as e:
@@ -26,13 +45,16 @@ class CampusSecuritySystem:
     
     def entity_resolution(self, df):
         """Link identifiers and resolve entities using clustering"""
+        from sklearn.cluster import DBSCAN
+        from sklearn.preprocessing import LabelEncoder
+        
         # Create feature matrix for entity matching
         features = []
         entity_cols = ['student_id', 'card_id', 'mac_address', 'building', 'timestamp']
         
         for col in entity_cols:
             if col in df.columns:
-                if df[col].dtype == 'object':
+                if df[col].dtype == 'object' or isinstance(df[col].dtype, pd.CategoricalDtype):
                     if col not in self.label_encoders:
                         self.label_encoders[col] = LabelEncoder()
                         df[f'{col}_encoded'] = self.label_encoders[col].fit_transform(df[col].astype(str))
@@ -51,7 +73,7 @@ class CampusSecuritySystem:
     def reconstruct_activity_history(self, df):
         """Reconstruct user activity timeline"""
         if 'timestamp' in df.columns:
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
+            df['timestamp'] = parse_timestamps(df['timestamp'])
             df = df.sort_values('timestamp')
         
         # Group by entity
@@ -71,6 +93,8 @@ class CampusSecuritySystem:
     
     def predict_missing_data(self, df):
         """Predict missing values using ML"""
+        from sklearn.ensemble import RandomForestClassifier
+        
         df_copy = df.copy()
         
         # Identify columns with missing data
@@ -98,11 +122,34 @@ class CampusSecuritySystem:
         
         return df_copy
     
+    def add_rolling_features(self, df):
+        """Attach point-in-time rolling features from the feature store"""
+        if 'student_id' not in df.columns or 'timestamp' not in df.columns:
+            return df
+        
+        if self.rolling_features is not None:
+            features = self.rolling_features
+        elif self.feature_store is not None:
+            features = self.feature_store.update_frame(df)
+        else:
+            return df
+        for col in features.columns:
+            df[col] = features[col].to_numpy()
+        return df
+    
     def detect_anomalies(self, df):
         """Detect anomalous behavior using Isolation Forest"""
         # Select numerical features
         numerical_cols = df.select_dtypes(include=[np.number]).columns.tolist()
         
+        if len(numerical_cols) > 0 and self.sharded_detector is not None:
+            # Forests split between each feature's min and max, so the
+            # shards need no scaling
+            df['anomaly_score'], df['anomaly_shard'] = self.sharded_detector.fit_predict(
+                df, numerical_cols, self.roles)
+            df['is_anomaly'] = df['anomaly_score'] < 0
+            return df, df[df['is_anomaly']]
+        
         if len(numerical_cols) > 0:
             X = df[numerical_cols].fillna(0)
             X_scaled = self.scaler.fit_transform(X)
@@ -118,54 +165,117 @@ class CampusSecuritySystem:
         
         return df, pd.DataFrame()
     
-    def generate_alerts(self, anomalies, threshold=-0.5):
-        """Generate security alerts for anomalies"""
-        alerts = []
-        
-        for idx, row in anomalies.iterrows():
-            if row['anomaly_score'] < threshold:
-                alert = {
-                    'alert_id': f"ALERT_{idx}",
-                    'timestamp': row.get('timestamp', 'Unknown'),
-                    'entity': row.get('student_id', row.get('entity_cluster', 'Unknown')),
-                    'severity': 'HIGH' if row['anomaly_score'] < -0.7 else 'MEDIUM',
-                    'anomaly_score': row['anomaly_score'],
-                    'description': f"Unusual activity detected with score {row['anomaly_score']:.2f}"
-                }
-                alerts.append(alert)
-        
-        return pd.DataFrame(alerts)
+    def generate_alerts(self, anomalies, threshold=-0.5, suppression_window=None):
+        """Generate security alerts for anomalies
+
+        Alerts are built column-wise rather than row by row. When
+        ``suppression_window`` is given (e.g. '1h'), consecutive alerts for
+        the same entity that are no further apart than the window are
+        collapsed into a single alert carrying the worst score.
+        """
+        columns = ['alert_id', 'timestamp', 'entity', 'severity', 'anomaly_score', 'description']
+        if 'anomaly_score' not in anomalies.columns:
+            return pd.DataFrame(columns=columns)
+        
+        flagged = anomalies[anomalies['anomaly_score'] < threshold]
+        scores = flagged['anomaly_score'].to_numpy(dtype=float)
+        
+        if 'student_id' in flagged.columns:
+            entities = flagged['student_id'].to_numpy()
+        elif 'entity_cluster' in flagged.columns:
+            entities = flagged['entity_cluster'].to_numpy()
+        else:
+            entities = np.full(len(flagged), 'Unknown', dtype=object)
+        
+        alerts = pd.DataFrame({
+            'alert_id': np.char.add('ALERT_', flagged.index.astype(str).to_numpy(dtype=str)).astype(object),
+            'timestamp': flagged['timestamp'].to_numpy() if 'timestamp' in flagged.columns else 'Unknown',
+            'entity': entities,
+            'severity': np.where(scores < -0.7, 'HIGH', 'MEDIUM').astype(object),
+            'anomaly_score': scores,
+            'description': np.char.add('Unusual activity detected with score ',
+                                       np.char.mod('%.2f', scores)).astype(object)
+        }, columns=columns)
+        
+        if suppression_window is not None and 'timestamp' in flagged.columns and len(alerts) > 0:
+            alerts = self._suppress_alerts(alerts, pd.Timedelta(suppression_window))
+        
+        return alerts
+    
+    def _suppress_alerts(self, alerts, window):
+        """Collapse bursts of alerts per entity into one alert per burst"""
+        alerts = alerts.assign(_ts=parse_timestamps(alerts['timestamp']))
+        alerts = alerts.sort_values(['entity', '_ts'], kind='stable').reset_index(drop=True)
+        
+        # A new burst starts on an entity change or a gap wider than the window;
+        # alerts without a parseable time (sorted last) each stand alone
+        new_entity = alerts['entity'].ne(alerts['entity'].shift()).to_numpy()
+        wide_gap = (alerts['_ts'].diff() > window).to_numpy()
+        no_time = alerts['_ts'].isna().to_numpy()
+        burst = np.cumsum(new_entity | wide_gap | no_time)
+        
+        grouped = alerts.groupby(burst, sort=True)
+        merged = alerts.loc[grouped['anomaly_score'].idxmin().to_numpy()].copy()
+        merged['timestamp'] = grouped['timestamp'].first().to_numpy()
+        merged['last_seen'] = grouped['timestamp'].last().to_numpy()
+        merged['suppressed_count'] = grouped.size().to_numpy() - 1
+        
+        merged = merged.sort_values('_ts', kind='stable').drop(columns='_ts')
+        return merged.reset_index(drop=True)
+    
+    # Stage names reported by run_full_analysis
+    PIPELINE_STAGES = [
+        'Loading data',
+        'Performing entity resolution',
+        'Reconstructing activity histories',
+        'Predicting missing data',
+        'Detecting anomalies',
+    ]
     
-    def run_full_analysis(self, filepath):
-        """Run complete analysis pipeline"""
+    def _stage(self, number, progress):
+        """Announce a pipeline stage and notify the progress callback"""
+        name = self.PIPELINE_STAGES[number - 1]
+        prefix = "\n" if number == 1 else ""
+        print(f"{prefix}[{number}/{len(self.PIPELINE_STAGES)}] {name}...")
+        if progress is not None:
+            progress(number, name)
+    
+    def run_full_analysis(self, source, progress=None):
+        """Run complete analysis pipeline
+        
+        `source` is a file path or an already loaded DataFrame. `progress`,
+        if given, is called as progress(stage_number, stage_name) before each
+        stage; it may raise to abort the run between stages.
+        """
         print("=" * 50)
         print("CAMPUS SECURITY MONITORING SYSTEM")
         print("=" * 50)
         
         # Load data
-        print("\n[1/5] Loading data...")
-        df = self.load_data(filepath)
+        self._stage(1, progress)
+        df = source.copy(deep=False) if isinstance(source, pd.DataFrame) else self.load_data(source)
         if df is None:
             return None
         
         # Entity resolution
-        print("[2/5] Performing entity resolution...")
+        self._stage(2, progress)
         df = self.entity_resolution(df)
         
         # Reconstruct activity
-        print("[3/5] Reconstructing activity histories...")
+        self._stage(3, progress)
         activity_history = self.reconstruct_activity_history(df)
         
         # Predict missing data
-        print("[4/5] Predicting missing data...")
+        self._stage(4, progress)
         df = self.predict_missing_data(df)
         
         # Detect anomalies
-        print("[5/5] Detecting anomalies...")
+        self._stage(5, progress)
+        df = self.add_rolling_features(df)
         df, anomalies = self.detect_anomalies(df)
         
         # Generate alerts
-        alerts = self.generate_alerts(anomalies)
+        alerts = self.generate_alerts(anomalies, suppression_window=self.suppression_window)
         
         print(f"\n✓ Analysis complete!")
         print(f"  - Total records: {len(df)}")
@@ -184,11 +294,11 @@ class CampusSecuritySystem:
 if __name__ == "__main__":
     system = CampusSecuritySystem()
     
-    # Replace with your Excel file path
-    results = system.run_full_analysis('campus_data.xlsx')
+    # Replace with your data file path (Parquet, Feather, CSV or Excel)
+    results = system.run_full_analysis('campus_data.parquet')
     
     if results:
         # Save results
-        results['data'].to_excel('processed_data.xlsx', index=False)
-        results['alerts'].to_excel('security_alerts.xlsx', index=False)
-        print("\n✓ Results saved to Excel files")
\ No newline at end of file
+        save_frame(results['data'], 'processed_data.parquet')
+        save_frame(results['alerts'], 'security_alerts.parquet')
+        print("\n✓ Results saved to Parquet files")
\ No newline at end of file
@@ -0,0 +1,64 @@
+"""
+Request Metrics for Campus Security System
+Per-endpoint latency percentiles and throughput over a sliding window
+"""
+
+import threading
+import time
+from collections import defaultdict, deque
+
+import numpy as np
+
+
+class EndpointMetrics:
+    """
+    Rolling latency samples per endpoint
+
+    Keeps the last `window` request durations for each endpoint plus
+    lifetime counters; snapshots report p50/p95/p99 and requests per
+    second over the retained samples.
+    """
+
+    def __init__(self, window=2000):
+        self.window = window
+        self.samples = defaultdict(lambda: deque(maxlen=window))  # {name: deque[(finished_at, seconds)]}
+        self.counts = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.extra = defaultdict(lambda: deque(maxlen=window))  # {name: deque[value]} e.g. batch sizes
+        self.lock = threading.Lock()
+
+    def record(self, name, seconds, error=False):
+        with self.lock:
+            self.samples[name].append((time.monotonic(), seconds))
+            self.counts[name] += 1
+            if error:
+                self.errors[name] += 1
+
+    def record_value(self, name, value):
+        """Track an auxiliary per-endpoint value, reported as its mean"""
+        with self.lock:
+            self.extra[name].append(value)
+
+    def snapshot(self):
+        with self.lock:
+            samples = {name: list(values) for name, values in self.samples.items()}
+            extra = {name: list(values) for name, values in self.extra.items()}
+            counts = dict(self.counts)
+            errors = dict(self.errors)
+
+        report = {}
+        for name, entries in samples.items():
+            finished = np.array([t for t, _ in entries])
+            ms = np.array([s for _, s in entries]) * 1000
+            span = finished[-1] - finished[0] if len(finished) > 1 else 0.0
+            report[name] = {
+                'count': counts[name],
+                'errors': errors.get(name, 0),
+                'p50_ms': round(float(np.percentile(ms, 50)), 2),
+                'p95_ms': round(float(np.percentile(ms, 95)), 2),
+                'p99_ms': round(float(np.percentile(ms, 99)), 2),
+                'requests_per_sec': round(len(entries) / span, 1) if span > 0 else None,
+            }
+        for name, values in extra.items():
+            report.setdefault(name, {})['mean'] = round(float(np.mean(values)), 2)
+        return report
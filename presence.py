@@ -0,0 +1,306 @@
+"""
+Presence Store for Campus Security System
+Location presence intervals partitioned by location and time bucket, for
+"who was where" range queries, per-entity trajectories and co-presence
+joins over the linked event store
+"""
+
+import numpy as np
+import pandas as pd
+
+from queryengine import HashIndex
+
+
+PRESENCE_COLUMNS = ['entity_id', 'location', 'start', 'end', 'source']
+
+
+class _Codes:
+    """Append-only label <-> integer code mapping"""
+
+    def __init__(self):
+        self.labels = []
+        self.lookup = {}
+
+    def encode(self, values):
+        """Codes for a Series of labels, registering unseen ones (missing -> -1)"""
+        cat = values if isinstance(values.dtype, pd.CategoricalDtype) else values.astype('category')
+        mapping = np.array([self._code(label) for label in cat.cat.categories], dtype=np.int64)
+        codes = cat.cat.codes.to_numpy()
+        return np.where(codes >= 0, mapping[np.maximum(codes, 0)] if len(mapping) else -1, -1)
+
+    def _code(self, label):
+        code = self.lookup.get(label)
+        if code is None:
+            code = self.lookup[label] = len(self.labels)
+            self.labels.append(label)
+        return code
+
+    def decode(self, codes):
+        return np.asarray(self.labels, dtype=object)[codes]
+
+
+class PresenceStore:
+    """
+    Presence intervals indexed for location/time and entity queries
+
+    Every event with a location becomes an interval: room bookings span
+    start to end, point events (swipes, Wi-Fi associations, CCTV
+    sightings) last `dwell`. Intervals live in flat append-only arrays;
+    each (location, time bucket) partition holds the positions of its
+    intervals sorted by start, so a range query is a binary search in the
+    few partitions it touches. A per-entity index (sorted by start) serves
+    trajectories. Co-presence is a sweep over the sorted partitions using
+    the longest interval in each partition to bound the look-back.
+    """
+
+    def __init__(self, bucket='1D', dwell='15min'):
+        """
+        Args:
+            bucket: Partition width in time (pandas offset string)
+            dwell: Assumed duration of point events
+        """
+        self.bucket_ns = pd.Timedelta(bucket).value
+        self.dwell_ns = pd.Timedelta(dwell).value
+        self.entities = _Codes()
+        self.locations = _Codes()
+        self.sources = _Codes()
+
+        self.entity = np.empty(0, dtype=np.int64)
+        self.location = np.empty(0, dtype=np.int64)
+        self.source = np.empty(0, dtype=np.int64)
+        self.start = np.empty(0, dtype=np.int64)
+        self.end = np.empty(0, dtype=np.int64)
+
+        # {(location code, bucket): (positions sorted by start, sorted starts, longest interval)}
+        self.partitions = {}
+        self.longest = {}  # {location code: longest interval}
+        self._entity_index = None
+
+    @classmethod
+    def from_events(cls, events, bucket='1D', dwell='15min'):
+        """Build from a linked event store (see linking.EntityLinker.link)"""
+        store = cls(bucket=bucket, dwell=dwell)
+        store.add_events(events)
+        return store
+
+    def __len__(self):
+        return len(self.start)
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def add_events(self, events):
+        """
+        Add events from the linked event store
+
+        Booking start/end events are paired by record_id into one interval;
+        other located events become `dwell`-long intervals. Events without
+        an entity, location or timestamp are skipped.
+        """
+        located = events[events['entity_id'].notna() & events['location'].notna() & events['timestamp'].notna()]
+        activity = located['activity_type'].astype(str)
+
+        starts = located[activity == 'Room/Booking Start']
+        ends = located[activity == 'Room/Booking End']
+        bookings = starts[['entity_id', 'location', 'timestamp', 'source', 'record_id']].merge(
+            ends[['record_id', 'timestamp']].rename(columns={'timestamp': 'end'}), on='record_id', how='left'
+        )
+        end = bookings['end'].fillna(bookings['timestamp'] + pd.Timedelta(self.dwell_ns, 'ns'))
+        self.add_intervals(bookings['entity_id'], bookings['location'], bookings['timestamp'], end, bookings['source'])
+
+        points = located[~activity.isin(['Room/Booking Start', 'Room/Booking End'])]
+        self.add_intervals(points['entity_id'], points['location'], points['timestamp'],
+                           points['timestamp'] + pd.Timedelta(self.dwell_ns, 'ns'), points['source'])
+        return self
+
+    def add_intervals(self, entity_id, location, start, end, source=None):
+        """
+        Append presence intervals (equal-length Series); only the partitions
+        receiving new intervals are re-sorted
+        """
+        if len(start) == 0:
+            return self
+        offset = len(self.start)
+        start = pd.to_datetime(start).to_numpy(dtype='datetime64[ns]').view(np.int64)
+        end = np.maximum(pd.to_datetime(end).to_numpy(dtype='datetime64[ns]').view(np.int64), start)
+        location = self.locations.encode(pd.Series(location).reset_index(drop=True))
+        source = self.sources.encode(pd.Series(source if source is not None else 'unknown', index=range(len(start))).astype(str))
+
+        self.entity = np.concatenate([self.entity, self.entities.encode(pd.Series(entity_id).reset_index(drop=True))])
+        self.location = np.concatenate([self.location, location])
+        self.source = np.concatenate([self.source, source])
+        self.start = np.concatenate([self.start, start])
+        self.end = np.concatenate([self.end, end])
+        self._entity_index = None
+
+        # Group the new intervals by partition, then merge into existing ones
+        bucket = start // self.bucket_ns
+        order = np.lexsort((start, bucket, location))
+        keys = np.stack([location[order], bucket[order]], axis=1)
+        boundaries = np.flatnonzero(np.any(keys[1:] != keys[:-1], axis=1)) + 1
+        for group in np.split(order, boundaries):
+            key = (int(location[group[0]]), int(bucket[group[0]]))
+            positions = group + offset
+            existing = self.partitions.get(key)
+            if existing is not None:
+                positions = np.concatenate([existing[0], positions])
+                positions = positions[np.argsort(self.start[positions], kind='stable')]
+            longest = int((self.end[positions] - self.start[positions]).max())
+            self.partitions[key] = (positions, self.start[positions], longest)
+            self.longest[key[0]] = max(self.longest.get(key[0], 0), longest)
+        return self
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _frame(self, positions):
+        return pd.DataFrame({
+            'entity_id': self.entities.decode(self.entity[positions]),
+            'location': self.locations.decode(self.location[positions]),
+            'start': pd.to_datetime(self.start[positions]),
+            'end': pd.to_datetime(self.end[positions]),
+            'source': self.sources.decode(self.source[positions]),
+        })
+
+    def _overlapping(self, location_code, lo, hi):
+        """Positions of intervals at a location overlapping [lo, hi)"""
+        found = []
+        # Intervals starting in earlier buckets can still reach into the range
+        first_bucket = (lo - self.longest.get(location_code, 0)) // self.bucket_ns
+        for bucket in range(int(first_bucket), int(hi // self.bucket_ns) + 1):
+            partition = self.partitions.get((location_code, bucket))
+            if partition is None:
+                continue
+            positions, starts, longest = partition
+            left = np.searchsorted(starts, lo - longest, side='left')
+            right = np.searchsorted(starts, hi, side='left')
+            candidates = positions[left:right]
+            found.append(candidates[self.end[candidates] > lo])
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+    def at(self, location, start, end):
+        """
+        Who was at a location between start and end
+
+        Returns:
+            DataFrame with PRESENCE_COLUMNS for every overlapping interval,
+            ordered by start
+        """
+        code = self.locations.lookup.get(location)
+        if code is None:
+            return self._frame(np.empty(0, dtype=np.int64))
+        positions = self._overlapping(code, pd.Timestamp(start).value, pd.Timestamp(end).value)
+        return self._frame(positions[np.argsort(self.start[positions], kind='stable')])
+
+    def _entity_positions(self, entity_id, start=None, end=None):
+        if self._entity_index is None:
+            self._entity_index = HashIndex(pd.Series(self.entity), sort_key=self.start)
+        code = self.entities.lookup.get(entity_id)
+        if code is None:
+            return np.empty(0, dtype=np.int64)
+        if start is None and end is None:
+            return self._entity_index.get(code)
+        longest = max(self.longest.values(), default=0)
+        lo = pd.Timestamp(start).value - longest if start is not None else np.iinfo(np.int64).min
+        hi = pd.Timestamp(end).value if end is not None else np.iinfo(np.int64).max
+        positions = self._entity_index.get_range(code, lo, hi)
+        if start is not None:
+            positions = positions[self.end[positions] > pd.Timestamp(start).value]
+        return positions
+
+    def trajectory(self, entity_id, start=None, end=None):
+        """An entity's presence intervals in time order (optionally within a range)"""
+        return self._frame(self._entity_positions(entity_id, start, end))
+
+    def co_present(self, entity_id, start, end, min_overlap='0s'):
+        """
+        Entities that shared a location with entity_id between start and end
+
+        Args:
+            entity_id: Entity to check
+            start, end: Time range
+            min_overlap: Minimum overlap of two intervals to count
+
+        Returns:
+            DataFrame (entity_id, encounters, overlap_minutes, locations,
+            first_seen, last_seen) sorted by total overlap
+        """
+        lo, hi = pd.Timestamp(start).value, pd.Timestamp(end).value
+        threshold = pd.Timedelta(min_overlap).value
+        target = self._entity_positions(entity_id, start, end)
+        target_code = self.entities.lookup.get(entity_id)
+
+        matches, overlaps, anchors = [], [], []
+        for t in target:
+            s, e = max(self.start[t], lo), min(self.end[t], hi)
+            if e <= s:
+                continue
+            others = self._overlapping(int(self.location[t]), s, e)
+            others = others[self.entity[others] != target_code]
+            overlap = np.minimum(self.end[others], e) - np.maximum(self.start[others], s)
+            keep = overlap > threshold if threshold else overlap > 0
+            matches.append(others[keep])
+            overlaps.append(overlap[keep])
+            anchors.append(np.full(int(keep.sum()), t))
+
+        if not matches or not sum(len(m) for m in matches):
+            return pd.DataFrame(columns=['entity_id', 'encounters', 'overlap_minutes', 'locations', 'first_seen', 'last_seen'])
+
+        others = np.concatenate(matches)
+        entity_codes, inverse = np.unique(self.entity[others], return_inverse=True)
+        overlap = np.concatenate(overlaps)
+        starts = self.start[others]
+        first_seen = np.full(len(entity_codes), np.iinfo(np.int64).max)
+        last_seen = np.full(len(entity_codes), np.iinfo(np.int64).min)
+        np.minimum.at(first_seen, inverse, starts)
+        np.maximum.at(last_seen, inverse, starts)
+
+        # Distinct locations per entity from the unique (entity, location) pairs
+        pairs = np.unique(np.stack([inverse, self.location[np.concatenate(anchors)]], axis=1), axis=0)
+        split = np.searchsorted(pairs[:, 0], np.arange(1, len(entity_codes)))
+        locations = [list(self.locations.decode(group)) for group in np.split(pairs[:, 1], split)]
+
+        result = pd.DataFrame({
+            'entity_id': self.entities.decode(entity_codes),
+            'encounters': np.bincount(inverse),
+            'overlap_minutes': np.bincount(inverse, weights=overlap) / 60e9,
+            'locations': locations,
+            'first_seen': pd.to_datetime(first_seen),
+            'last_seen': pd.to_datetime(last_seen),
+        })
+        return result.sort_values('overlap_minutes', ascending=False, kind='stable').reset_index(drop=True)
+
+    def pairs(self, location, start, end):
+        """
+        All co-present pairs at a location within a time range
+
+        A sweep over the intervals sorted by start: each interval pairs with
+        the later-starting intervals that begin before it ends.
+
+        Returns:
+            DataFrame (entity_a, entity_b, start, overlap_minutes)
+        """
+        code = self.locations.lookup.get(location)
+        lo, hi = pd.Timestamp(start).value, pd.Timestamp(end).value
+        positions = self._overlapping(code, lo, hi) if code is not None else np.empty(0, dtype=np.int64)
+        starts = np.maximum(self.start[positions], lo)
+        ends = np.minimum(self.end[positions], hi)
+        order = np.argsort(starts, kind='stable')
+        positions, starts, ends = positions[order], starts[order], ends[order]
+
+        # Interval i overlaps i+1 .. stop[i]-1 (those start before i ends)
+        stop = np.searchsorted(starts, ends, side='left')
+        counts = np.maximum(stop - np.arange(len(starts)) - 1, 0)
+        a = np.repeat(np.arange(len(starts)), counts)
+        b = a + 1 + (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))
+        keep = self.entity[positions[a]] != self.entity[positions[b]]
+        a, b = a[keep], b[keep]
+
+        return pd.DataFrame({
+            'entity_a': self.entities.decode(self.entity[positions[a]]),
+            'entity_b': self.entities.decode(self.entity[positions[b]]),
+            'start': pd.to_datetime(starts[b]),
+            'overlap_minutes': (np.minimum(ends[a], ends[b]) - starts[b]) / 60e9,
+        })
@@ -0,0 +1,215 @@
+"""
+Query Engine for Campus Security System
+In-memory indexes over an activity DataFrame so searches and entity
+lookups never scan or copy the full frame
+"""
+
+import numpy as np
+import pandas as pd
+
+from schemas import parse_timestamps
+
+
+_NAT = np.iinfo('int64').min
+
+
+class HashIndex:
+    """
+    Value -> row positions, stored CSR-style
+
+    Rows are grouped by the column's category code; `offsets[c]:offsets[c+1]`
+    slices the positions of code `c` out of one sorted array.
+    """
+
+    def __init__(self, values, sort_key=None):
+        """
+        Args:
+            values: Column to index (converted to categorical codes)
+            sort_key: Optional int64 array to order rows within each value (e.g. time)
+        """
+        cat = values if isinstance(values.dtype, pd.CategoricalDtype) else values.astype('category')
+        codes = self.codes = cat.cat.codes.to_numpy()
+        self.lookup = {label: code for code, label in enumerate(cat.cat.categories)}
+
+        if sort_key is None:
+            self.positions = np.argsort(codes, kind='stable')
+            self.keys = None
+        else:
+            self.positions = np.lexsort((sort_key, codes))
+            self.keys = sort_key[self.positions]
+
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.lookup))
+        # Rows with missing values (code -1) sort first; skip past them
+        self.offsets = np.concatenate([[0], np.cumsum(counts)]) + int((codes < 0).sum())
+
+    def _slice(self, value):
+        code = self.lookup.get(value)
+        if code is None:
+            return 0, 0
+        return self.offsets[code], self.offsets[code + 1]
+
+    def get(self, value):
+        """Positions of rows equal to value (ordered by sort_key if given)"""
+        lo, hi = self._slice(value)
+        return self.positions[lo:hi]
+
+    def count(self, value):
+        lo, hi = self._slice(value)
+        return hi - lo
+
+    def get_range(self, value, lo_key, hi_key):
+        """Positions of rows equal to value with lo_key <= sort_key <= hi_key"""
+        lo, hi = self._slice(value)
+        keys = self.keys[lo:hi]
+        start = lo + np.searchsorted(keys, lo_key, side='left')
+        stop = lo + np.searchsorted(keys, hi_key, side='right')
+        return self.positions[start:stop]
+
+
+class QueryIndex:
+    """
+    Indexes built once per uploaded dataset
+
+    - hash indexes on student_id and building
+    - a timestamp-sorted index for range queries via searchsorted
+    - a composite (student_id, timestamp) index for per-entity time ranges
+    """
+
+    def __init__(self, df, entity_col='student_id', location_col='building', time_col='timestamp'):
+        self.df = df
+        self.entity_col = entity_col
+        self.location_col = location_col
+        self.time_col = time_col
+
+        self.times = None
+        if time_col in df.columns:
+            ts = parse_timestamps(df[time_col])
+            self.times = ts.to_numpy(dtype='datetime64[ns]').view('int64')
+            self.time_order = np.argsort(self.times, kind='stable')
+            self.sorted_times = self.times[self.time_order]
+
+        self.entities = None
+        if entity_col in df.columns:
+            self.entities = HashIndex(df[entity_col], sort_key=self.times)
+
+        self.locations = None
+        if location_col in df.columns:
+            self.locations = HashIndex(df[location_col])
+
+    @staticmethod
+    def _bound(value, name):
+        try:
+            ts = pd.Timestamp(value)
+        except (TypeError, ValueError, OverflowError):
+            ts = pd.NaT
+        if ts is pd.NaT:
+            raise ValueError(f"{name} must be a date or timestamp")
+        return ts.value
+
+    def _time_bounds(self, date_from, date_to):
+        """
+        int64 bounds for a date range; NaT rows fall outside any bounded range
+
+        Raises:
+            ValueError: For a bound that is not a date
+        """
+        lo = self._bound(date_from, 'date_from') if date_from is not None else _NAT + 1
+        hi = self._bound(date_to, 'date_to') if date_to is not None else np.iinfo('int64').max
+        return lo, hi
+
+    def search(self, student_id=None, building=None, date_from=None, date_to=None):
+        """
+        Row positions matching all given filters, in original row order
+
+        The most selective available index supplies the candidates; the
+        remaining filters are applied to those candidates only.
+
+        Raises:
+            ValueError: For a date_from or date_to that is not a date
+        """
+        if student_id is not None and self.entities is None:
+            return np.array([], dtype=np.int64)
+
+        has_dates = date_from is not None or date_to is not None
+        if has_dates and self.times is None:
+            has_dates = False
+            date_from = date_to = None
+        lo, hi = self._time_bounds(date_from, date_to)
+
+        if student_id is not None and self.entities is not None:
+            if has_dates:
+                positions = self.entities.get_range(student_id, lo, hi)
+            else:
+                positions = self.entities.get(student_id)
+        elif has_dates:
+            start = np.searchsorted(self.sorted_times, lo, side='left')
+            stop = np.searchsorted(self.sorted_times, hi, side='right')
+            positions = self.time_order[start:stop]
+        elif building is not None and self.locations is not None:
+            positions = self.locations.get(building)
+            building = None
+        else:
+            positions = np.arange(len(self.df))
+
+        if building is not None:
+            if self.locations is None:
+                return np.array([], dtype=np.int64)
+            code = self.locations.lookup.get(building, -2)
+            positions = positions[self.locations.codes[positions] == code]
+
+        return np.sort(positions)
+
+    def entity_positions(self, entity_id):
+        """Row positions for one entity, in time order"""
+        if self.entities is None:
+            return np.array([], dtype=np.int64)
+        return self.entities.get(entity_id)
+
+    def take(self, positions, columns=None):
+        """Materialize only the selected rows (and columns)"""
+        if columns is not None:
+            columns = [c for c in columns if c in self.df.columns]
+            return self.df.iloc[positions, [self.df.columns.get_loc(c) for c in columns]]
+        return self.df.iloc[positions]
+
+    def paginate(self, positions, limit, offset=0, cursor=None):
+        """
+        Slice one page out of sorted result positions
+
+        Args:
+            positions: Sorted row positions from search()
+            limit: Page size
+            offset: Rows to skip (ignored when cursor is given)
+            cursor: Row position to resume from, as returned in next_cursor
+
+        Returns:
+            (page_positions, next_cursor) where next_cursor is None on the last page
+
+        Raises:
+            ValueError: For a limit below 1, a negative offset or a cursor that
+                is not a non-negative integer
+        """
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        if offset < 0:
+            raise ValueError("offset must not be negative")
+        if cursor is not None:
+            if isinstance(cursor, bool) or not str(cursor).isdigit():
+                raise ValueError("cursor must be a next_cursor value")
+            cursor = int(cursor)
+        start = np.searchsorted(positions, cursor) if cursor is not None else offset
+        page = positions[start:start + limit]
+        next_cursor = int(page[-1]) + 1 if start + limit < len(positions) else None
+        return page, next_cursor
+
+    def records_json(self, positions, columns=None):
+        """Selected rows as a JSON array, timestamps in ISO 8601 as in iter_ndjson"""
+        return self.take(positions, columns).to_json(orient='records', date_format='iso')
+
+    def iter_ndjson(self, positions, columns=None, chunk_size=10_000):
+        """Yield result rows as newline-delimited JSON, serialized chunk by chunk"""
+        for start in range(0, len(positions), chunk_size):
+            chunk = self.take(positions[start:start + chunk_size], columns)
+            text = chunk.to_json(orient='records', lines=True, date_format='iso')
+            # Older pandas versions omit the trailing newline
+            yield text if text.endswith('\n') else text + '\n'
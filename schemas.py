@@ -0,0 +1,288 @@
+"""
+Source Schemas for Campus Security System
+One registry of the data/given files (column types and exact timestamp
+formats), schema-driven parsing, and a cache of parsed sources as
+memory-mapped Arrow files
+"""
+
+import hashlib
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+ISO_FORMAT = '%Y-%m-%d %H:%M:%S'
+SHORT_FORMAT = '%m/%d/%Y %H:%M'
+
+# Bump to invalidate every cached parse (e.g. after a parsing change)
+CACHE_VERSION = 1
+
+
+class SourceSchema:
+    """
+    Columns of one source file
+
+    `columns` maps each column to 'string', 'category', 'float64' or
+    'timestamp'; every timestamp column has an exact strptime format in
+    `timestamps`. Columns not declared are read with Arrow's inference.
+    """
+
+    def __init__(self, key, filename, columns, timestamps=None):
+        self.key = key
+        self.filename = filename
+        self.columns = columns
+        self.timestamps = timestamps or {}
+        missing = [col for col, kind in columns.items() if kind == 'timestamp' and col not in self.timestamps]
+        if missing:
+            raise ValueError(f"{key}: no timestamp format for {missing}")
+
+    @property
+    def fingerprint(self):
+        """Changes whenever the declared schema (or CACHE_VERSION) changes"""
+        spec = repr((CACHE_VERSION, sorted(self.columns.items()), sorted(self.timestamps.items())))
+        return hashlib.sha1(spec.encode()).hexdigest()[:16]
+
+    def arrow_types(self):
+        """Arrow read types (timestamps are read as text and parsed afterwards)"""
+        import pyarrow as pa
+
+        types = {
+            'string': pa.string(),
+            'category': pa.dictionary(pa.int32(), pa.string()),
+            'float64': pa.float64(),
+            'timestamp': pa.string(),
+        }
+        return {col: types[kind] for col, kind in self.columns.items()}
+
+    def read(self, path):
+        """
+        Parse a source file with this schema
+
+        Returns:
+            pyarrow Table; unparseable timestamps are null
+        """
+        import pyarrow as pa
+        import pyarrow.csv as pv
+
+        table = pv.read_csv(
+            str(path),
+            convert_options=pv.ConvertOptions(column_types=self.arrow_types(), strings_can_be_null=True),
+        )
+        for col, fmt in self.timestamps.items():
+            if col in table.column_names:
+                i = table.column_names.index(col)
+                table = table.set_column(i, pa.field(col, pa.timestamp('ns')),
+                                         parse_timestamp_array(table.column(col), fmt))
+        return table
+
+
+SOURCES = {
+    'profiles': SourceSchema('profiles', 'student or staff profiles.csv', {
+        'entity_id': 'string', 'name': 'string', 'role': 'category', 'email': 'string',
+        'department': 'category', 'student_id': 'string', 'staff_id': 'string',
+        'card_id': 'string', 'device_hash': 'string', 'face_id': 'string',
+    }),
+    'card_swipes': SourceSchema('card_swipes', 'campus card_swipes.csv', {
+        'card_id': 'string', 'location_id': 'category', 'timestamp': 'timestamp',
+    }, {'timestamp': ISO_FORMAT}),
+    'wifi_logs': SourceSchema('wifi_logs', 'wifi_associations_logs.csv', {
+        'device_hash': 'string', 'ap_id': 'category', 'timestamp': 'timestamp',
+    }, {'timestamp': SHORT_FORMAT}),
+    'cctv_frames': SourceSchema('cctv_frames', 'cctv_frames.csv', {
+        'frame_id': 'string', 'location_id': 'category', 'timestamp': 'timestamp', 'face_id': 'string',
+    }, {'timestamp': SHORT_FORMAT}),
+    'lab_bookings': SourceSchema('lab_bookings', 'lab_bookings.csv', {
+        'booking_id': 'string', 'entity_id': 'string', 'room_id': 'category',
+        'start_time': 'timestamp', 'end_time': 'timestamp', 'attended (YES/NO)': 'category',
+    }, {'start_time': SHORT_FORMAT, 'end_time': SHORT_FORMAT}),
+    'library_checkouts': SourceSchema('library_checkouts', 'library_checkouts.csv', {
+        'checkout_id': 'string', 'entity_id': 'string', 'book_id': 'string', 'timestamp': 'timestamp',
+    }, {'timestamp': ISO_FORMAT}),
+    'notes': SourceSchema('notes', 'free_text_notes (helpdesk or RSVPs).csv', {
+        'note_id': 'string', 'entity_id': 'string', 'category': 'category', 'text': 'string',
+        'timestamp': 'timestamp',
+    }, {'timestamp': ISO_FORMAT}),
+}
+
+# File names used in data/given
+GIVEN_FILES = {key: schema.filename for key, schema in SOURCES.items()}
+
+
+# ----------------------------------------------------------------------
+# Timestamp parsing
+# ----------------------------------------------------------------------
+
+def guess_format(values):
+    """strptime format of the first non-null string value ('mixed' if unknown)"""
+    from pandas.tseries.api import guess_datetime_format
+
+    values = pd.Series(values).dropna()
+    if values.empty:
+        return 'mixed'
+    first = values.iloc[0]
+    if not isinstance(first, str):
+        return None  # already datetime-like values
+    return guess_datetime_format(first) or 'mixed'
+
+
+def _arrow_format(fmt):
+    # Arrow's strptime has no fractional seconds and returns zoned
+    # timestamps for %z; leave those to pandas
+    return fmt is not None and fmt != 'mixed' and '%f' not in fmt and '%z' not in fmt and '%Z' not in fmt
+
+
+def _pandas_parse(values, fmt):
+    parsed = pd.to_datetime(values, format=fmt or 'mixed', errors='coerce')
+    if getattr(parsed.dt, 'tz', None) is not None:
+        parsed = parsed.dt.tz_convert('UTC').dt.tz_localize(None)  # stored as naive UTC
+    return parsed.astype('datetime64[ns]')
+
+
+def parse_timestamp_array(array, fmt):
+    """Parse an Arrow string array or chunked array; unparseable values become null"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if _arrow_format(fmt):
+        return pc.strptime(array, format=fmt, unit='ns', error_is_null=True)
+    parsed = _pandas_parse(array.to_pandas(), fmt)
+    return pa.array(parsed, type=pa.timestamp('ns'))
+
+
+def parse_timestamps(values, fmt=None):
+    """
+    Parse a column of timestamp strings with one explicit format
+
+    Args:
+        values: Series of strings (or already datetimes, returned as is)
+        fmt: strptime format; by default guessed once from the first value
+            instead of inferred per element
+
+    Returns:
+        datetime64[ns] Series with the same index (invalid values are NaT)
+    """
+    import pyarrow as pa
+
+    values = pd.Series(values) if not isinstance(values, pd.Series) else values
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Parse each distinct value once
+        categories = parse_timestamps(pd.Series(values.cat.categories.astype(str)), fmt).to_numpy()
+        codes = values.cat.codes.to_numpy()
+        parsed = np.where(codes >= 0, categories[np.maximum(codes, 0)], np.datetime64('NaT'))
+        return pd.Series(parsed, index=values.index, name=values.name).astype('datetime64[ns]')
+
+    if fmt is None:
+        fmt = guess_format(values)
+    if not _arrow_format(fmt):
+        return _pandas_parse(values, fmt)
+    strings = values.astype('string')
+    parsed = parse_timestamp_array(pa.array(strings.array, type=pa.string(), from_pandas=True), fmt)
+    return pd.Series(parsed.to_numpy(zero_copy_only=False), index=values.index,
+                     name=values.name).astype('datetime64[ns]')
+
+
+# ----------------------------------------------------------------------
+# Parse cache
+# ----------------------------------------------------------------------
+
+class ParseCache:
+    """
+    Parsed sources stored as uncompressed Arrow IPC files
+
+    Each file records the size and mtime of the CSV it came from and the
+    schema fingerprint; a cached parse is used only while all three still
+    match. Reads are memory-mapped, so numeric and timestamp columns are
+    not copied and a repeated load costs little more than the mapping.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+
+    def path(self, schema):
+        return self.cache_dir / f"{schema.key}.arrow"
+
+    @staticmethod
+    def _stamp(schema, source_path):
+        stat = os.stat(source_path)
+        return {b'source_size': str(stat.st_size).encode(), b'source_mtime_ns': str(stat.st_mtime_ns).encode(),
+                b'fingerprint': schema.fingerprint.encode()}
+
+    def load(self, schema, source_path):
+        """The cached table for source_path, or None if missing or stale"""
+        import pyarrow as pa
+
+        path = self.path(schema)
+        if not path.exists():
+            return None
+        try:
+            reader = pa.ipc.open_file(pa.memory_map(str(path), 'r'))
+        except (OSError, pa.ArrowInvalid):
+            return None
+        metadata = reader.schema.metadata or {}
+        stamp = self._stamp(schema, source_path)
+        if any(metadata.get(k) != v for k, v in stamp.items()):
+            return None
+        return reader.read_all()
+
+    def store(self, schema, source_path, table):
+        """Write a parsed table (atomically, so concurrent readers never see a partial file)"""
+        import pyarrow as pa
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.path(schema)
+        tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+        # The IPC file format allows one dictionary per column; the CSV
+        # reader builds one per block
+        table = table.unify_dictionaries()
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), **self._stamp(schema, source_path)})
+        with pa.OSFile(str(tmp), 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp, path)
+
+
+def default_cache_dir(data_dir):
+    """PARSE_CACHE_DIR if set, else a .parsed directory inside data_dir"""
+    return Path(os.environ.get('PARSE_CACHE_DIR') or Path(data_dir) / '.parsed')
+
+
+def load_source(key, data_dir='data/given', cache_dir=None, use_cache=True):
+    """
+    Load one data/given source as a typed DataFrame
+
+    Args:
+        key: Key of SOURCES (e.g. 'card_swipes')
+        data_dir: Directory holding the CSV files
+        cache_dir: Parse cache directory (default: default_cache_dir(data_dir))
+        use_cache: Read and write the parse cache
+
+    Returns:
+        DataFrame with categoricals for 'category' columns and
+        datetime64[ns] timestamp columns
+    """
+    schema = SOURCES[key]
+    source_path = Path(data_dir) / schema.filename
+    cache = ParseCache(cache_dir or default_cache_dir(data_dir)) if use_cache else None
+
+    table = cache.load(schema, source_path) if cache else None
+    if table is None:
+        table = schema.read(source_path)
+        if cache:
+            try:
+                cache.store(schema, source_path, table)
+            except OSError as e:
+                print(f"Parse cache not written for {key}: {e}")
+    return table.to_pandas(split_blocks=True)
+
+
+def load_sources(data_dir='data/given', cache_dir=None, use_cache=True):
+    """Load every data/given source present in data_dir, keyed like SOURCES"""
+    return {
+        key: load_source(key, data_dir, cache_dir, use_cache)
+        for key, schema in SOURCES.items()
+        if (Path(data_dir) / schema.filename).exists()
+    }
@@ -0,0 +1,295 @@
+"""
+Sharded Anomaly Detection for Campus Security System
+One IsolationForest per building and role, fitted and scored in parallel
+across a process pool, with scores calibrated onto one common scale
+"""
+
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+# Shard trained on every row; scores rows whose own shard is too small or unknown
+FALLBACK = '*'
+
+# Probabilities at which each shard's training score distribution is kept
+CALIBRATION_POINTS = np.linspace(0.0, 1.0, 1001)
+
+# Training rows scored to estimate those quantiles
+CALIBRATION_ROWS = 10_000
+
+# Profile identifier columns an activity row may carry, in lookup order
+ROLE_KEYS = ['entity_id', 'student_id', 'staff_id', 'card_id']
+
+# Rows per scoring task sent to the pool
+SCORE_CHUNK_ROWS = 100_000
+
+
+def _fit_shard(X, params, seed):
+    """
+    Fit one shard's forest on its (already subsampled) rows in a pool worker
+
+    The rows arrive shuffled, so their first CALIBRATION_ROWS give the
+    shard's score quantiles for calibration.
+    """
+    from sklearn.ensemble import IsolationForest
+
+    forest = IsolationForest(random_state=seed, n_jobs=1, **params).fit(X)
+    quantiles = np.quantile(forest.score_samples(X[:CALIBRATION_ROWS]), CALIBRATION_POINTS)
+    return forest, quantiles, len(X)
+
+
+def _score_chunk(forest, X):
+    return forest.score_samples(X)
+
+
+class Shard:
+    """A fitted shard: its forest and the quantiles of its training scores"""
+
+    def __init__(self, key, forest, quantiles, rows):
+        self.key = key
+        self.forest = forest
+        self.quantiles = quantiles
+        self.rows = rows
+
+
+class ShardedAnomalyDetector:
+    """
+    IsolationForests per (building, role) shard
+
+    Each shard models its own normal behaviour, so traffic in a lab is
+    judged against that lab's users rather than the whole campus. Raw
+    scores of different forests are not comparable: a score is first turned
+    into its percentile among its shard's training scores and then mapped
+    through the fallback (all-rows) shard's quantiles. Calibrated scores
+    therefore share one scale, and 0 flags `contamination` of every shard,
+    as IsolationForest.decision_function does for a single forest. The
+    common scale is fixed at the first fit, so shards can be added or
+    retrained independently (fit_shards) without moving the others' scores.
+    """
+
+    def __init__(self, shard_by=('building', 'role'), contamination=0.1, n_estimators=100, max_samples=256,
+                 min_shard_rows=500, max_workers=None, random_state=42):
+        """
+        Args:
+            shard_by: Columns defining shards; 'role' comes from the profiles
+                when the frame has no role column
+            contamination: Share of each shard flagged as anomalous
+            n_estimators: Trees per shard
+            max_samples: Rows drawn per tree
+            min_shard_rows: Smaller shards are scored by the fallback shard
+            max_workers: Pool processes (default: all CPUs; 1 runs in-process)
+            random_state: Seed of every shard's forest
+        """
+        self.shard_by = list(shard_by)
+        self.contamination = contamination
+        self.params = {'n_estimators': n_estimators, 'max_samples': max_samples}
+        self.min_shard_rows = min_shard_rows
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.random_state = random_state
+        self.shards = {}
+        self.reference = None
+        self.threshold = None
+        self.features = None
+
+    # ------------------------------------------------------------------
+    # Partitioning
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def role_lookup(profiles):
+        """Role per profile identifier (entity, student, staff and card ids)"""
+        roles = profiles['role'].astype(str).str.lower().to_numpy()
+        pieces = []
+        for col in ROLE_KEYS:
+            if col in profiles.columns:
+                present = profiles[col].notna().to_numpy()
+                pieces.append(pd.Series(roles[present], index=profiles.loc[present, col].astype(str).to_numpy()))
+        lookup = pd.concat(pieces) if pieces else pd.Series(dtype=object)
+        return lookup[~lookup.index.duplicated()]
+
+    @staticmethod
+    def _roles(df, roles):
+        """Role per row from the first identifier column that resolves"""
+        result = pd.Series(np.nan, index=df.index, dtype=object)
+        if roles is not None:
+            for col in ROLE_KEYS:
+                if col in df.columns:
+                    result = result.fillna(df[col].astype('category').map(roles).astype(object))
+        return result
+
+    def _column(self, df, col, roles):
+        if col == 'role' and 'role' not in df.columns:
+            values = self._roles(df, roles)
+        elif col in df.columns:
+            values = df[col]
+        else:
+            values = pd.Series(np.nan, index=df.index, dtype=object)
+        return values.astype(object).where(values.notna(), 'unknown').astype(str)
+
+    def partition(self, df, roles=None):
+        """
+        Row positions of each shard
+
+        Args:
+            df: Frame holding the shard_by columns (or identifiers for roles)
+            roles: role_lookup(profiles), when df has no role column
+
+        Returns:
+            {shard key: positions}; keys join the shard_by values with '|'
+        """
+        codes, labels = [], []
+        for col in self.shard_by:
+            c, uniques = pd.factorize(self._column(df, col, roles))
+            codes.append(c)
+            labels.append(np.asarray(uniques, dtype=object))
+        if not codes:
+            return {FALLBACK: np.arange(len(df))}
+        combined = np.ravel_multi_index(codes, [len(u) for u in labels])
+        uniques, inverse = np.unique(combined, return_inverse=True)
+        order = np.argsort(inverse, kind='stable')
+        bounds = np.cumsum(np.bincount(inverse, minlength=len(uniques)))[:-1]
+        parts = np.unravel_index(uniques, [len(u) for u in labels])
+        keys = ['|'.join(str(labels[j][parts[j][i]]) for j in range(len(labels))) for i in range(len(uniques))]
+        return dict(zip(keys, np.split(order, bounds)))
+
+    def _matrix(self, df, features=None):
+        if features is None:
+            features = self.features or df.select_dtypes(include=[np.number]).columns.tolist()
+        return np.ascontiguousarray(df[features].fillna(0).to_numpy(dtype=np.float64)), list(features)
+
+    # ------------------------------------------------------------------
+    # Pool
+    # ------------------------------------------------------------------
+
+    def _run(self, fn, tasks):
+        """fn(*task) for every task, across the pool when there is more than one worker"""
+        if self.max_workers == 1 or len(tasks) <= 1:
+            return [fn(*task) for task in tasks]
+        with ProcessPoolExecutor(max_workers=min(self.max_workers, len(tasks))) as pool:
+            futures = [pool.submit(fn, *task) for task in tasks]
+            return [future.result() for future in futures]
+
+    # ------------------------------------------------------------------
+    # Fitting
+    # ------------------------------------------------------------------
+
+    def fit(self, df, features=None, roles=None):
+        """
+        Fit every shard (and the fallback) from scratch
+
+        Args:
+            df: Training frame
+            features: Numeric feature columns (default: all numeric columns)
+            roles: role_lookup(profiles), when df has no role column
+        """
+        self.shards = {}
+        self.reference = None
+        X, self.features = self._matrix(df, features)
+        self._fit(X, self.partition(df, roles), include_fallback=True)
+        return self
+
+    def fit_shards(self, df, keys=None, roles=None):
+        """
+        Fit or refit some shards only; the others and the common scale are unchanged
+
+        Args:
+            df: Rows to train on (rows of other shards are ignored)
+            keys: Shard keys to fit (default: every shard present in df)
+            roles: role_lookup(profiles), when df has no role column
+
+        Returns:
+            The keys fitted
+        """
+        if self.reference is None:
+            raise ValueError("fit() must run once before shards are fitted independently")
+        X, _ = self._matrix(df)
+        groups = self.partition(df, roles)
+        if keys is not None:
+            groups = {key: groups[key] for key in keys if key in groups}
+        return self._fit(X, groups, include_fallback=False)
+
+    def _sample(self, positions, rows):
+        """A shuffled subsample of at most `rows` of positions (an int means range(positions))"""
+        size = positions if isinstance(positions, int) else len(positions)
+        picked = np.random.default_rng(self.random_state).choice(size, min(size, rows), replace=False)
+        return picked if isinstance(positions, int) else positions[picked]
+
+    def _fit(self, X, groups, include_fallback):
+        # Each tree only ever sees max_samples rows, so a shard is fitted on
+        # at most n_estimators * max_samples of its rows. They are drawn here,
+        # so only those rows are pickled to the pool.
+        sample_rows = self.params['n_estimators'] * self.params['max_samples']
+        jobs = {key: positions for key, positions in groups.items() if len(positions) >= self.min_shard_rows}
+        if include_fallback:
+            jobs[FALLBACK] = len(X)
+
+        keys = list(jobs)
+        tasks = [(X[self._sample(jobs[key], sample_rows)], self.params, self.random_state) for key in keys]
+        for key, (forest, quantiles, rows) in zip(keys, self._run(_fit_shard, tasks)):
+            self.shards[key] = Shard(key, forest, quantiles, rows)
+
+        if self.reference is None:
+            self.reference = self.shards[FALLBACK].quantiles
+            self.threshold = float(np.interp(self.contamination, CALIBRATION_POINTS, self.reference))
+        print(f"Fitted {len(keys)} anomaly shards ({len(groups) - len(jobs) + include_fallback} "
+              f"small shards use the fallback)")
+        return keys
+
+    # ------------------------------------------------------------------
+    # Scoring
+    # ------------------------------------------------------------------
+
+    def calibrate(self, key, raw):
+        """Raw score_samples of a shard on the common scale (negative = anomalous)"""
+        percentiles = np.interp(raw, self.shards[key].quantiles, CALIBRATION_POINTS)
+        return np.interp(percentiles, CALIBRATION_POINTS, self.reference) - self.threshold
+
+    def score(self, df, roles=None):
+        """
+        Calibrated anomaly scores
+
+        Returns:
+            (scores, shard) - Series aligned to df: the calibrated score
+            (negative = anomalous) and the key of the shard that scored the row
+        """
+        if self.reference is None:
+            raise ValueError("Detector is not fitted")
+        X, _ = self._matrix(df)
+        assigned = {}
+        for key, positions in self.partition(df, roles).items():
+            shard = key if key in self.shards else FALLBACK
+            assigned.setdefault(shard, []).append(positions)
+
+        tasks, owners = [], []
+        for key, pieces in assigned.items():
+            positions = np.concatenate(pieces)
+            for start in range(0, len(positions), SCORE_CHUNK_ROWS):
+                chunk = positions[start:start + SCORE_CHUNK_ROWS]
+                tasks.append((self.shards[key].forest, X[chunk]))
+                owners.append((key, chunk))
+
+        scores = np.empty(len(X), dtype=np.float64)
+        labels = np.empty(len(X), dtype=object)
+        for (key, chunk), raw in zip(owners, self._run(_score_chunk, tasks)):
+            scores[chunk] = self.calibrate(key, raw)
+            labels[chunk] = key
+        return (pd.Series(scores, index=df.index, name='anomaly_score'),
+                pd.Series(labels, index=df.index, name='anomaly_shard').astype('category'))
+
+    def fit_predict(self, df, features=None, roles=None):
+        """fit, then score the same rows; returns (scores, shard)"""
+        return self.fit(df, features, roles).score(df, roles)
+
+    def save(self, filepath='sharded_detector.pkl'):
+        with open(filepath, 'wb') as f:
+            pickle.dump(self, f)
+        print(f"Sharded detector saved to {filepath} ({len(self.shards)} shards)")
+
+    @classmethod
+    def load(cls, filepath='sharded_detector.pkl'):
+        with open(filepath, 'rb') as f:
+            return pickle.load(f)
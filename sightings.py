@@ -0,0 +1,214 @@
+"""
+CCTV Sighting Linking for Campus Security System
+Fills missing cctv_frames face_id values from face recognition output, so
+recognized faces reach the entity event store as CCTV sightings
+"""
+
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from linking import EntityLinker
+from schemas import GIVEN_FILES, load_sources
+
+
+# Profile columns a gallery person_id may be enrolled under, in lookup order
+PERSON_KEYS = ['face_id', 'entity_id', 'student_id', 'staff_id']
+
+# Largest gap between a frame and a detection at the same location
+DEFAULT_TOLERANCE = '1min'
+
+
+def load_gallery(filepath):
+    """FaceGallery from a FaceRecognitionSystem.save_database pickle"""
+    from faceservice import FaceGallery
+
+    with open(filepath, 'rb') as f:
+        data = pickle.load(f)
+    return FaceGallery.from_database(data['database'], data.get('metric', 'cosine'))
+
+
+def detections_frame(detected, location_id=None, start=None):
+    """
+    Detection table from face recognition output
+
+    Args:
+        detected: process_cctv_footage / process_video detections (list of
+            dicts) or a generate_report DataFrame
+        location_id: Camera location of the footage
+        start: Wall-clock time of the first video frame; detection
+            timestamps (seconds into the video) become absolute times
+
+    Returns:
+        DataFrame with one row per detection (embeddings stay in an
+        'embedding' column; face crops are dropped)
+    """
+    if isinstance(detected, pd.DataFrame):
+        df = detected.copy()
+    else:
+        df = pd.DataFrame(detected).drop(columns=['face_image'], errors='ignore')
+    if location_id is not None:
+        df['location_id'] = location_id
+    if start is not None:
+        df['timestamp'] = pd.Timestamp(start) + pd.to_timedelta(df['timestamp'], unit='s')
+    return df
+
+
+class SightingLinker:
+    """
+    Fill cctv_frames face_id values from face recognition detections
+
+    Detections are identified against the gallery in batches
+    (FaceGallery.best) unless they already carry a person_id, and person
+    ids become profile face_ids through one Index lookup. Each frame
+    without a face_id then takes the most similar identified detection,
+    joined on frame_id when the detections have one, else the nearest
+    detection in time at the same location (merge_asof) within `tolerance`.
+    Frames that already name a face keep it.
+    """
+
+    def __init__(self, profiles, gallery=None, threshold=0.6, tolerance=DEFAULT_TOLERANCE):
+        """
+        Args:
+            profiles: Profiles table
+            gallery: FaceGallery for detections that carry embeddings
+            threshold: Minimum similarity of a gallery identification
+            tolerance: Largest frame-to-detection time gap (location joins)
+        """
+        self.gallery = gallery
+        self.threshold = threshold
+        self.tolerance = pd.Timedelta(tolerance)
+
+        # A gallery person may be enrolled under any profile identifier;
+        # only profiles with a face_id can be linked through cctv_frames
+        pieces = []
+        if 'face_id' in profiles.columns:
+            with_face = profiles[profiles['face_id'].notna()]
+            face_ids = with_face['face_id'].astype(str).to_numpy(dtype=object)
+            for col in PERSON_KEYS:
+                if col in with_face.columns:
+                    present = with_face[col].notna().to_numpy()
+                    pieces.append(pd.Series(face_ids[present], index=with_face.loc[present, col].astype(str).to_numpy()))
+        lookup = pd.concat(pieces) if pieces else pd.Series(dtype=object)
+        lookup = lookup[~lookup.index.duplicated()]
+        self.person_index = pd.Index(lookup.index)
+        self.person_faces = np.append(lookup.to_numpy(dtype=object), None)
+
+        self.stats = {}
+
+    def face_ids(self, person_ids):
+        """Profile face_id per gallery person id (None if unknown)"""
+        positions = self.person_index.get_indexer(pd.Index(person_ids, dtype=object).astype(str))
+        # -1 (not found) picks the trailing None
+        return self.person_faces[positions]
+
+    def identify(self, detections):
+        """
+        Identified person per detection
+
+        Returns:
+            (person_ids, similarities) - person_ids is None where the face
+            was not identified
+        """
+        if 'person_id' in detections.columns:
+            people = detections['person_id'].to_numpy(dtype=object)
+            scores = (detections['confidence'].to_numpy(dtype=np.float64) if 'confidence' in detections.columns
+                      else np.ones(len(detections)))
+            identified = (detections['identified'].to_numpy(dtype=bool) if 'identified' in detections.columns
+                          else people != 'Unknown')
+        elif 'embedding' in detections.columns:
+            if self.gallery is None:
+                raise ValueError("Detections carry embeddings but no face gallery was given")
+            embeddings = np.vstack(detections['embedding'].to_numpy()) if len(detections) else np.empty((0, 0))
+            people, scores = self.gallery.best(embeddings)
+            identified = scores >= self.threshold
+        else:
+            raise ValueError("Detections need a person_id or an embedding column")
+        return np.where(identified, people, None), scores
+
+    def _matches(self, frames, missing, detections):
+        """(frame positions, face_ids, similarities) of detections matched to missing frames"""
+        people, scores = self.identify(detections)
+        found = pd.DataFrame({'face_id': self.face_ids(people), 'face_similarity': scores})
+        keys = ['frame_id'] if 'frame_id' in detections.columns else ['location_id', 'timestamp']
+        for key in keys:
+            found[key] = detections[key].to_numpy()
+        found = found[found['face_id'].notna().to_numpy()]
+        self.stats['identified'] = len(found)
+        # One face per frame: the most similar detection wins
+        found = found.sort_values('face_similarity', ascending=False, kind='stable').drop_duplicates(keys)
+
+        rows = np.flatnonzero(missing)
+        if keys == ['frame_id']:
+            positions = pd.Index(found['frame_id'].astype(str)).get_indexer(frames['frame_id'].iloc[rows].astype(str))
+            hit = positions >= 0
+            return rows[hit], found['face_id'].to_numpy()[positions[hit]], found['face_similarity'].to_numpy()[positions[hit]]
+
+        left = pd.DataFrame({
+            'timestamp': frames['timestamp'].iloc[rows].to_numpy(dtype='datetime64[ns]'),
+            'location_id': frames['location_id'].iloc[rows].astype(str).to_numpy(dtype=object),
+            'row': rows,
+        }).dropna(subset=['timestamp']).sort_values('timestamp', kind='stable')
+        right = pd.DataFrame({
+            'timestamp': pd.to_datetime(found['timestamp']).to_numpy(dtype='datetime64[ns]'),
+            'location_id': found['location_id'].astype(str).to_numpy(dtype=object),
+            'face_id': found['face_id'].to_numpy(),
+            'face_similarity': found['face_similarity'].to_numpy(),
+        }).dropna(subset=['timestamp']).sort_values('timestamp', kind='stable')
+        merged = pd.merge_asof(left, right, on='timestamp', by='location_id', direction='nearest',
+                               tolerance=self.tolerance)
+        merged = merged[merged['face_id'].notna().to_numpy()]
+        return merged['row'].to_numpy(), merged['face_id'].to_numpy(), merged['face_similarity'].to_numpy()
+
+    def fill(self, frames, detections):
+        """
+        cctv_frames with missing face_id values filled from detections
+
+        Args:
+            frames: cctv_frames source frame (frame_id, location_id, timestamp, face_id)
+            detections: detections_frame output, with frame_id or with
+                location_id and absolute timestamp
+
+        Returns:
+            Copy of frames with face_id filled, plus face_source ('log' or
+            'recognition') and face_similarity columns
+        """
+        missing = frames['face_id'].isna().to_numpy()
+        rows, faces, similarity = self._matches(frames, missing, detections)
+
+        face_id = frames['face_id'].to_numpy(dtype=object, copy=True)
+        face_id[rows] = faces
+        source = np.where(missing, -1, 0)
+        source[rows] = 1
+        scores = np.full(len(frames), np.nan)
+        scores[rows] = similarity
+
+        frames = frames.copy(deep=False)
+        frames['face_id'] = pd.Series(face_id, index=frames.index, dtype=frames['face_id'].dtype)
+        frames['face_source'] = pd.Categorical.from_codes(source, categories=['log', 'recognition'])
+        frames['face_similarity'] = scores
+
+        self.stats.update({'detections': len(detections), 'frames_missing': int(missing.sum()), 'filled': len(rows)})
+        print(f"Filled {len(rows)} of {int(missing.sum())} missing CCTV face_ids "
+              f"from {len(detections)} detections")
+        return frames
+
+
+def link_sightings(data_dir='data/given', detections=None, gallery=None, threshold=0.6,
+                   tolerance=DEFAULT_TOLERANCE, keep_unresolved=False):
+    """
+    Load data/given, fill cctv_frames face_ids from detections and build
+    the linked event store (linking.link_sources plus recognized sightings)
+
+    Returns:
+        (events, linker, sightings) - sightings.stats counts the filled frames
+    """
+    sources = load_sources(data_dir)
+    if 'profiles' not in sources:
+        raise FileNotFoundError(f"No profiles file ({GIVEN_FILES['profiles']}) in {data_dir}")
+    sightings = SightingLinker(sources['profiles'], gallery, threshold, tolerance)
+    if detections is not None and 'cctv_frames' in sources:
+        sources['cctv_frames'] = sightings.fill(sources['cctv_frames'], detections)
+    linker = EntityLinker(sources['profiles'])
+    return linker.link(sources, keep_unresolved=keep_unresolved), linker, sightings
@@ -0,0 +1,204 @@
+"""
+Storage Layer for Campus Security System
+Reads and writes pipeline artifacts in columnar formats (Parquet/Feather),
+keeping Excel only as an explicit export format
+"""
+
+import pandas as pd
+from pathlib import Path
+import importlib.util
+
+from schemas import parse_timestamps
+
+
+# Intermediate artifacts default to Parquet
+DEFAULT_FORMAT = '.parquet'
+
+# Object columns with at most this share of distinct values become categoricals
+CATEGORY_RATIO = 0.5
+
+
+def _read_parquet(path, columns=None):
+    return pd.read_parquet(path, columns=columns)
+
+
+def _write_parquet(df, path):
+    df.to_parquet(path, index=False)
+
+
+def _read_feather(path, columns=None):
+    return pd.read_feather(path, columns=columns)
+
+
+def _write_feather(df, path):
+    df.reset_index(drop=True).to_feather(path)
+
+
+def _read_csv(path, columns=None):
+    return pd.read_csv(path, usecols=columns)
+
+
+def _write_csv(df, path):
+    df.to_csv(path, index=False)
+
+
+def _read_excel(path, columns=None):
+    return pd.read_excel(path, usecols=columns)
+
+
+def _write_excel(df, path):
+    export_excel(df, path)
+
+
+# {suffix: (reader, writer)}
+FORMATS = {
+    '.parquet': (_read_parquet, _write_parquet),
+    '.feather': (_read_feather, _write_feather),
+    '.csv': (_read_csv, _write_csv),
+    '.xlsx': (_read_excel, _write_excel),
+    '.xls': (_read_excel, None),
+}
+
+
+def register_format(suffix, reader, writer=None):
+    """
+    Register a reader/writer pair for a file suffix
+
+    Args:
+        suffix: File suffix including the dot (e.g. '.orc')
+        reader: Callable(path, columns=None) -> DataFrame
+        writer: Callable(df, path), or None for read-only formats
+    """
+    FORMATS[suffix.lower()] = (reader, writer)
+
+
+def _resolve(path):
+    """Return (Path, suffix), defaulting to Parquet when no suffix is given"""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if not suffix:
+        path = path.with_suffix(DEFAULT_FORMAT)
+        suffix = DEFAULT_FORMAT
+    if suffix not in FORMATS:
+        raise ValueError(f"Unsupported storage format: {suffix}")
+    return path, suffix
+
+
+def optimize_dtypes(df, category_ratio=CATEGORY_RATIO, timestamp_cols=None):
+    """
+    Convert repetitive string columns to categoricals and parse timestamps
+
+    Args:
+        df: DataFrame to convert (modified in place and returned)
+        category_ratio: Max distinct/total ratio for a column to become categorical
+        timestamp_cols: Columns to parse as datetimes (default: string columns
+            whose names contain 'time')
+
+    Returns:
+        DataFrame with compact dtypes
+    """
+    if timestamp_cols is None:
+        timestamp_cols = [c for c in df.columns if 'time' in str(c).lower()
+                          and (pd.api.types.is_object_dtype(df[c]) or pd.api.types.is_string_dtype(df[c]))]
+
+    for col in timestamp_cols:
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = parse_timestamps(df[col])
+
+    n = len(df)
+    for col in df.columns:
+        if col in timestamp_cols:
+            continue
+        dtype = df[col].dtype
+        if isinstance(dtype, pd.CategoricalDtype) or not pd.api.types.is_string_dtype(dtype):
+            continue
+        if n and df[col].nunique(dropna=True) <= n * category_ratio:
+            df[col] = df[col].astype('category')
+
+    return df
+
+
+def save_frame(df, path, optimize=True):
+    """
+    Save a DataFrame, choosing the format from the file suffix
+
+    Args:
+        df: DataFrame to save
+        path: Output path; a missing suffix means Parquet
+        optimize: Convert to categorical/datetime dtypes before writing
+
+    Returns:
+        Path: The path actually written
+    """
+    path, suffix = _resolve(path)
+    writer = FORMATS[suffix][1]
+    if writer is None:
+        raise ValueError(f"Format {suffix} is read-only")
+
+    if optimize and suffix in ('.parquet', '.feather'):
+        df = optimize_dtypes(df.copy(deep=False))
+
+    writer(df, path)
+    return path
+
+
+def load_frame(path, columns=None):
+    """
+    Load a DataFrame, choosing the reader from the file suffix
+
+    Args:
+        path: Input path
+        columns: Optional subset of columns to read
+
+    Returns:
+        DataFrame
+    """
+    path, suffix = _resolve(path)
+    reader = FORMATS[suffix][0]
+    return reader(path, columns=columns)
+
+
+def _column_widths(df, max_width=60):
+    """Column widths from vectorized string lengths instead of a per-cell scan"""
+    widths = []
+    for col in df.columns:
+        values = df[col]
+        if len(values):
+            longest = values.astype(str).str.len().max()
+        else:
+            longest = 0
+        widths.append(min(max(int(longest), len(str(col))) + 2, max_width))
+    return widths
+
+
+def export_excel(sheets, path, autosize=False):
+    """
+    Export one or more DataFrames to an Excel workbook
+
+    Uses xlsxwriter when installed, which is considerably faster than
+    openpyxl for writing. Column auto-sizing is optional.
+
+    Args:
+        sheets: DataFrame, or {sheet_name: DataFrame}
+        path: Output path or binary file-like object
+        autosize: Set column widths from the longest value in each column
+    """
+    if isinstance(sheets, pd.DataFrame):
+        sheets = {'Data': sheets}
+
+    engine = 'xlsxwriter' if importlib.util.find_spec('xlsxwriter') else 'openpyxl'
+
+    with pd.ExcelWriter(path, engine=engine) as writer:
+        for sheet_name, df in sheets.items():
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+
+            if not autosize:
+                continue
+
+            worksheet = writer.sheets[sheet_name]
+            for i, width in enumerate(_column_widths(df)):
+                if engine == 'xlsxwriter':
+                    worksheet.set_column(i, i, width)
+                else:
+                    from openpyxl.utils import get_column_letter
+                    worksheet.column_dimensions[get_column_letter(i + 1)].width = width
@@ -0,0 +1,606 @@
+"""
+Streaming Anomaly Scoring for Campus Security System
+Scores card swipes and Wi-Fi associations as they arrive, one at a time or
+in micro-batches, against a pre-fitted model and per-entity rolling state,
+and emits alerts as soon as an event is flagged
+"""
+
+import csv
+import itertools
+import json
+import math
+import os
+import pickle
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from featurestore import DAY, FEATURE_NAMES, HOUR, WEEK, FeatureStore
+from linking import EVENT_SPECS, IDENTIFIERS
+from schemas import SOURCES
+
+
+# Raw sources consumed by the stream
+STREAM_SOURCES = ['card_swipes', 'wifi_logs']
+STREAM_SPECS = {spec[0]: spec for spec in EVENT_SPECS if spec[0] in STREAM_SOURCES}
+STREAM_ACTIVITY_TYPES = [spec[1] for spec in STREAM_SPECS.values()]
+
+# Feature store features (seconds_since_last on a log scale) plus the hour
+# of day and the share of the entity's recent events at the same location
+STREAM_FEATURES = FEATURE_NAMES + ['hour_of_day', 'location_share']
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def _average_path_length(n):
+    """Expected isolation depth of a point among n samples (IsolationForest's c(n))"""
+    n = np.asarray(n, dtype=np.float64)
+    safe = np.maximum(n, 2.0)
+    c = 2.0 * (np.log(safe - 1.0) + np.euler_gamma) - 2.0 * (safe - 1.0) / safe
+    return np.where(n <= 1, 0.0, np.where(n <= 2, 1.0, c))
+
+
+class CompiledForest:
+    """
+    A fitted IsolationForest flattened into node arrays
+
+    sklearn's decision_function costs milliseconds per call whatever the
+    batch size. Here every tree's nodes live in one set of arrays (leaves
+    point to themselves and carry their final path length), so scoring a
+    batch is max_depth rounds of array indexing across all trees at once:
+    ~0.1ms for one event and a few microseconds per event in a batch.
+    """
+
+    def __init__(self, forest):
+        features, thresholds, lefts, rights, values = [], [], [], [], []
+        roots = []
+        offset = 0
+        max_depth = 0
+        for tree, tree_features in zip(forest.estimators_, forest.estimators_features_):
+            t = tree.tree_
+            n = t.node_count
+            leaf = t.children_left == -1
+
+            depth = np.zeros(n, dtype=np.int64)
+            for node in range(n):  # children always follow their parent
+                if not leaf[node]:
+                    depth[t.children_left[node]] = depth[node] + 1
+                    depth[t.children_right[node]] = depth[node] + 1
+            max_depth = max(max_depth, int(depth.max()))
+
+            ids = np.arange(n) + offset
+            features.append(np.where(leaf, 0, np.asarray(tree_features)[np.maximum(t.feature, 0)]))
+            thresholds.append(np.where(leaf, np.inf, t.threshold))
+            lefts.append(np.where(leaf, ids, t.children_left + offset))
+            rights.append(np.where(leaf, ids, t.children_right + offset))
+            values.append(np.where(leaf, depth + _average_path_length(t.n_node_samples), 0.0))
+            roots.append(offset)
+            offset += n
+
+        self.feature = np.concatenate(features).astype(np.intp)
+        self.threshold = np.concatenate(thresholds)
+        self.left = np.concatenate(lefts).astype(np.intp)
+        self.right = np.concatenate(rights).astype(np.intp)
+        self.value = np.concatenate(values)
+        self.roots = np.array(roots, dtype=np.intp)
+        self.max_depth = max_depth
+        self.normalizer = float(_average_path_length(forest.max_samples_))
+        self.offset = float(forest.offset_)
+
+    def decision_function(self, X):
+        """Same values as IsolationForest.decision_function (negative = anomalous)"""
+        X = np.asarray(X, dtype=np.float64)
+        n = len(X)
+        nodes = np.repeat(self.roots[:, None], n, axis=1)
+        rows = np.arange(n)
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        depths = self.value[nodes].mean(axis=0)
+        return -(2.0 ** (-depths / self.normalizer)) - self.offset
+
+
+class StreamFeatures:
+    """
+    Per-entity state and feature vectors for streamed events
+
+    Wraps a FeatureStore (O(1) update per event) and adds the hour of day
+    and how often the entity's recent events were at the same location.
+    """
+
+    def __init__(self, store=None):
+        self.store = store or FeatureStore()
+
+    def update(self, entity, seconds, location):
+        """Fold one event into its entity's state and return its feature vector"""
+        features = self.store.update(entity, seconds, location)
+        recent = self.store.entities[entity].recent
+        share = sum(1 for _, loc in recent if loc == location) / len(recent)
+        since = features['seconds_since_last']
+        since = WEEK if since is None else min(max(since, 0.0), WEEK)
+        return [
+            features['events_last_hour'],
+            features['events_last_day'],
+            features['distinct_locations_recent'],
+            math.log1p(since),
+            features['night_ratio_week'],
+            (seconds % DAY) / HOUR,
+            share,
+        ]
+
+    def matrix(self, events):
+        """Feature rows for linked events, folded in timestamp order"""
+        seconds = events['timestamp'].to_numpy(dtype='datetime64[ns]').view(np.int64) / 1e9
+        rows = [
+            self.update(entity, t, location)
+            for entity, t, location in zip(events['entity_id'].astype(str), seconds, events['location'].astype(object))
+        ]
+        return np.array(rows, dtype=np.float64).reshape(-1, len(STREAM_FEATURES))
+
+
+def stream_events(events):
+    """Swipe and Wi-Fi rows of a linked event store, in timestamp order"""
+    events = events[events['activity_type'].astype(str).isin(STREAM_ACTIVITY_TYPES).to_numpy()
+                    & events['entity_id'].notna().to_numpy() & events['timestamp'].notna().to_numpy()]
+    return events.sort_values('timestamp', kind='stable')
+
+
+class StreamModel:
+    """
+    Pre-fitted IsolationForest over STREAM_FEATURES, compiled for scoring
+
+    Scores follow IsolationForest.decision_function, so the alert threshold
+    is 0 (the fitted contamination); alerts below `high_threshold` (the
+    contamination / 10 quantile of the training scores) are HIGH severity.
+    """
+
+    def __init__(self, forest, high_threshold, trained_events=0):
+        self.forest = CompiledForest(forest)
+        self.threshold = 0.0
+        self.high_threshold = high_threshold
+        self.trained_events = trained_events
+        self.feature_names = list(STREAM_FEATURES)
+
+    @classmethod
+    def fit(cls, events, features=None, contamination=0.01, n_estimators=100, random_state=42):
+        """
+        Fit on historical events
+
+        Args:
+            events: Linked event store (see linking.py); swipe and Wi-Fi rows are used
+            features: StreamFeatures to replay the events through; it ends
+                up holding the state at the last event, ready to score what follows
+            contamination: Expected share of anomalous events
+            n_estimators: Trees in the forest
+
+        Returns:
+            StreamModel
+        """
+        from sklearn.ensemble import IsolationForest
+
+        features = features if features is not None else StreamFeatures()
+        X = features.matrix(stream_events(events))
+        forest = IsolationForest(n_estimators=n_estimators, contamination=contamination,
+                                 random_state=random_state, n_jobs=-1).fit(X)
+        high = float(np.quantile(forest.decision_function(X), contamination / 10))
+        model = cls(forest, min(high, 0.0), trained_events=len(X))
+        print(f"Stream model fitted on {len(X)} events")
+        return model
+
+    def score(self, X):
+        return self.forest.decision_function(X)
+
+    def save(self, filepath='stream_model.pkl'):
+        with open(filepath, 'wb') as f:
+            pickle.dump(self, f)
+        print(f"Stream model saved to {filepath}")
+
+    @classmethod
+    def load(cls, filepath='stream_model.pkl'):
+        with open(filepath, 'rb') as f:
+            return pickle.load(f)
+
+
+class EventDecoder:
+    """
+    Raw source rows to (entity, seconds, location, item, activity type, source)
+
+    Identifiers resolve through the same profile lookups as EntityLinker
+    (the first holder of a shared identifier), held as plain dicts so one
+    event costs a dict lookup and a strptime.
+    """
+
+    def __init__(self, linker):
+        self.lookups = {}
+        self.formats = {}
+        for source, spec in STREAM_SPECS.items():
+            column = IDENTIFIERS[source]
+            if column in linker.lookups:
+                index, codes, _ = linker.lookups[column]
+                self.lookups[source] = dict(zip(index, linker.entities[codes]))
+            self.formats[source] = SOURCES[source].timestamps[spec[3]]
+
+    def decode(self, source, row):
+        """Decoded event, or None when the identifier, timestamp or location is unusable"""
+        if source not in STREAM_SPECS:
+            raise ValueError(f"Not a stream source: {source} (expected one of {STREAM_SOURCES})")
+        _, activity_type, event_source, time_col, location_col, item_col, _ = STREAM_SPECS[source]
+        item = row.get(item_col)
+        entity = self.lookups.get(source, {}).get(str(item)) if item is not None else None
+        seconds = self.seconds(row.get(time_col), self.formats[source])
+        location = row.get(location_col)
+        if entity is None or seconds is None or not self._hashable(location):
+            return None
+        return entity, seconds, location, item, activity_type, event_source
+
+    @staticmethod
+    def _hashable(value):
+        # Locations are kept in the entity's ring buffer and compared as keys
+        try:
+            hash(value)
+        except TypeError:
+            return False
+        return True
+
+    @staticmethod
+    def seconds(value, fmt):
+        """
+        Epoch seconds of a timestamp string (in the source's format), datetime
+        or number; None for anything that does not convert to a valid time
+        """
+        if value is None or isinstance(value, bool):
+            return None
+        try:
+            if isinstance(value, str):
+                value = datetime.strptime(value, fmt)
+            if isinstance(value, datetime):
+                if value.tzinfo is not None:
+                    value = value.astimezone(timezone.utc).replace(tzinfo=None)
+                seconds = (value - EPOCH).total_seconds()
+            elif isinstance(value, (int, float, np.integer, np.floating)):
+                seconds = float(value)
+                # Alerts format the time, so it must fit a datetime
+                EPOCH + timedelta(seconds=seconds)
+            else:
+                return None
+        except (TypeError, ValueError, OverflowError):
+            return None
+        return seconds if math.isfinite(seconds) else None
+
+
+class StreamScorer:
+    """
+    Decode, fold into per-entity state and score streamed events
+
+    Events of a micro-batch update the state one by one (so each is scored
+    against what came before it) and are then scored in one forest call.
+    """
+
+    def __init__(self, model, linker, features=None):
+        self.model = model
+        self.profiles = linker.profiles
+        self.decoder = EventDecoder(linker)
+        self.features = features or StreamFeatures()
+        self.events = 0
+        self.skipped = 0
+        self.alerts = 0
+
+    def score_batch(self, items):
+        """
+        Score a micro-batch
+
+        Args:
+            items: [(source, row)] with row a dict of raw source columns
+
+        Returns:
+            [(position in items, alert)] for the flagged events
+        """
+        positions, decoded, rows = [], [], []
+        for i, (source, row) in enumerate(items):
+            event = self.decoder.decode(source, row)
+            if event is None:
+                self.skipped += 1
+                continue
+            rows.append(self.features.update(event[0], event[1], event[2]))
+            positions.append(i)
+            decoded.append(event)
+        self.events += len(rows)
+        if not rows:
+            return []
+
+        scores = self.model.score(rows)
+        flagged = np.flatnonzero(scores < self.model.threshold)
+        self.alerts += len(flagged)
+        return [(positions[k], self._alert(decoded[k], float(scores[k]))) for k in flagged]
+
+    def process(self, source, row):
+        """Score one event; returns its alert or None"""
+        alerts = self.score_batch([(source, row)])
+        return alerts[0][1] if alerts else None
+
+    def _alert(self, event, score):
+        entity, seconds, location, item, activity_type, event_source = event
+        return {
+            'timestamp': (EPOCH + timedelta(seconds=seconds)).isoformat(),
+            'entity': entity,
+            'severity': 'HIGH' if score < self.model.high_threshold else 'MEDIUM',
+            'anomaly_score': round(score, 4),
+            'description': f"Unusual {activity_type.lower()} at {location} with score {score:.2f}",
+            'activity_type': activity_type,
+            'source': event_source,
+            'location': location,
+            'item': item,
+        }
+
+
+def alerts_frame(alerts):
+    """Stream alerts as event store rows (plus score columns) for persistence"""
+    frame = pd.DataFrame(alerts, columns=['timestamp', 'entity', 'severity', 'anomaly_score', 'description',
+                                          'activity_type', 'source', 'location', 'item'])
+    return frame.rename(columns={'entity': 'entity_id'}).assign(
+        timestamp=pd.to_datetime(frame['timestamp'], format='ISO8601').astype('datetime64[ns]'),
+        record_id=pd.Series(pd.NA, index=frame.index, dtype='string'),
+    )
+
+
+class AlertFeed:
+    """
+    Recent alerts, numbered so API clients can poll for new ones
+
+    With a path, the feed is also written there (atomically, after each
+    emit) and read back whenever another process replaced it, so every API
+    worker serves the same numbers and a new writer continues them.
+    """
+
+    def __init__(self, maxlen=1000, path=None):
+        self.alerts = deque(maxlen=maxlen)
+        self.last_seq = 0
+        self.lock = threading.Lock()
+        self.path = path
+        self._mtime = None
+
+    def emit(self, alerts):
+        with self.lock:
+            self._reload()
+            for alert in alerts:
+                self.last_seq += 1
+                self.alerts.append(dict(alert, id=f"LIVE_{self.last_seq}", seq=self.last_seq))
+            if alerts and self.path:
+                self._write()
+
+    def since(self, seq=0):
+        """(alerts numbered after seq, the latest number)"""
+        with self.lock:
+            self._reload()
+            return [alert for alert in self.alerts if alert['seq'] > seq], self.last_seq
+
+    def _reload(self):
+        if self.path is None:
+            return
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._mtime:
+            return
+        with open(self.path) as f:
+            payload = json.load(f)
+        self.alerts = deque(payload['alerts'], maxlen=self.alerts.maxlen)
+        self.last_seq = payload['last_seq']
+        self._mtime = mtime
+
+    def _write(self):
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump({'last_seq': self.last_seq, 'alerts': list(self.alerts)}, f, default=str)
+        os.replace(tmp, self.path)
+        self._mtime = os.stat(self.path).st_mtime_ns
+
+
+class StreamInbox:
+    """
+    Directory through which API workers hand raw rows to the single worker
+    that scores the stream
+
+    Each put is one JSON file named by its arrival time and moved in
+    atomically; drain yields them in name (arrival) order and deletes them.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._counter = itertools.count()
+
+    def put_many(self, source, rows):
+        name = f"{time.time_ns():020d}-{os.getpid()}-{next(self._counter)}"
+        tmp = self.directory / f".{name}.tmp"
+        tmp.write_text(json.dumps({'source': source, 'rows': rows}, default=str))
+        os.replace(tmp, self.directory / f"{name}.json")
+
+    def drain(self):
+        """(source, rows) of every file waiting, oldest first"""
+        for path in sorted(self.directory.glob('*.json')):
+            try:
+                payload = json.loads(path.read_text())
+            except FileNotFoundError:
+                continue
+            path.unlink(missing_ok=True)
+            yield payload['source'], payload['rows']
+
+
+class PrintSink:
+    """Prints one line per alert"""
+
+    def emit(self, alerts):
+        for alert in alerts:
+            print(f"[{alert['severity']}] {alert['timestamp']} {alert['entity']}: {alert['description']}")
+
+
+class DatabaseSink:
+    """Writes alerts to security_alerts, with their activity and anomaly rows"""
+
+    def __init__(self, db, profiles):
+        self.db = db
+        self.student_ids = db.entity_students(profiles)
+        db.load_profiles(profiles)
+
+    def emit(self, alerts):
+        if alerts:
+            self.db.load_stream_alerts(alerts_frame(alerts), self.student_ids)
+
+
+class StreamService:
+    """
+    Background consumer feeding a StreamScorer and its alert sinks
+
+    Producers (API requests, a tailed file) put raw rows on a queue; the
+    consumer takes whatever is waiting, up to max_batch, so batches grow
+    under load and shrink to single events when traffic is light. Alert
+    latency is measured from an event being queued to its alert having
+    been emitted to every sink. With a snapshot_path, the per-entity state
+    is saved there every snapshot_interval seconds (between batches) and on
+    close, for load_scorer to resume from.
+    """
+
+    def __init__(self, scorer, sinks=(), max_batch=512, metrics=None, snapshot_path=None, snapshot_interval=60):
+        self.scorer = scorer
+        self.sinks = list(sinks)
+        self.max_batch = max_batch
+        self.metrics = metrics
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self._snapshot_at = time.monotonic()
+        self.latencies = deque(maxlen=10000)
+        self.processed = 0
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._loop, name='stream-scorer', daemon=True)
+        self.thread.start()
+
+    def put(self, source, row):
+        self.queue.put((source, row, time.monotonic()))
+
+    def put_many(self, source, rows):
+        received = time.monotonic()
+        for row in rows:
+            self.queue.put((source, row, received))
+
+    def _loop(self):
+        while True:
+            first = self.queue.get()
+            if first is None:
+                return
+            batch = [first]
+            while len(batch) < self.max_batch:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self.queue.put(None)
+                    break
+                batch.append(item)
+            self._handle(batch)
+            self._snapshot()
+
+    def _snapshot(self, force=False):
+        """Save the per-entity state (only from the consumer thread, or after it stopped)"""
+        if self.snapshot_path is None:
+            return
+        if force or time.monotonic() - self._snapshot_at >= self.snapshot_interval:
+            self.scorer.features.store.save_snapshot(self.snapshot_path)
+            self._snapshot_at = time.monotonic()
+
+    def _handle(self, batch):
+        started = time.perf_counter()
+        try:
+            flagged = self.scorer.score_batch([(source, row) for source, row, _ in batch])
+        except Exception as e:
+            print(f"Stream batch of {len(batch)} events failed: {e}")
+            flagged = []
+        alerts = [alert for _, alert in flagged]
+        # One failing sink (e.g. the database) must not keep alerts from the others
+        for sink in self.sinks:
+            try:
+                sink.emit(alerts)
+            except Exception as e:
+                print(f"Stream alert sink {type(sink).__name__} failed on {len(alerts)} alerts: {e}")
+        done = time.monotonic()
+        self.processed += len(batch)
+
+        latencies = [done - batch[position][2] for position, _ in flagged]
+        self.latencies.extend(latencies)
+        if self.metrics is not None:
+            self.metrics.record('stream.batch', time.perf_counter() - started)
+            self.metrics.record_value('stream.batch_size', len(batch))
+            for latency in latencies:
+                self.metrics.record('stream.alert_latency', latency)
+
+    def feed_file(self, source, path, follow=True, poll_interval=0.5):
+        """Queue rows appended to a source CSV until it stops growing (or forever with follow)"""
+        for rows in tail_csv(path, follow=follow, poll_interval=poll_interval):
+            self.put_many(source, rows)
+
+    def follow_inbox(self, inbox, poll_interval=0.05):
+        """Queue rows put in a StreamInbox by other processes, from a background thread"""
+        def follow():
+            while True:
+                for source, rows in inbox.drain():
+                    self.put_many(source, rows)
+                time.sleep(poll_interval)
+
+        threading.Thread(target=follow, name='stream-inbox', daemon=True).start()
+
+    def close(self):
+        """Process everything queued so far, then stop the consumer"""
+        self.queue.put(None)
+        self.thread.join()
+        self._snapshot(force=True)
+
+
+def tail_csv(path, follow=True, poll_interval=0.5, block_bytes=1 << 20):
+    """
+    Yield lists of row dicts as lines are appended to a CSV file (like `tail -f`)
+
+    The first line is the header; a trailing partial line is held back
+    until it is complete. Without follow, stops at the current end of file.
+    """
+    with open(path, newline='') as f:
+        header = next(csv.reader([f.readline()]))
+        pending = ''
+        while True:
+            chunk = f.read(block_bytes)
+            if not chunk:
+                if not follow:
+                    if pending.strip():
+                        yield [dict(zip(header, values)) for values in csv.reader([pending])]
+                    return
+                time.sleep(poll_interval)
+                continue
+            lines = (pending + chunk).split('\n')
+            pending = lines.pop()
+            rows = [dict(zip(header, values)) for values in csv.reader(lines) if values]
+            if rows:
+                yield rows
+
+
+def load_scorer(model_path, data_dir='data/given', features_path=None):
+    """
+    StreamScorer for a saved model, resolving identifiers with the profiles in data_dir
+
+    Args:
+        model_path: File written by StreamModel.save
+        data_dir: Directory with the profiles CSV
+        features_path: Optional FeatureStore snapshot to resume per-entity state from
+    """
+    from linking import EntityLinker
+    from schemas import load_source
+
+    store = FeatureStore.load_snapshot(features_path) if features_path and os.path.exists(features_path) else None
+    linker = EntityLinker(load_source('profiles', data_dir))
+    return StreamScorer(StreamModel.load(model_path), linker, StreamFeatures(store))
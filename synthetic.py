@@ -0,0 +1,418 @@
+"""
+Synthetic Data Generator for Campus Security System
+Builds benchmark-scale activity logs and data/given style source files
+using whole-column random draws instead of per-record loops
+"""
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from schemas import GIVEN_FILES
+
+
+# Activity log vocabulary (matches DataPreparation's sample schema)
+BUILDINGS = ['Main Building', 'Library', 'Lab A', 'Lab B', 'Cafeteria', 'Gym', 'Dorm A', 'Dorm B']
+ACTIVITIES = ['Entry', 'Exit', 'Card Swipe', 'WiFi Login', 'Lab Access', 'Library Check-in']
+DEVICE_TYPES = ['Mobile', 'Laptop', 'Desktop', 'Tablet']
+
+# data/given vocabulary
+LOCATIONS = ['ADMIN_LOBBY', 'AUDITORIUM', 'CAF_01', 'GYM', 'HOSTEL_GATE', 'LAB_101', 'LAB_305', 'LIB_ENT']
+AP_IDS = [f"AP_{zone}_{i}" for zone in ['ADMIN', 'AUD', 'CAF', 'ENG', 'HOSTEL', 'LAB', 'LIB'] for i in range(1, 6)]
+ROOMS = ['AUDITORIUM', 'LAB_101', 'LAB_102', 'LAB_305', 'ROOM_A1', 'ROOM_A2', 'SEM_01']
+ROLES = ['student', 'staff', 'faculty']
+ROLE_WEIGHTS = [0.8, 0.1, 0.1]
+DEPARTMENTS = ['Admin', 'BIO', 'CIVIL', 'CSE', 'Chemistry', 'ECE', 'EEE', 'MECH', 'Maths', 'Physics']
+FIRST_NAMES = ['Aarav', 'Ananya', 'Arjun', 'Diya', 'Ishaan', 'Kavya', 'Neha', 'Rahul', 'Rohan', 'Sana']
+LAST_NAMES = ['Das', 'Gupta', 'Iyer', 'Kumar', 'Mehta', 'Patel', 'Rao', 'Reddy', 'Sharma', 'Singh']
+NOTE_CATEGORIES = ['feedback', 'helpdesk', 'incident', 'maintenance', 'rsvp']
+NOTE_TEXTS = [
+    'Broken chair in seminar room.',
+    'CCTV near library needs check.',
+    'Confirmed attendance for robotics workshop.',
+    'Requesting lab access.',
+    'Wi-Fi not working in hostel block.',
+]
+
+# Row counts of the data/given sources at scale=1
+GIVEN_ROWS = {
+    'card_swipes': 8000,
+    'wifi_logs': 8000,
+    'cctv_frames': 7000,
+    'lab_bookings': 7000,
+    'library_checkouts': 7000,
+    'notes': 7000,
+}
+
+# Random stream ids, so each table is reproducible regardless of call order
+_STREAMS = {name: i for i, name in enumerate(
+    ['activity', 'profiles', 'macs'] + list(GIVEN_ROWS)
+)}
+
+_HEX = np.array([f"{i:02x}" for i in range(256)])
+
+
+def _prefixed(prefix, numbers, width=0):
+    """Vectorized f"{prefix}{number:0{width}d}" over an integer array"""
+    digits = np.asarray(numbers).astype(str)
+    if width:
+        digits = np.char.zfill(digits, width)
+    return np.char.add(prefix, digits).astype(object)
+
+
+def _format_iso(ts):
+    """Format datetimes as '2025-09-13 14:02:40'"""
+    return pd.DatetimeIndex(ts).floor('s').astype(str).to_numpy(dtype=object)
+
+
+def _format_short(ts):
+    """Format datetimes as '9/1/2025 12:29' (unpadded month, day and hour)"""
+    ts = pd.DatetimeIndex(ts)
+    parts = [ts.month.astype(str), '/', ts.day.astype(str), '/', ts.year.astype(str), ' ',
+             ts.hour.astype(str), ':', np.char.zfill(ts.minute.to_numpy().astype(str), 2)]
+    out = np.asarray(parts[0])
+    for part in parts[1:]:
+        out = np.char.add(out, np.asarray(part))
+    return out.astype(object)
+
+
+class SyntheticDataGenerator:
+    """
+    Vectorized generator for campus security benchmark data
+
+    Every table is drawn column by column from a seeded numpy Generator.
+    The activity log is produced day by day, each day from its own random
+    stream, so output is identical whatever chunk size is used to write it.
+    """
+
+    def __init__(self, num_entities=100, anomaly_rate=0.15, days=30, start=None, seed=42):
+        """
+        Args:
+            num_entities: Number of distinct people
+            anomaly_rate: Share of events drawn from the anomalous distribution
+            days: Length of the simulated time span in days
+            start: First day of the span (default: `days` days before now)
+            seed: Seed for reproducible output
+        """
+        self.num_entities = num_entities
+        self.anomaly_rate = anomaly_rate
+        self.days = days
+        self.start = pd.Timestamp(start) if start is not None else pd.Timestamp.now() - pd.Timedelta(days=days)
+        self.seed = seed
+        self._profiles = None
+
+    def _rng(self, stream, *keys):
+        return np.random.default_rng([self.seed, _STREAMS[stream], *keys])
+
+    def _draw_times(self, rng, n, days=None):
+        """Draw timestamps; anomalous rows may fall at any hour, normal ones 06:00-22:59"""
+        is_anomaly = rng.random(n) < self.anomaly_rate
+        if days is None:
+            days = rng.integers(0, self.days, n)
+        hours = np.where(is_anomaly, rng.integers(0, 24, n), rng.integers(6, 23, n))
+        seconds = days * 86400 + hours * 3600 + rng.integers(0, 3600, n)
+        ts = np.datetime64(self.start.floor('s'), 's') + seconds.astype('timedelta64[s]')
+        return ts, is_anomaly
+
+    # ------------------------------------------------------------------
+    # Activity log (DataPreparation schema)
+    # ------------------------------------------------------------------
+
+    def _entity_categories(self):
+        ids = np.arange(1, self.num_entities + 1)
+        rng = self._rng('macs')
+        octets = rng.integers(0, 256, (self.num_entities, 6))
+        macs = _HEX[octets[:, 0]]
+        for i in range(1, 6):
+            macs = np.char.add(np.char.add(macs, ':'), _HEX[octets[:, i]])
+        return _prefixed('STU', ids, 5), _prefixed('CARD', ids, 6), macs.astype(object)
+
+    def _activity_day(self, day, n, categories, label):
+        rng = self._rng('activity', day)
+        student_ids, card_ids, macs = categories
+
+        ts, is_anomaly = self._draw_times(rng, n, days=np.full(n, day))
+        ts = ts.astype('datetime64[m]').astype('datetime64[ns]')
+        entity = rng.integers(0, self.num_entities, n)
+
+        duration = np.where(is_anomaly, rng.integers(1, 600, n), rng.integers(5, 240, n)).astype(float)
+        duration[rng.random(n) > 0.95] = np.nan
+
+        device = rng.integers(0, len(DEVICE_TYPES), n)
+        device[rng.random(n) > 0.98] = -1
+
+        ip_octets = rng.integers(1, 255, (n, 2))
+        ip_codes = (ip_octets[:, 0] - 1) * 254 + (ip_octets[:, 1] - 1)
+
+        df = pd.DataFrame({
+            'timestamp': ts,
+            'student_id': pd.Categorical.from_codes(entity, categories=student_ids),
+            'card_id': pd.Categorical.from_codes(entity, categories=card_ids),
+            'mac_address': pd.Categorical.from_codes(entity, categories=macs),
+            'building': pd.Categorical.from_codes(rng.integers(0, len(BUILDINGS), n), categories=BUILDINGS),
+            'activity_type': pd.Categorical.from_codes(rng.integers(0, len(ACTIVITIES), n), categories=ACTIVITIES),
+            'duration_minutes': duration,
+            'access_granted': ~is_anomaly | (rng.random(n) < 0.5),
+            'device_type': pd.Categorical.from_codes(device, categories=DEVICE_TYPES),
+            'ip_code': ip_codes,
+        })
+        if label:
+            df['is_injected_anomaly'] = is_anomaly
+        return df
+
+    def iter_activity(self, num_records, chunk_size=1_000_000, label=False):
+        """
+        Yield the activity log as timestamp-sorted chunks
+
+        Chunks always end on a day boundary, so concatenating them gives a
+        globally sorted log.
+
+        Args:
+            num_records: Total number of records
+            chunk_size: Approximate rows per chunk
+            label: Include the ground-truth `is_injected_anomaly` column
+        """
+        rng = self._rng('activity')
+        day_counts = rng.multinomial(num_records, np.full(self.days, 1.0 / self.days))
+        categories = self._entity_categories()
+        ip_categories = np.array([f"192.168.{a}.{b}" for a in range(1, 255) for b in range(1, 255)], dtype=object)
+
+        offset = 0
+        pending = []
+        pending_rows = 0
+        for day, n in enumerate(day_counts):
+            if n:
+                pending.append(self._activity_day(day, int(n), categories, label))
+                pending_rows += n
+            if pending and (pending_rows >= chunk_size or day == self.days - 1):
+                chunk = pd.concat(pending, ignore_index=True)
+                chunk = chunk.sort_values('timestamp', kind='stable', ignore_index=True)
+                chunk.insert(0, 'record_id', _prefixed('REC', np.arange(offset + 1, offset + len(chunk) + 1), 6))
+                chunk['ip_address'] = pd.Categorical.from_codes(chunk.pop('ip_code'), categories=ip_categories)
+                offset += len(chunk)
+                pending, pending_rows = [], 0
+                yield chunk
+
+    def generate_activity(self, num_records, label=False):
+        """Generate the whole activity log as one DataFrame"""
+        chunks = list(self.iter_activity(num_records, chunk_size=max(num_records, 1), label=label))
+        if not chunks:
+            return pd.DataFrame()
+        return pd.concat(chunks, ignore_index=True)
+
+    def write_activity(self, num_records, path, chunk_size=1_000_000, label=False):
+        """Write the activity log to Parquet or CSV chunk by chunk"""
+        return write_chunks(self.iter_activity(num_records, chunk_size, label), path)
+
+    # ------------------------------------------------------------------
+    # data/given sources
+    # ------------------------------------------------------------------
+
+    def generate_profiles(self):
+        """Generate the student/staff profiles table"""
+        if self._profiles is not None:
+            return self._profiles
+
+        n = self.num_entities
+        rng = self._rng('profiles')
+        idx = np.arange(n)
+        role = rng.choice(len(ROLES), n, p=ROLE_WEIGHTS)
+        is_student = role == 0
+
+        hash_bytes = rng.integers(0, 256, (n, 6))
+        device_hash = np.full(n, 'DH')
+        for i in range(6):
+            device_hash = np.char.add(device_hash, _HEX[hash_bytes[:, i]])
+
+        student_id = _prefixed('S', rng.integers(10000, 100000, n))
+        student_id[~is_student] = np.nan
+        staff_id = _prefixed('T', rng.integers(1000, 10000, n))
+        staff_id[is_student] = np.nan
+        face_id = _prefixed('F', 100000 + idx)
+        face_id[rng.random(n) < 0.29] = np.nan
+
+        names = np.char.add(np.char.add(np.array(FIRST_NAMES)[rng.integers(0, len(FIRST_NAMES), n)], ' '),
+                            np.array(LAST_NAMES)[rng.integers(0, len(LAST_NAMES), n)])
+
+        self._profiles = pd.DataFrame({
+            'entity_id': _prefixed('E', 100000 + idx),
+            'name': names.astype(object),
+            'role': pd.Categorical.from_codes(role, categories=ROLES),
+            'email': np.char.add(_prefixed('user', idx).astype(str), '@campus.edu').astype(object),
+            'department': pd.Categorical.from_codes(rng.integers(0, len(DEPARTMENTS), n), categories=DEPARTMENTS),
+            'student_id': student_id,
+            'staff_id': staff_id,
+            'card_id': _prefixed('C', 1000 + rng.permutation(n)),
+            'device_hash': device_hash.astype(object),
+            'face_id': face_id,
+        })
+        return self._profiles
+
+    def _pick(self, rng, column, n):
+        """Sample n values of a profile column as a categorical"""
+        values = pd.unique(self.generate_profiles()[column].dropna().to_numpy())
+        return pd.Categorical.from_codes(rng.integers(0, len(values), n), categories=values)
+
+    def _card_swipes(self, rng, n, start_id):
+        ts, _ = self._draw_times(rng, n)
+        return pd.DataFrame({
+            'card_id': self._pick(rng, 'card_id', n),
+            'location_id': pd.Categorical.from_codes(rng.integers(0, len(LOCATIONS), n), categories=LOCATIONS),
+            'timestamp': _format_iso(ts),
+        })
+
+    def _wifi_logs(self, rng, n, start_id):
+        ts, _ = self._draw_times(rng, n)
+        return pd.DataFrame({
+            'device_hash': self._pick(rng, 'device_hash', n),
+            'ap_id': pd.Categorical.from_codes(rng.integers(0, len(AP_IDS), n), categories=AP_IDS),
+            'timestamp': _format_short(ts),
+        })
+
+    def _cctv_frames(self, rng, n, start_id):
+        ts, _ = self._draw_times(rng, n)
+        face_id = np.asarray(self._pick(rng, 'face_id', n), dtype=object)
+        face_id[rng.random(n) < 0.4] = np.nan
+        return pd.DataFrame({
+            'frame_id': _prefixed('FR', 600000 + start_id + np.arange(n)),
+            'location_id': pd.Categorical.from_codes(rng.integers(0, len(LOCATIONS), n), categories=LOCATIONS),
+            'timestamp': _format_short(ts),
+            'face_id': face_id,
+        })
+
+    def _lab_bookings(self, rng, n, start_id):
+        start, _ = self._draw_times(rng, n)
+        end = start + rng.integers(30, 240, n).astype('timedelta64[m]')
+        attended = np.where(rng.random(n) < 0.97, 'YES', 'NO')
+        return pd.DataFrame({
+            'booking_id': _prefixed('BKG', 300000 + start_id + np.arange(n)),
+            'entity_id': self._pick(rng, 'entity_id', n),
+            'room_id': pd.Categorical.from_codes(rng.integers(0, len(ROOMS), n), categories=ROOMS),
+            'start_time': _format_short(start),
+            'end_time': _format_short(end),
+            'attended (YES/NO)': pd.Categorical(attended, categories=['NO', 'YES']),
+        })
+
+    def _library_checkouts(self, rng, n, start_id):
+        ts, _ = self._draw_times(rng, n)
+        return pd.DataFrame({
+            'checkout_id': _prefixed('LC', 200000 + start_id + np.arange(n)),
+            'entity_id': self._pick(rng, 'entity_id', n),
+            'book_id': _prefixed('BK', rng.integers(1000, 3000, n)),
+            'timestamp': _format_iso(ts),
+        })
+
+    def _notes(self, rng, n, start_id):
+        ts, _ = self._draw_times(rng, n)
+        return pd.DataFrame({
+            'note_id': _prefixed('N', 400000 + start_id + np.arange(n)),
+            'entity_id': self._pick(rng, 'entity_id', n),
+            'category': pd.Categorical.from_codes(rng.integers(0, len(NOTE_CATEGORIES), n), categories=NOTE_CATEGORIES),
+            'text': pd.Categorical.from_codes(rng.integers(0, len(NOTE_TEXTS), n), categories=NOTE_TEXTS),
+            'timestamp': _format_iso(ts),
+        })
+
+    def iter_source(self, source, num_rows, chunk_size=1_000_000):
+        """
+        Yield a data/given source table in chunks
+
+        Args:
+            source: Key of GIVEN_ROWS (e.g. 'card_swipes')
+            num_rows: Total number of rows
+            chunk_size: Rows per chunk
+        """
+        if source not in GIVEN_ROWS:
+            raise ValueError(f"Unknown source: {source}")
+        builder = getattr(self, f"_{source}")
+        for chunk_idx, start_id in enumerate(range(0, num_rows, chunk_size)):
+            n = min(chunk_size, num_rows - start_id)
+            yield builder(self._rng(source, chunk_idx), n, start_id)
+
+    def generate_source(self, source, num_rows):
+        """Generate a whole data/given source table as one DataFrame"""
+        return pd.concat(list(self.iter_source(source, num_rows, chunk_size=max(num_rows, 1))),
+                         ignore_index=True)
+
+    def write_given_sources(self, output_dir, scale=1.0, chunk_size=1_000_000, fmt='.csv'):
+        """
+        Write every data/given source at the requested scale
+
+        Args:
+            output_dir: Directory to write into (created if missing)
+            scale: Multiplier on the data/given row counts
+            chunk_size: Rows per generated chunk
+            fmt: '.csv' to mirror data/given file names, or '.parquet'
+
+        Returns:
+            dict: {source: written path}
+        """
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        written = {}
+
+        profiles_path = output_dir / Path(GIVEN_FILES['profiles']).with_suffix(fmt)
+        written['profiles'] = write_chunks([self.generate_profiles()], profiles_path)
+
+        for source, base_rows in GIVEN_ROWS.items():
+            path = output_dir / Path(GIVEN_FILES[source]).with_suffix(fmt)
+            num_rows = int(round(base_rows * scale))
+            written[source] = write_chunks(self.iter_source(source, num_rows, chunk_size), path)
+            print(f"  {source}: {num_rows} rows -> {path}")
+
+        return written
+
+
+def write_chunks(chunks, path):
+    """
+    Stream DataFrame chunks to a single Parquet or CSV file
+
+    Args:
+        chunks: Iterable of DataFrames sharing one schema
+        path: Output path ('.parquet' or '.csv')
+
+    Returns:
+        Path: The written file
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+
+    if suffix == '.parquet':
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table.cast(writer.schema))
+        finally:
+            if writer is not None:
+                writer.close()
+
+    elif suffix == '.csv':
+        header = True
+        for chunk in chunks:
+            chunk.to_csv(path, mode='w' if header else 'a', header=header, index=False)
+            header = False
+
+    else:
+        raise ValueError(f"Unsupported chunked output format: {suffix}")
+
+    return path
+
+
+# Example usage
+if __name__ == "__main__":
+    import time
+
+    generator = SyntheticDataGenerator(num_entities=10000, days=90, seed=42)
+
+    start = time.perf_counter()
+    generator.write_activity(10_000_000, 'synthetic_activity.parquet')
+    print(f"Wrote 10M activity records in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    generator.write_given_sources('synthetic_given', scale=100)
+    print(f"Wrote data/given sources at 100x in {time.perf_counter() - start:.1f}s")
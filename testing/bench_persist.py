@@ -0,0 +1,69 @@
+"""
+Bulk load benchmark for persistence.Database
+
+Writes a synthetic activity log into a fresh SQLite database (or the
+database given by --url) once per batch size and reports rows/sec, then
+re-runs the largest batch size to check the load is idempotent.
+
+    python testing/bench_persist.py --rows 1000000 --batch-sizes 500 5000 50000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from persistence import Database
+from synthetic import SyntheticDataGenerator
+
+
+def load(url, frame, batch_size):
+    db = Database.from_url(url, batch_size=batch_size)
+    if db.dialect == 'sqlite':
+        db.create_schema()
+    start = time.perf_counter()
+    with db.pool.connection() as conn:
+        db.upsert(conn, 'activities', frame, 'record_id')
+    seconds = time.perf_counter() - start
+    with db.pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM activities")
+        count = cursor.fetchone()[0]
+    db.close()
+    return seconds, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=500_000)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[500, 5000, 50000])
+    parser.add_argument('--url', help='Database URL (default: a temporary SQLite file per run)')
+    args = parser.parse_args()
+
+    data = SyntheticDataGenerator(num_entities=5000).generate_activity(args.rows)
+    frame = data[['record_id', 'timestamp', 'duration_minutes', 'access_granted']].assign(
+        entry_point=data['building'].astype(str),
+        activity_type=data['activity_type'].astype(str).str.lower().str.replace(r'[^a-z]', '', regex=True).map({
+            'entry': 'entry', 'exit': 'exit', 'cardswipe': 'card_swipe', 'wifilogin': 'wifi_login',
+            'labaccess': 'lab_access', 'librarycheckin': 'library_checkin'}),
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for batch_size in args.batch_sizes:
+            url = args.url or f"sqlite:///{os.path.join(tmp, f'bench_{batch_size}.db')}"
+            seconds, count = load(url, frame, batch_size)
+            print(f"batch={batch_size:>7}  {len(frame) / seconds:>10,.0f} rows/s  ({seconds:.2f}s, {count} rows)")
+
+        # Same input again: rows must be updated in place, not duplicated
+        seconds, count = load(url, frame, args.batch_sizes[-1])
+        status = 'ok' if count == len(frame) else f'FAILED ({count} rows)'
+        print(f"re-run      {len(frame) / seconds:>10,.0f} rows/s  ({seconds:.2f}s) idempotent: {status}")
+
+
+if __name__ == '__main__':
+    main()
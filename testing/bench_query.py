@@ -0,0 +1,111 @@
+"""
+Latency benchmark for /api/search and /api/entity
+
+Loads a synthetic activity log straight into the API handler and reports
+p50/p99 latency per query shape: end to end through the Flask test client,
+for the index lookup alone, and for the previous full-scan filtering.
+
+    python testing/bench_query.py --rows 10000000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+# Appended (not prepended) so the real Flask package wins over ../flask.py
+sys.path.append(str(ROOT))
+
+from synthetic import SyntheticDataGenerator
+from wsgi import load_api
+
+
+def scan_search(df, params):
+    """The pre-index /api/search filtering, kept as a baseline"""
+    df = df.copy()
+    if 'student_id' in params:
+        df = df[df['student_id'] == params['student_id']]
+    if 'building' in params:
+        df = df[df['building'] == params['building']]
+    if 'date_from' in params:
+        df = df[df['timestamp'] >= pd.to_datetime(params['date_from'])]
+    if 'date_to' in params:
+        df = df[df['timestamp'] <= pd.to_datetime(params['date_to'])]
+    return df
+
+
+def percentiles(samples):
+    ms = np.array(samples) * 1000
+    return f"p50={np.percentile(ms, 50):8.2f}ms  p99={np.percentile(ms, 99):8.2f}ms  n={len(ms)}"
+
+
+def timed(fn, args_list):
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(args)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--entities', type=int, default=10_000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--baseline-queries', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"Generating {args.rows} rows...")
+    generator = SyntheticDataGenerator(num_entities=args.entities, days=90, seed=7)
+    df = generator.generate_activity(args.rows)
+    # Uploaded spreadsheets arrive with plain string columns, not categoricals
+    students = df['student_id'].cat.categories
+    buildings = df['building'].cat.categories
+    df = df.astype({'student_id': object, 'building': object})
+
+    api = load_api()
+    start = time.perf_counter()
+    dataset = api.handler.registry.publish(api.DatasetRegistry.make_key(None, None), df)
+    index = dataset.query_index
+    print(f"Index build: {time.perf_counter() - start:.2f}s")
+
+    client = api.app.test_client()
+
+    rng = np.random.default_rng(0)
+    t0, t1 = df['timestamp'].min(), df['timestamp'].max()
+
+    def random_range(span):
+        start = t0 + (t1 - t0 - span) * rng.random()
+        return {'date_from': str(start), 'date_to': str(start + span)}
+
+    shapes = {
+        'student': lambda: {'student_id': str(rng.choice(students))},
+        'student+week': lambda: {'student_id': str(rng.choice(students)), **random_range(pd.Timedelta(days=7))},
+        'building+hour': lambda: {'building': str(rng.choice(buildings)), **random_range(pd.Timedelta(hours=1))},
+    }
+
+    for name, make in shapes.items():
+        params = [make() for _ in range(args.queries)]
+        samples = timed(lambda p: client.post('/api/search', json=p), params)
+        print(f"/api/search [{name:14s}] endpoint  {percentiles(samples)}")
+        samples = timed(lambda p: index.take(index.search(**p)), params)
+        print(f"/api/search [{name:14s}] index     {percentiles(samples)}")
+        samples = timed(lambda p: scan_search(df, p), params[:args.baseline_queries])
+        print(f"/api/search [{name:14s}] full scan {percentiles(samples)}")
+
+    entities = [str(e) for e in rng.choice(students, args.queries)]
+    samples = timed(lambda e: client.get(f'/api/entity/{e}'), entities)
+    print(f"/api/entity/<id>             endpoint  {percentiles(samples)}")
+    samples = timed(lambda e: index.take(index.entity_positions(e)[-10:]), entities)
+    print(f"/api/entity/<id>             index     {percentiles(samples)}")
+    samples = timed(lambda e: df[df['student_id'] == e].tail(10), entities[:args.baseline_queries])
+    print(f"/api/entity/<id>             full scan {percentiles(samples)}")
+
+
+if __name__ == '__main__':
+    main()
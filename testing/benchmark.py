@@ -0,0 +1,498 @@
+"""
+End-to-end benchmark suite for the face, analytics and API paths
+
+Generates synthetic galleries, activity logs and a CCTV clip at a chosen
+scale, times each benchmark (median of several runs after a warm-up run,
+reported as first_ms) and measures its peak traced memory in a separate
+run. Each run is appended to a JSON history and compared against a stored
+baseline; slowdowns or memory growth beyond the tolerance are flagged as
+regressions.
+
+    python testing/benchmark.py --scale small --save-baseline
+    python testing/benchmark.py --scale small                 # compare
+    python testing/benchmark.py --scale medium --only 'analysis.*' 'api.*'
+    python testing/benchmark.py --scale small --only api.upload api.analyze
+
+Benchmarks whose dependencies are missing (e.g. DeepFace/OpenCV for the
+face paths) are reported as skipped.
+"""
+
+import argparse
+import contextlib
+import fnmatch
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent
+# Appended (not prepended) so the real Flask package wins over ../flask.py
+sys.path.append(str(ROOT.parent))
+
+HISTORY_PATH = ROOT / 'benchmark_history.json'
+BASELINE_PATH = ROOT / 'benchmark_baseline.json'
+
+# gallery/per_person: identify_face gallery; duplicates: people in the
+# (quadratic) duplicate scan; rows: activity log rows; clip_frames: CCTV clip length
+SCALES = {
+    'small': {'gallery': 100, 'per_person': 3, 'duplicates': 40, 'queries': 5,
+              'rows': 10_000, 'clip_frames': 60},
+    'medium': {'gallery': 1_000, 'per_person': 3, 'duplicates': 120, 'queries': 5,
+               'rows': 100_000, 'clip_frames': 150},
+    'large': {'gallery': 5_000, 'per_person': 5, 'duplicates': 300, 'queries': 3,
+              'rows': 1_000_000, 'clip_frames': 300},
+}
+
+EMBEDDING_DIM = 512
+
+BENCHMARKS = []
+
+
+def benchmark(name, repeat=5):
+    """
+    Register a benchmark
+
+    The decorated function receives the Fixtures and returns the callable to
+    time. If that callable returns a Splits dict, its entries are recorded
+    as sub-benchmarks ('<name>.<key>').
+    """
+    def register(setup):
+        BENCHMARKS.append((name, setup, repeat))
+        return setup
+    return register
+
+
+class Splits(dict):
+    """Named durations (seconds) measured inside one benchmark run"""
+
+
+class Fixtures:
+    """Synthetic inputs for one scale, built lazily and shared between benchmarks"""
+
+    def __init__(self, scale, seed=0):
+        self.scale = scale
+        self.params = SCALES[scale]
+        self.seed = seed
+        self.tmp = tempfile.TemporaryDirectory()
+        self._cache = {}
+
+    def cached(self, key, build):
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    def activity(self):
+        """Activity log as uploaded through the API (plain string columns)"""
+        from synthetic import SyntheticDataGenerator
+
+        def build():
+            rows = self.params['rows']
+            generator = SyntheticDataGenerator(num_entities=max(rows // 100, 100), seed=self.seed)
+            df = generator.generate_activity(rows)
+            categoricals = df.select_dtypes('category').columns
+            return df.astype({col: object for col in categoricals})
+        return self.cached('activity', build)
+
+    def gallery(self, people, per_person):
+        """{person_id: [embeddings]} with per_person noisy copies of each person's center"""
+        def build():
+            rng = np.random.default_rng(self.seed)
+            centers = rng.standard_normal((people, EMBEDDING_DIM)).astype(np.float32)
+            noise = 0.3 * rng.standard_normal((people, per_person, EMBEDDING_DIM)).astype(np.float32)
+            embeddings = centers[:, None, :] + noise
+            return {f"P{i:05d}": list(embeddings[i]) for i in range(people)}
+        return self.cached(('gallery', people, per_person), build)
+
+    def queries(self, n):
+        """Noisy embeddings of gallery people"""
+        gallery = self.gallery(self.params['gallery'], self.params['per_person'])
+        rng = np.random.default_rng(self.seed + 1)
+        people = list(gallery)
+        picks = rng.choice(len(people), n)
+        return [gallery[people[i]][0] + 0.2 * rng.standard_normal(EMBEDDING_DIM).astype(np.float32) for i in picks]
+
+    def face_system(self, people, per_person):
+        from facerecognition import FaceRecognitionSystem
+
+        system = FaceRecognitionSystem()
+        system.face_database = self.gallery(people, per_person)
+        return system
+
+    def clip(self):
+        """A short MJPG clip with moving face-like shapes"""
+        import cv2
+
+        def build():
+            path = str(Path(self.tmp.name) / 'clip.avi')
+            width, height, fps = 640, 480, 30
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, (width, height))
+            for i in range(self.params['clip_frames']):
+                frame = np.full((height, width, 3), 90, dtype=np.uint8)
+                x = 120 + (i * 4) % 400
+                cv2.ellipse(frame, (x, 220), (60, 80), 0, 0, 360, (150, 180, 230), -1)
+                for dx in (-22, 22):
+                    cv2.circle(frame, (x + dx, 200), 8, (40, 40, 40), -1)
+                cv2.ellipse(frame, (x, 260), (25, 10), 0, 0, 180, (60, 60, 150), -1)
+                writer.write(frame)
+            writer.release()
+            return path
+        return self.cached('clip', build)
+
+    def activity_csv(self):
+        """The activity log as the CSV bytes of an upload"""
+        return self.cached('activity_csv', lambda: self.activity().to_csv(index=False).encode('utf-8'))
+
+    def api(self):
+        """The API module with the activity log uploaded and analysed through its endpoints"""
+        def build():
+            from wsgi import load_api
+
+            api = load_api()
+            client = api.app.test_client()
+            features_job = _upload(client, self.activity_csv())
+            if features_job:
+                _wait_for_job(client, features_job)
+            _analyze(client)
+            return api
+        return self.cached('api', build)
+
+    def close(self):
+        self.tmp.cleanup()
+
+
+# ----------------------------------------------------------------------
+# Face recognition
+# ----------------------------------------------------------------------
+
+@benchmark('face.identify_face', repeat=3)
+def bench_identify_face(fx):
+    system = fx.face_system(fx.params['gallery'], fx.params['per_person'])
+    queries = fx.queries(fx.params['queries'])
+    return lambda: [system.identify_face(q) for q in queries]
+
+
+@benchmark('face.gallery_match')
+def bench_gallery_match(fx):
+    from faceservice import FaceGallery
+
+    gallery = FaceGallery.from_database(fx.gallery(fx.params['gallery'], fx.params['per_person']))
+    queries = np.array(fx.queries(fx.params['queries']))
+    return lambda: gallery.match(queries)
+
+
+@benchmark('face.detect_duplicates', repeat=3)
+def bench_detect_duplicates(fx):
+    system = fx.face_system(fx.params['duplicates'], fx.params['per_person'])
+    return lambda: system.detect_duplicates()
+
+
+@benchmark('face.process_cctv_footage', repeat=3)
+def bench_process_cctv_footage(fx):
+    system = fx.face_system(fx.params['gallery'], fx.params['per_person'])
+    path = fx.clip()
+    return lambda: system.process_cctv_footage(path, sample_rate=10)
+
+
+# ----------------------------------------------------------------------
+# Analytics
+# ----------------------------------------------------------------------
+
+@benchmark('analysis.run_full_analysis', repeat=3)
+def bench_run_full_analysis(fx):
+    from maincode import CampusSecuritySystem
+
+    df = fx.activity()
+
+    def run():
+        marks = []
+        system = CampusSecuritySystem()
+        system.run_full_analysis(df, progress=lambda number, name: marks.append((name, time.perf_counter())))
+        marks.append((None, time.perf_counter()))
+        return Splits({name: end - start for (name, start), (_, end) in zip(marks, marks[1:])})
+    return run
+
+
+@benchmark('analysis.engineer_features')
+def bench_engineer_features(fx):
+    from dataprep import DataPreparation
+
+    df = fx.activity()
+    return lambda: DataPreparation().engineer_features(df)
+
+
+# ----------------------------------------------------------------------
+# API endpoints (Flask test client)
+# ----------------------------------------------------------------------
+
+def _endpoint(method, url, **kwargs):
+    def setup(fx):
+        client = fx.api().app.test_client()
+
+        def run():
+            response = client.open(url(fx) if callable(url) else url, method=method, **kwargs)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{method} {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        return run
+    return setup
+
+
+def _first_student(fx):
+    return f"/api/entity/{fx.activity()['student_id'].iloc[0]}"
+
+
+for _name, _method, _url, _kwargs in [
+    ('api.statistics', 'GET', '/api/statistics', {}),
+    ('api.results', 'GET', '/api/results', {}),
+    ('api.alerts', 'GET', '/api/alerts', {}),
+    ('api.datasets', 'GET', '/api/datasets', {}),
+    ('api.entity', 'GET', _first_student, {}),
+    ('api.search', 'POST', '/api/search', {'json': {'building': 'Library'}}),
+]:
+    benchmark(_name, repeat=20)(_endpoint(_method, _url, **_kwargs))
+
+
+def _wait_for_job(client, job_id, poll_interval=0.005):
+    """Poll /api/jobs/<id> until the job finishes; raises unless it completed"""
+    while True:
+        job = client.get(f'/api/jobs/{job_id}').get_json()
+        if job['status'] == 'completed':
+            return job
+        if job['status'] in ('failed', 'cancelled'):
+            raise RuntimeError(f"job {job_id} {job['status']}: {job.get('error')}")
+        time.sleep(poll_interval)
+
+
+def _upload(client, data, dataset=None):
+    """POST a CSV to /api/upload; returns the id of its features job (or None)"""
+    response = client.post(
+        '/api/upload',
+        data={'file': (io.BytesIO(data), 'activity.csv')},
+        headers={'X-Dataset': dataset} if dataset else {},
+        content_type='multipart/form-data',
+    )
+    body = response.get_json() or {}
+    if response.status_code >= 400 or not body.get('success'):
+        raise RuntimeError(f"upload {response.status_code}: {body.get('error')}")
+    return body.get('features_job')
+
+
+def _analyze(client, dataset=None):
+    """POST /api/analyze and poll the job until it completes"""
+    response = client.post('/api/analyze', headers={'X-Dataset': dataset} if dataset else {})
+    if response.status_code != 202:
+        raise RuntimeError(f"analyze {response.status_code}: {response.get_data(as_text=True)[:200]}")
+    return _wait_for_job(client, response.get_json()['job_id'])
+
+
+@benchmark('api.upload', repeat=3)
+def bench_upload(fx):
+    client = fx.api().app.test_client()
+    data = fx.activity_csv()
+
+    def run():
+        # A separate dataset, so the analysed one the GET benchmarks read stays put
+        start = time.perf_counter()
+        features_job = _upload(client, data, dataset='bench-upload')
+        uploaded = time.perf_counter()
+        if features_job:
+            _wait_for_job(client, features_job)
+        return Splits({'request': uploaded - start, 'features': time.perf_counter() - uploaded})
+    return run
+
+
+@benchmark('api.analyze', repeat=3)
+def bench_analyze(fx):
+    client = fx.api().app.test_client()
+    return lambda: _analyze(client)
+
+
+# ----------------------------------------------------------------------
+# Harness
+# ----------------------------------------------------------------------
+
+def measure(run, repeat):
+    """
+    Time `run` and trace its peak memory
+
+    Returns:
+        dict of result metrics, plus {split: metrics} for Splits results
+    """
+    start = time.perf_counter()
+    run()
+    first_seconds = time.perf_counter() - start
+
+    samples, splits = [], {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        samples.append(time.perf_counter() - start)
+        if isinstance(result, Splits):
+            for key, seconds in result.items():
+                splits.setdefault(key, []).append(seconds)
+
+    # Separate traced run: tracemalloc slows allocation-heavy code down
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    metrics = {
+        'median_ms': round(statistics.median(samples) * 1000, 3),
+        'min_ms': round(min(samples) * 1000, 3),
+        'first_ms': round(first_seconds * 1000, 3),
+        'peak_mb': round(peak / 1e6, 2),
+        'repeat': repeat,
+    }
+    sub = {key: {'median_ms': round(statistics.median(values) * 1000, 3), 'min_ms': round(min(values) * 1000, 3)}
+           for key, values in splits.items()}
+    return metrics, sub
+
+
+def run_benchmarks(fx, patterns, repeat=None):
+    results, skipped = {}, {}
+    for name, setup, default_repeat in BENCHMARKS:
+        if patterns and not any(fnmatch.fnmatch(name, p) for p in patterns):
+            continue
+        try:
+            # Pipeline progress output would drown the report
+            with contextlib.redirect_stdout(io.StringIO()):
+                run = setup(fx)
+                metrics, sub = measure(run, repeat or default_repeat)
+        except ImportError as e:
+            skipped[name] = f"missing dependency: {e.name or e}"
+            print(f"{name:45s} skipped ({skipped[name]})")
+            continue
+        except Exception as e:
+            # One broken benchmark should not stop the rest of the suite
+            skipped[name] = f"failed: {type(e).__name__}: {e}"
+            print(f"{name:45s} {skipped[name]}")
+            continue
+        results[name] = metrics
+        print(f"{name:45s} {metrics['median_ms']:12.2f} ms  (first {metrics['first_ms']:.2f} ms)"
+              f"  peak {metrics['peak_mb']:8.2f} MB")
+        for key, split in sub.items():
+            results[f"{name}.{key}"] = split
+            print(f"  {key:43s} {split['median_ms']:12.2f} ms")
+    return results, skipped
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1e6, 1)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance, min_ms=1.0, min_mb=1.0):
+    """
+    Regressions against a baseline run
+
+    A benchmark regresses when its median time (or peak memory) exceeds the
+    baseline by more than `tolerance` and by more than an absolute noise
+    floor (`min_ms`, `min_mb`).
+
+    Returns:
+        list of (name, metric, baseline value, current value)
+    """
+    regressions = []
+    print(f"\nCompared with baseline {baseline.get('commit')} ({baseline.get('timestamp')}):")
+    for name, metrics in results.items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        for metric, floor in (('median_ms', min_ms), ('peak_mb', min_mb)):
+            if metric not in metrics or metric not in before:
+                continue
+            old, new = before[metric], metrics[metric]
+            ratio = new / old if old else float('inf')
+            regressed = new > old * (1 + tolerance) and new - old > floor
+            if regressed:
+                regressions.append((name, metric, old, new))
+            if metric == 'median_ms' or regressed:
+                flag = 'REGRESSION' if regressed else ('faster' if ratio < 1 - tolerance else '')
+                print(f"  {name:45s} {metric:9s} {old:12.2f} -> {new:12.2f}  x{ratio:5.2f}  {flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=list(SCALES), default='small')
+    parser.add_argument('--only', nargs='+', help="Glob patterns of benchmarks to run (e.g. 'face.*')")
+    parser.add_argument('--repeat', type=int, help='Timed runs per benchmark (default: per benchmark)')
+    parser.add_argument('--history', type=Path, default=HISTORY_PATH)
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help='Store this run as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='Allowed slowdown/growth (0.10 = 10%%)')
+    parser.add_argument('--list', action='store_true', help='List benchmarks and exit')
+    args = parser.parse_args()
+
+    if args.list:
+        for name, _, repeat in BENCHMARKS:
+            print(f"{name:45s} repeat={repeat}")
+        return 0
+
+    print(f"Scale '{args.scale}': {SCALES[args.scale]}\n")
+    fx = Fixtures(args.scale)
+    try:
+        results, skipped = run_benchmarks(fx, args.only, args.repeat)
+    finally:
+        fx.close()
+
+    record = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'scale': args.scale,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'peak_rss_mb': peak_rss_mb(),
+        'results': results,
+        'skipped': skipped,
+    }
+    print(f"\nProcess peak RSS: {record['peak_rss_mb']} MB")
+
+    history = json.loads(args.history.read_text()) if args.history.exists() else []
+    history.append(record)
+    args.history.write_text(json.dumps(history, indent=2))
+    print(f"Appended to {args.history} ({len(history)} runs)")
+
+    regressions = []
+    if args.save_baseline:
+        baselines = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+        baselines[args.scale] = record
+        args.baseline.write_text(json.dumps(baselines, indent=2))
+        print(f"Saved as the '{args.scale}' baseline in {args.baseline}")
+    elif args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text()).get(args.scale)
+        if baseline is not None:
+            regressions = compare(results, baseline, args.tolerance)
+            print(f"\n{len(regressions)} regression(s)")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Import-time report for the Campus Security modules
+
+Imports each target in a fresh interpreter with `python -X importtime`
+and prints its total import time, the slowest modules (cumulative) and the
+self time summed per top-level package. With --budget the exit status is
+non-zero when a target takes longer or fails to import, so startup
+regressions can fail CI.
+
+    python testing/import_report.py
+    python testing/import_report.py api maincode --top 15 --budget 1.0
+"""
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Name -> statement to time (run with the repo appended to sys.path)
+TARGETS = {
+    'api': 'from wsgi import load_api; load_api()',
+    'campus': 'import campus',
+    'maincode': 'import maincode',
+    'dataprep': 'import dataprep',
+    'facerecognition': 'import facerecognition',
+    'linking': 'import linking',
+    'persistence': 'import persistence',
+}
+
+
+def import_times(statement):
+    """
+    Run a statement under -X importtime in a clean interpreter
+
+    Returns:
+        (wall seconds, [(module, self_us, cumulative_us, depth)])
+    """
+    code = f"import sys; sys.path.append({str(ROOT)!r}); {statement}"
+    start = time.perf_counter()
+    # Run outside the repo so ./flask.py cannot shadow the Flask package
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=tempfile.gettempdir(),
+                          capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'import failed')
+
+    modules = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return wall, modules
+
+
+def report(name, statement, top):
+    wall, modules = import_times(statement)
+    # Top-level entries (depth 0 after the leading space) add up to the total
+    total = sum(cumulative for _, _, cumulative, depth in modules if depth == 0) / 1e6
+
+    print(f"\n{name}: {statement}")
+    print(f"  import time {total:.3f}s  (process wall {wall:.3f}s, {len(modules)} modules)")
+
+    print(f"  slowest modules (cumulative):")
+    for module, _, cumulative, _ in sorted(modules, key=lambda m: -m[2])[:top]:
+        print(f"    {cumulative / 1e3:9.1f} ms  {module}")
+
+    packages = {}
+    for module, self_us, _, _ in modules:
+        package = module.split('.')[0]
+        packages[package] = packages.get(package, 0) + self_us
+    print(f"  self time by package:")
+    for package, self_us in sorted(packages.items(), key=lambda p: -p[1])[:top]:
+        print(f"    {self_us / 1e3:9.1f} ms  {package}")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('targets', nargs='*', help=f"Targets to time (default: all of {', '.join(TARGETS)})")
+    parser.add_argument('--top', type=int, default=10, help='Rows per table')
+    parser.add_argument('--budget', type=float, help='Fail when a target imports slower than this (seconds)')
+    args = parser.parse_args()
+
+    over = []
+    for name in args.targets or list(TARGETS):
+        statement = TARGETS.get(name, f"import {name}")
+        try:
+            total = report(name, statement, args.top)
+        except RuntimeError as e:
+            print(f"\n{name}: failed ({e})")
+            # A target that cannot be imported cannot be within budget
+            total = None
+        if args.budget is not None and (total is None or total > args.budget):
+            over.append((name, total))
+
+    for name, total in over:
+        if total is None:
+            print(f"\n{name} failed to import, counted as over the {args.budget:.3f}s budget")
+        else:
+            print(f"\n{name} took {total:.3f}s, over the {args.budget:.3f}s budget")
+    return 1 if over else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+Concurrent load test against a running API server
+
+Uploads a synthetic dataset, then fires read requests from many client
+threads for a fixed duration and reports throughput and p50/p99 latency
+per endpoint. Start the server first, e.g.
+
+    DATASET_DIR=/dev/shm/campus gunicorn -w 4 --threads 8 -b 127.0.0.1:5000 wsgi:application
+    python testing/loadtest.py --url http://127.0.0.1:5000 --clients 32 --duration 30
+"""
+
+import argparse
+import http.client
+import io
+import json
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from synthetic import SyntheticDataGenerator
+
+
+def upload(base, headers, df):
+    """POST the frame as an Excel upload (multipart form)"""
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False)
+    boundary = uuid.uuid4().hex
+    body = (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="load.xlsx"\r\n'
+        f'Content-Type: application/octet-stream\r\n\r\n'
+    ).encode() + buffer.getvalue() + f'\r\n--{boundary}--\r\n'.encode()
+
+    conn = http.client.HTTPConnection(base.hostname, base.port or 80, timeout=300)
+    conn.request('POST', '/api/upload', body, {**headers, 'Content-Type': f'multipart/form-data; boundary={boundary}'})
+    response = conn.getresponse()
+    result = json.loads(response.read())
+    conn.close()
+    if not result.get('success'):
+        raise SystemExit(f"Upload failed: {result}")
+    return result
+
+
+def worker(base, headers, requests, deadline, samples, errors, seed):
+    rng = np.random.default_rng(seed)
+    conn = http.client.HTTPConnection(base.hostname, base.port or 80, timeout=60)
+    while time.perf_counter() < deadline:
+        name, method, path, body = requests[rng.integers(len(requests))]
+        start = time.perf_counter()
+        try:
+            payload = json.dumps(body) if body is not None else None
+            extra = {'Content-Type': 'application/json'} if body is not None else {}
+            conn.request(method, path, payload, {**headers, **extra})
+            response = conn.getresponse()
+            response.read()
+            ok = response.status < 500
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection(base.hostname, base.port or 80, timeout=60)
+            ok = False
+        elapsed = time.perf_counter() - start
+        samples[name].append(elapsed)
+        if not ok:
+            errors[name] += 1
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--entities', type=int, default=500)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+
+    base = urlsplit(args.url)
+    headers = {'X-Session-Id': f'load-{uuid.uuid4().hex[:8]}', 'X-Dataset': 'bench'}
+
+    df = SyntheticDataGenerator(num_entities=args.entities, seed=11).generate_activity(args.rows)
+    df = df.astype({c: object for c in df.select_dtypes('category').columns})
+    print(f"Uploading {len(df)} rows as {headers['X-Session-Id']}/{headers['X-Dataset']}...")
+    upload(base, headers, df)
+
+    students = df['student_id'].unique()[:50]
+    buildings = df['building'].unique()
+    requests = [('statistics', 'GET', '/api/statistics', None)]
+    requests += [('entity', 'GET', f'/api/entity/{s}', None) for s in students]
+    requests += [('search', 'POST', '/api/search', {'student_id': str(s), 'limit': 50}) for s in students]
+    requests += [('search', 'POST', '/api/search', {'building': str(b), 'limit': 50}) for b in buildings]
+
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+    deadline = time.perf_counter() + args.duration
+    threads = [
+        threading.Thread(target=worker, args=(base, headers, requests, deadline, samples, errors, i))
+        for i in range(args.clients)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    total = sum(len(s) for s in samples.values())
+    print(f"{args.clients} clients, {wall:.1f}s: {total} requests, {total / wall:.0f} req/s")
+    for name, times in sorted(samples.items()):
+        ms = np.array(times) * 1000
+        print(f"  {name:12s} n={len(ms):7d}  {len(ms) / wall:7.0f} req/s  "
+              f"p50={np.percentile(ms, 50):7.2f}ms  p99={np.percentile(ms, 99):7.2f}ms  errors={errors[name]}")
+
+
+if __name__ == '__main__':
+    main()
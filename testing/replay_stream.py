@@ -0,0 +1,116 @@
+"""
+Replay data/given swipes and Wi-Fi associations through the stream scorer
+
+Fits the stream model on the earliest --train-fraction of events, then
+feeds the remaining raw CSV rows in timestamp order: the first --probe
+rows one at a time through StreamScorer.process (per-event scoring time),
+the rest from a producer thread into a StreamService, optionally throttled
+to --rate events/sec. Reports sustained events/sec and end-to-end alert
+latency (queued -> emitted to every sink).
+
+    python testing/replay_stream.py data/given
+    python testing/replay_stream.py /tmp/given100 --rate 50000 --database sqlite:////tmp/replay.db
+"""
+
+import argparse
+import csv
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from linking import link_sources
+from schemas import SOURCES, load_source
+from streaming import (STREAM_SOURCES, STREAM_SPECS, AlertFeed, DatabaseSink, StreamFeatures, StreamModel,
+                       StreamScorer, StreamService, stream_events)
+
+
+def replay_rows(data_dir, start):
+    """(source, raw row) pairs at or after `start`, in timestamp order"""
+    times, items = [], []
+    for source in STREAM_SOURCES:
+        time_col = STREAM_SPECS[source][3]
+        parsed = load_source(source, data_dir)[time_col].to_numpy(dtype='datetime64[ns]')
+        with open(Path(data_dir) / SOURCES[source].filename, newline='') as f:
+            rows = list(csv.DictReader(f))
+        keep = np.flatnonzero(parsed >= start)
+        times.append(parsed[keep])
+        items.extend((source, rows[i]) for i in keep)
+    order = np.argsort(np.concatenate(times), kind='stable')
+    return [items[i] for i in order]
+
+
+def percentiles(values, scale):
+    if not len(values):
+        return 'n/a'
+    p50, p95, p99 = np.percentile(np.asarray(values) * scale, [50, 95, 99])
+    return f"p50 {p50:.2f}  p95 {p95:.2f}  p99 {p99:.2f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('data_dir', nargs='?', default=str(ROOT / 'data' / 'given'))
+    parser.add_argument('--train-fraction', type=float, default=0.5)
+    parser.add_argument('--probe', type=int, default=2000, help='Events scored one at a time first')
+    parser.add_argument('--rate', type=float, default=0, help='Events/sec fed to the service (0: as fast as possible)')
+    parser.add_argument('--max-batch', type=int, default=512)
+    parser.add_argument('--database', help='Also write alerts to this database URL')
+    args = parser.parse_args()
+
+    events, linker = link_sources(args.data_dir)
+    history = stream_events(events)
+    split = history['timestamp'].iloc[int(len(history) * args.train_fraction)]
+    features = StreamFeatures()
+    model = StreamModel.fit(history[history['timestamp'] < split], features=features)
+    scorer = StreamScorer(model, linker, features)
+
+    items = replay_rows(args.data_dir, split.to_datetime64())
+    probe, rest = items[:args.probe], items[args.probe:]
+    print(f"Replaying {len(items)} events from {split}")
+
+    timings = []
+    for source, row in probe:
+        started = time.perf_counter()
+        scorer.process(source, row)
+        timings.append(time.perf_counter() - started)
+
+    sinks = [AlertFeed()]
+    if args.database:
+        from persistence import Database
+
+        db = Database.from_url(args.database)
+        if db.dialect == 'sqlite':
+            db.create_schema()
+        sinks.append(DatabaseSink(db, linker.profiles))
+    service = StreamService(scorer, sinks, max_batch=args.max_batch)
+
+    def produce():
+        started = time.perf_counter()
+        for i, (source, row) in enumerate(rest):
+            if args.rate and i % 100 == 0:
+                delay = started + i / args.rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            service.put(source, row)
+
+    started = time.perf_counter()
+    producer = threading.Thread(target=produce)
+    producer.start()
+    producer.join()
+    service.close()
+    elapsed = time.perf_counter() - started
+
+    print(f"\nsingle-event scoring (us):  {percentiles(timings, 1e6)}  over {len(timings)} events")
+    print(f"service throughput:         {len(rest) / elapsed:,.0f} events/s ({len(rest)} events in {elapsed:.2f}s)")
+    print(f"alert latency (ms):         {percentiles(list(service.latencies), 1e3)}")
+    print(f"events scored {scorer.events}, skipped {scorer.skipped}, alerts {scorer.alerts} "
+          f"({scorer.alerts / max(scorer.events, 1):.2%})")
+
+
+if __name__ == '__main__':
+    main()
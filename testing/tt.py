@@ -1,15 +1,17 @@
-import pandas as pd
+import sys
+from pathlib import Path
 
-profiles = pd.read_csv("student or staff profiles.csv")
+sys.path.append(str(Path(__file__).resolve().parent.parent))
 
-free_text = pd.read_csv("free_text_notes (helpdesk or RSVPs).csv")
-profiles = profiles.merge(free_text, on="entity_id", how="outer")  
+from linking import link_sources
+from storage import save_frame
 
-lab_booking = pd.read_csv("lab_bookings.csv")
-profiles = profiles.merge(lab_booking, on="entity_id", how="outer")
+# One row per source record keyed by entity_id, instead of outer-merging
+# notes x bookings x checkouts per entity
+events, linker = link_sources(".")
+save_frame(events, "event_store.parquet")
 
-library = pd.read_csv("library_checkouts.csv")
-profiles = profiles.merge(library, on="entity_id", how="outer")
-profiles.to_csv("master_entity_file.csv", index=False)
-
-print("Master file created successfully!")
+for source, stats in linker.stats.items():
+    print(f"{source}: {stats['rows']} rows -> {stats['events']} events "
+          f"({stats['unresolved']} unresolved, {stats['ambiguous']} ambiguous)")
+print("Event store created successfully!")
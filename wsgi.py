@@ -0,0 +1,51 @@
+"""
+WSGI entry point for the Campus Security API
+
+The API lives in flask.py, which shadows the Flask package when the repo
+directory comes first on sys.path; this module imports the real package
+first and then loads flask.py under the name `campus_api`.
+
+    DATASET_DIR=/dev/shm/campus gunicorn -w 4 --threads 8 -b 0.0.0.0:5000 wsgi:application
+
+With DATASET_DIR set, a dataset uploaded to one worker is written there
+once and memory-mapped by the others, so every worker serves the same data
+without holding its own copy; analysis results, feature stores and job
+state are shared there too, so any worker answers for any job. With
+STREAM_MODEL, one worker scores the event stream and the others forward
+events to it and serve the live alerts it publishes there.
+DATASET_MAX_BYTES caps the memory used for loaded datasets per worker;
+ANALYSIS_WORKERS and ANALYSIS_MAX_PENDING bound background analyses per
+worker.
+"""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+
+
+def load_api():
+    """Import ../flask.py as `campus_api` without shadowing the Flask package"""
+    if 'campus_api' in sys.modules:
+        return sys.modules['campus_api']
+
+    root = str(ROOT)
+    removed = [p for p in sys.path if p in ('', '.', root)]
+    sys.path[:] = [p for p in sys.path if p not in removed]
+    try:
+        import flask  # noqa: F401  (the real package, cached in sys.modules)
+    finally:
+        sys.path.extend(removed)
+    if root not in sys.path:
+        sys.path.append(root)
+
+    spec = importlib.util.spec_from_file_location('campus_api', ROOT / 'flask.py')
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['campus_api'] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+api = load_api()
+application = api.app